@@ -1,9 +1,39 @@
 import json
 
+from django.core.cache import cache
 from django.db import models
 
+from core.utils import bump_cache_version, get_cache_version
 from users.models import UserProfile
 
+SETTINGS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def settings_version_key(user_id):
+    return f'account:usersettings:{user_id}:version'
+
+
+def settings_cache_key(user_id, version):
+    return f'account:usersettings:{user_id}:{version}'
+
+
+class UserSettingsManager(models.Manager):
+
+    def get_version(self, user_id):
+        return get_cache_version(settings_version_key(user_id))
+
+    def bump_version(self, user_id):
+        bump_cache_version(settings_version_key(user_id))
+
+    def get_settings(self, user_id):
+        """Настройки пользователя из кэша по id пользователя и версии"""
+        key = settings_cache_key(user_id, self.get_version(user_id))
+        settings = cache.get(key)
+        if settings is None:
+            settings = self.get(user_id=user_id).get_settings()
+            cache.set(key, settings, SETTINGS_CACHE_TIMEOUT)
+        return settings
+
 
 class UserSettings(models.Model):
     user = models.OneToOneField(UserProfile, on_delete=models.CASCADE)
@@ -11,6 +41,8 @@ class UserSettings(models.Model):
 
     name_suffix = 'ы'
 
+    objects = UserSettingsManager()
+
     class Meta:
         verbose_name = 'настройки'
         verbose_name_plural = 'настройки'
@@ -35,3 +67,9 @@ class UserSettings(models.Model):
         if isinstance(self.settings, dict):
             self.settings = json.dumps(self.settings)
         super().save(*args, **kwargs)  ###### включить
+        UserSettings.objects.bump_version(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        UserSettings.objects.bump_version(self.user_id)
+        return result
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from account.models import UserSettings
+from users.models import UserProfile
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UserSettingsCacheTest(TestCase):
+    """Настройки пользователя из кэша по id пользователя и версии"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='user')
+        self.other = UserProfile.objects.create(username='other')
+
+    def test_cached(self):
+        user_settings = UserSettings.objects.get(user=self.user)
+        user_settings.update_settings('contract_list', {'0': 'number'})
+        self.assertEqual(
+            UserSettings.objects.get_settings(self.user.pk),
+            {'contract_list': ['number']},
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                UserSettings.objects.get_settings(self.user.pk),
+                {'contract_list': ['number']},
+            )
+
+    def test_save_bumps_version(self):
+        self.assertEqual(UserSettings.objects.get_settings(self.user.pk), {})
+        self.assertEqual(UserSettings.objects.get_settings(self.other.pk), {})
+        version = UserSettings.objects.get_version(self.user.pk)
+        other_version = UserSettings.objects.get_version(self.other.pk)
+        user_settings = UserSettings.objects.get(user=self.user)
+        user_settings.update_settings('contract_list', {'0': 'title'})
+        self.assertNotEqual(
+            UserSettings.objects.get_version(self.user.pk), version
+        )
+        self.assertEqual(
+            UserSettings.objects.get_version(self.other.pk), other_version
+        )
+        self.assertEqual(
+            UserSettings.objects.get_settings(self.user.pk),
+            {'contract_list': ['title']},
+        )
+        self.assertEqual(UserSettings.objects.get_settings(self.other.pk), {})
+
+    def test_delete_bumps_version(self):
+        UserSettings.objects.get_settings(self.user.pk)
+        UserSettings.objects.get(user=self.user).delete()
+        with self.assertRaises(UserSettings.DoesNotExist):
+            UserSettings.objects.get_settings(self.user.pk)
@@ -5,6 +5,7 @@ from account.views import (
     UserPasswordChangeView,
     UserLoginView,
     logout_user, AccountSettingsView,
+    UserActivityView,
 )
 
 urlpatterns = [
@@ -13,6 +14,8 @@ urlpatterns = [
              name='account_settings'),
         path('login/', UserLoginView.as_view(), name='login'),
         path('logout/', logout_user, name='logout'),
+        path('activity/', UserActivityView.as_view(),
+             name='account_activity'),
         path("password_change/", UserPasswordChangeView.as_view(),
              name="password_change"),
     ]))
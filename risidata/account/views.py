@@ -3,6 +3,7 @@ from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.views import LoginView, PasswordChangeView
 from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import Paginator
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.html import format_html
@@ -12,6 +13,7 @@ from account.forms import UserSettingsForm
 from account.models import UserSettings
 from core.mixins import BaseSiteMixin
 from core.utils import has_permission_view, try_get_url
+from risi.models import LogEntrySite
 
 APP_LABEL = 'account'
 
@@ -34,6 +36,11 @@ class AccountMixin:
                     'contract_list_change', current_app='contract'
                 )
             },
+            {
+                'name': '',
+                'vnp': 'мои действия',
+                'url': try_get_url('account_activity', current_app=APP_LABEL)
+            },
         ]
 
     def construct_index_list(self):
@@ -83,6 +90,38 @@ class AccountSettingsView(AccountMixin, BaseSiteMixin, TemplateView):
         return context
 
 
+class UserActivityView(AccountMixin, BaseSiteMixin, TemplateView):
+    """Журнал действий пользователя"""
+
+    template_name = 'account/user_activity.html'
+    paginator_class = Paginator
+    page_size = 50
+    page_kwarg = 'page'
+
+    def get_action_list(self):
+        """Записи журнала по индексу (user, action_time)"""
+        return (
+            LogEntrySite.objects.filter(user=self.request.user)
+            .select_related('content_type')
+            .order_by('-action_time')
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = self.paginator_class(
+            self.get_action_list(), self.page_size
+        )
+        page_obj = paginator.get_page(self.request.GET.get(self.page_kwarg))
+        context.update(
+            title='Мои действия',
+            action_list=page_obj,
+            page_range=paginator.get_elided_page_range(page_obj.number),
+            page_var=self.page_kwarg,
+            pagination_required=paginator.count > self.page_size,
+        )
+        return context
+
+
 class UserPasswordChangeView(AccountMixin, BaseSiteMixin, PasswordChangeView):
     """Изменение пароля своей учетной записи"""
 
@@ -158,8 +197,7 @@ class UserSettingsView(AccountMixin, BaseSiteMixin, FormView):
         kwargs["count_columns"] = self.count_columns
         kwargs["first_column"] = self.first_column
         kwargs["choices"] = self.get_choices()
-        self.user_settings = UserSettings.objects.get(user=self.request.user)
-        settings = self.user_settings.get_settings()
+        settings = UserSettings.objects.get_settings(self.request.user.pk)
         kwargs["settings"] = settings.get(self.name_settings)
 
         return kwargs
@@ -178,7 +216,8 @@ class UserSettingsView(AccountMixin, BaseSiteMixin, FormView):
 
     def form_valid(self, form):
         if form.has_changed():
-            self.user_settings.update_settings(
+            user_settings = UserSettings.objects.get(user=self.request.user)
+            user_settings.update_settings(
                 self.name_settings, form.cleaned_data
             )
             success_message = format_html('Настройки успешно изменены.')
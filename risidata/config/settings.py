@@ -44,7 +44,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
-    'debug_toolbar',
     # 'smart_selects',
 
     'core.apps.CoreConfig',
@@ -63,10 +62,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    'core.middleware.PerformanceMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -100,6 +102,20 @@ DATABASES = {
 }
 
 
+# Кэш общий для всех процессов сервера: в нем хранятся версии кэшированных
+# данных (core.utils.get_cache_version), изменение версии в одном процессе
+# должно быть видно остальным
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -154,3 +170,24 @@ INTERNAL_IPS = [
     "127.0.0.1",
     '192.168.112.91',
 ]
+
+# Замеры представлений (core.middleware.PerformanceMiddleware):
+# количество замеров на адрес для /performance/
+PERFORMANCE_HISTORY_SIZE = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
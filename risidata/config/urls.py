@@ -20,11 +20,14 @@ from django.urls import path, include
 from django.views.i18n import JavaScriptCatalog
 
 from config import settings
+from core.views import AutocompleteView, performance_stats
 from risi.views import pageNotFound
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('jsi18n/', JavaScriptCatalog.as_view(), name='jsi18n'),
+    path('performance/', performance_stats, name='performance_stats'),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
     # path(r'^chaining/', include('smart_selects.urls')),
     path('', include('users.urls')),
     path('', include('account.urls')),
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, pre_delete, pre_save
 
 
 class ContractConfig(AppConfig):
@@ -8,3 +9,37 @@ class ContractConfig(AppConfig):
 
     def ready(self):
         super().ready()
+        from contract import hours, search
+        from contract.models import Contract, Member, TimeWork
+        from contract.statistics import (
+            contract_post_delete, contract_post_save, contract_pre_delete,
+            contract_pre_save,
+        )
+        from core.signals import connect_post_save, post_bulk_save
+        from database.models import Client
+
+        # Сводка по договорам обновляется при каждом сохранении и удалении
+        pre_save.connect(contract_pre_save, sender=Contract)
+        connect_post_save(contract_post_save, Contract)
+        pre_delete.connect(contract_pre_delete, sender=Contract)
+        post_delete.connect(contract_post_delete, sender=Contract)
+
+        # Полнотекстовый индекс договоров и их документов
+        for model in search.SEARCH_MODELS.values():
+            connect_post_save(
+                search.object_post_save, model, search.objects_post_bulk_save
+            )
+            post_delete.connect(search.object_post_delete, sender=model)
+        connect_post_save(search.client_post_save, Client)
+
+        # Часы по месяцам (TimeWorkMonth) при изменении записей времени
+        # работы и сотрудника участника договора. Списки TimeWork форм
+        # записываются по одной записи (нужны значения до сохранения),
+        # post_bulk_save отправляет табель сотрудника
+        pre_save.connect(hours.timework_pre_save, sender=TimeWork)
+        connect_post_save(hours.timework_post_save, TimeWork)
+        post_bulk_save.connect(hours.timework_post_bulk_save, sender=TimeWork)
+        pre_delete.connect(hours.timework_pre_delete, sender=TimeWork)
+        post_delete.connect(hours.timework_post_delete, sender=TimeWork)
+        pre_save.connect(hours.member_pre_save, sender=Member)
+        connect_post_save(hours.member_post_save, Member)
@@ -0,0 +1,190 @@
+import datetime
+
+from django.db.models import Count, Exists, F, OuterRef, Q, Value
+
+from contract.models import Member, StageMiddleList
+from database.models import (
+    ConditionContract, StatusContract, Client, Employee, StageMiddleName,
+)
+
+# Фильтры боковой панели списка договоров:
+#     'title' - заголовок фильтра,
+#     'model' - модель значений фильтра,
+#     'field' - поле договора со значением фильтра, либо
+#     'related' - модель, связанная с договором, 'related_field' - ее поле
+#         со значением фильтра, 'related_filter' - отбор записей модели,
+#         'date_field' - поле даты, ограничиваемое выбранной датой
+FILTERS = {
+    'condition': {
+        'title': 'состояние:',
+        'model': ConditionContract,
+        'field': 'condition',
+    },
+    'status': {
+        'title': 'статус:',
+        'model': StatusContract,
+        'field': 'status',
+    },
+    'otvetstvenny': {
+        'title': 'ответственный:',
+        'model': Employee,
+        'field': 'otvetstvenny__employee',
+    },
+    'soprovojdenie': {
+        'title': 'сопровождение:',
+        'model': Employee,
+        'field': 'soprovojdenie__employee',
+    },
+    'ispolnitel': {
+        'title': 'исполнитель:',
+        'model': Employee,
+        'related': Member,
+        'related_field': 'employee',
+        'related_filter': {'ispolnitel': True},
+    },
+    'client': {
+        'title': 'заказчик:',
+        'model': Client,
+        'field': 'client',
+    },
+    'middlename': {
+        'title': 'этапы выполнения:',
+        'model': StageMiddleName,
+        'related': StageMiddleList,
+        'related_field': 'name',
+        'date_field': 'date_end_prognoz',
+    },
+}
+DATE_VAR = 'date'
+
+
+def get_selected(params):
+    """
+    Выбранные значения фильтров из GET запроса: ({name: id}, дата).
+    Некорректные значения не учитываются
+    """
+    selected = {}
+    for name in FILTERS:
+        try:
+            selected[name] = int(params.get(name, ''))
+        except ValueError:
+            pass
+    try:
+        date = datetime.date.fromisoformat(params.get(DATE_VAR, ''))
+    except ValueError:
+        date = None
+    return selected, date
+
+
+def get_related_queryset(opts, date=None):
+    """Записи связанной модели фильтра с ограничением по дате"""
+    queryset = opts['related']._default_manager.filter(
+        **opts.get('related_filter', {})
+    )
+    if date is not None and 'date_field' in opts:
+        queryset = queryset.filter(**{f'{opts["date_field"]}__lte': date})
+    return queryset
+
+
+def get_filter_query(name, value, date=None):
+    """
+    Условие фильтра: сравнение поля договора или Exists по связанной модели
+    (без выборки списков id договоров)
+    """
+    opts = FILTERS[name]
+    if 'related' not in opts:
+        return Q((opts['field'], value))
+    return Q(Exists(
+        get_related_queryset(opts, date).filter(
+            contract=OuterRef('pk'), **{opts['related_field']: value}
+        )
+    ))
+
+
+def get_query(selected, date=None, exclude=None):
+    """Условие всех выбранных фильтров, кроме exclude"""
+    query = Q()
+    for name, value in selected.items():
+        if name != exclude:
+            query &= get_filter_query(name, value, date)
+    return query
+
+
+def get_counts(queryset, selected, date=None):
+    """
+    Количество договоров по значениям каждого фильтра одним запросом
+    (UNION ALL группировок): {name: {id: count}}. Для фильтра учитываются
+    выбранные значения остальных фильтров
+    """
+    queryset = queryset.order_by()
+    parts = []
+    for name, opts in FILTERS.items():
+        contracts = queryset.filter(get_query(selected, date, exclude=name))
+        if 'related' in opts:
+            part = get_related_queryset(opts, date).filter(
+                contract__in=contracts.values('pk')
+            )
+            key = opts['related_field']
+            count = Count('contract', distinct=True)
+        else:
+            part, key, count = contracts, opts['field'], Count('pk')
+        parts.append(
+            part.order_by()
+            .filter(**{f'{key}__isnull': False})
+            .annotate(filter_name=Value(name), filter_key=F(key))
+            .values('filter_name', 'filter_key')
+            .annotate(filter_count=count)
+            .values_list('filter_name', 'filter_key', 'filter_count')
+        )
+    counts = {name: {} for name in FILTERS}
+    for name, key, count in parts[0].union(*parts[1:], all=True):
+        counts[name][key] = count
+    return counts
+
+
+def get_filters(queryset, params):
+    """
+    Фильтры боковой панели и выбранная дата: ({name: {'title', 'name',
+    'select', 'queryitems', 'date'}}, date), queryitems - [(id,
+    наименование, количество)] значений с договорами и выбранного
+    значения (в том числе без договоров). Наименования читаются одним
+    запросом на модель
+    """
+    selected, date = get_selected(params)
+    counts = get_counts(queryset, selected, date)
+    for name, key in selected.items():
+        counts[name].setdefault(key, 0)
+
+    keys = {}
+    for name, opts in FILTERS.items():
+        keys.setdefault(opts['model'], set()).update(counts[name])
+    names = {
+        model: model._base_manager.in_bulk(model_keys)
+        for model, model_keys in keys.items()
+    }
+
+    filters = {}
+    for name, opts in FILTERS.items():
+        objects = names[opts['model']]
+        queryitems = [
+            (key, str(objects[key]), count)
+            for key, count in counts[name].items()
+            if key in objects
+        ]
+        queryitems.sort(key=lambda item: item[1].lower())
+        filters[name] = {
+            'title': opts['title'],
+            'name': name,
+            'select': selected.get(name),
+            'queryitems': queryitems,
+            'date': 'date_field' in opts,
+        }
+    return filters, date
+
+
+def filter_contracts(queryset, params):
+    """Договора queryset по выбранным фильтрам GET запроса"""
+    selected, date = get_selected(params)
+    if not selected:
+        return queryset
+    return queryset.filter(get_query(selected, date))
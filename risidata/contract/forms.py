@@ -6,6 +6,7 @@ from django.contrib.admin.widgets import (
 )
 from django.db.models import Q
 
+from core.choices import CachedModelChoiceField
 from core.forms import HELP_MAX_SYMBOL, MAX_LENGTH
 from contract.models import (
     Contract, Member, Calculation,
@@ -20,6 +21,7 @@ from database.models import (
     Client,
 )
 from core.widgets import (
+    AutocompleteSelect,
     FilteredSelectMultiple,
     DateWidget,
 )
@@ -57,7 +59,7 @@ class ContractForm(forms.ModelForm):
         label='Комментарий',
         widget=forms.Textarea(attrs={'cols': 50, 'rows': 3}),
     )
-    condition = forms.ModelChoiceField(
+    condition = CachedModelChoiceField(
         queryset=ConditionContract.objects.all(),
         required=False,
         label='Состояние договора',
@@ -68,7 +70,7 @@ class ContractForm(forms.ModelForm):
     guarantee_letter = forms.BooleanField(
         initial=False, required=False, label='Гарантийное письмо'
     )
-    status = forms.ModelChoiceField(
+    status = CachedModelChoiceField(
         queryset=StatusContract.objects.all(),
         required=False,
         label='Статус договора',
@@ -105,19 +107,21 @@ class ContractForm(forms.ModelForm):
     #     required=False,
     #     label='Контроль военного представительства'
     # )
-    client = forms.ModelChoiceField(
+    client = CachedModelChoiceField(
         queryset=Client.objects.all(),
         required=False,
         label='Заказчик',
+        widget=AutocompleteSelect(Contract._meta.get_field('client')),
     )
     city = forms.CharField(max_length=255, required=False, label='Город')
     inn = forms.CharField(max_length=255, required=False, label='ИНН')
     department = forms.CharField(max_length=255, required=False,
                                  label='Ведомство')
-    great_client = forms.ModelChoiceField(
+    great_client = CachedModelChoiceField(
         queryset=Client.objects.all(),
         required=False,
         label='Головной исполнитель',
+        widget=AutocompleteSelect(Contract._meta.get_field('great_client')),
     )
     great_department = forms.CharField(
         max_length=255,
@@ -235,6 +239,7 @@ class CalculationForm(ContractRelatedForm):
 class MemberForm(ContractRelatedForm):
     employee = forms.ModelChoiceField(
         queryset=Employee.objects.all(), label='Сотрудник',
+        widget=AutocompleteSelect(Member._meta.get_field('employee')),
     )
     # function = forms.CharField(
     #     max_length=500,
@@ -323,7 +328,7 @@ class StageAddForm(forms.Form):
 
 
 class StageBeginListForm(ContractRelatedForm):
-    name = forms.ModelChoiceField(
+    name = CachedModelChoiceField(
         queryset=StageBeginName.objects.all(), required=False,
         label='Этапы подготовки',
     )
@@ -365,7 +370,7 @@ class StageBeginListForm(ContractRelatedForm):
 
 
 class StageMiddleListForm(ContractRelatedForm):
-    name = forms.ModelChoiceField(
+    name = CachedModelChoiceField(
         queryset=StageMiddleName.objects.all(), required=False,
         label='Этапы выполнения',
     )
@@ -403,7 +408,7 @@ class StageMiddleListForm(ContractRelatedForm):
 
 
 class StageEndListForm(ContractRelatedForm):
-    name = forms.ModelChoiceField(
+    name = CachedModelChoiceField(
         queryset=StageEndName.objects.all(), required=False,
         label='Этапы завершения',
     )
@@ -561,7 +566,8 @@ class ContactForm(ContractRelatedForm):
 
 class TimeWorkForm(forms.ModelForm):
     contract = forms.ModelChoiceField(
-        queryset=Contract.objects.all(), label='Договор'
+        queryset=Contract.objects.all(), label='Договор',
+        widget=AutocompleteSelect(TimeWork._meta.get_field('contract')),
     )
     employee = forms.ModelChoiceField(
         queryset=Employee.objects.all(), label='Сотрудник',
@@ -599,3 +605,56 @@ class SetTimeWorkForm(forms.ModelForm):
         fields = ['full_name', 'tabel', 'norma', 'date']
         readonly_fields = ('full_name', 'tabel', 'norma')
 
+
+class TimeSheetForm(forms.Form):
+    """
+    Табель сотрудника (contract.timesheet.TimeSheet): поле часов на
+    каждую ячейку договор/день. Сумма часов за день - не более 24
+    """
+
+    def __init__(self, timesheet, *args, **kwargs):
+        kwargs.setdefault('initial', timesheet.get_initial())
+        super().__init__(*args, **kwargs)
+        self.timesheet = timesheet
+        for contract_id, date, name in timesheet.get_fields():
+            self.fields[name] = forms.DecimalField(
+                max_value=24, min_value=0, max_digits=3, decimal_places=1,
+                required=False, label=f'{date:%d.%m.%Y}',
+                widget=forms.NumberInput(
+                    attrs={'step': '0.5', 'class': 'vTimeSheetField'}
+                ),
+            )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        totals = {}
+        for contract_id, date, name in self.timesheet.get_fields():
+            totals[date] = totals.get(date, 0) + (cleaned_data.get(name) or 0)
+        for date, total in totals.items():
+            if total > 24:
+                raise ValidationError(
+                    'Сумма часов за %(date)s больше 24',
+                    params={'date': f'{date:%d.%m.%Y}'},
+                )
+        return cleaned_data
+
+    def get_rows(self):
+        """Строки табеля: [(договор, [поле ячейки], часы за период)]"""
+        rows = []
+        for contract in self.timesheet.contracts:
+            fields = [
+                self[self.timesheet.get_field_name(contract.pk, date)]
+                for date in self.timesheet.days
+            ]
+            rows.append((
+                contract,
+                fields,
+                sum(self.get_value(field) for field in fields),
+            ))
+        return rows
+
+    def get_value(self, bound_field):
+        try:
+            return bound_field.field.clean(bound_field.value()) or 0
+        except ValidationError:
+            return 0
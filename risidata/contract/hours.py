@@ -0,0 +1,358 @@
+import datetime
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from contract.models import Contract, TimeWork, TimeWorkMonth
+from database.models import Division, Employee
+
+# Группировки отчета по часам: заголовок, модель значений, поле записей
+# TimeWork ('raw') и поле часов по месяцам TimeWorkMonth ('rollup')
+GROUPS = {
+    'employee': {
+        'title': 'Сотрудник',
+        'model': Employee,
+        'raw': 'member__employee',
+        'rollup': 'employee',
+    },
+    'division': {
+        'title': 'Подразделение',
+        'model': Division,
+        'raw': 'member__employee__division',
+        'rollup': 'employee__division',
+    },
+    'contract': {
+        'title': 'Договор',
+        'model': Contract,
+        'raw': 'contract',
+        'rollup': 'contract',
+    },
+    'month': {
+        'title': 'Месяц',
+        'raw': 'month',
+        'rollup': 'month',
+    },
+}
+DEFAULT_GROUPS = ('employee',)
+NORMA_RE = re.compile(r'\d+(?:[.,]\d+)?')
+HOURS_PLACES = Decimal('0.1')
+# Поля записи TimeWork, определяющие ее строку часов по месяцам
+ROLLUP_FIELDS = ('date', 'member', 'member_id')
+ROLLUP_KEYS = '_rollup_keys'
+# Пересчет, отложенный до выхода из defer_rollup(): {(база, месяц,
+# сотрудник)}
+pending_rollup = ContextVar('pending_rollup', default=None)
+
+
+def get_month(value, default=None):
+    """Первый день месяца из строки 'ГГГГ-ММ' или default"""
+    try:
+        return datetime.datetime.strptime(value or '', '%Y-%m').date()
+    except ValueError:
+        return default
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def count_months(start, end):
+    """Количество месяцев с start по end включительно"""
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def parse_norma(value):
+    """Норма часов сотрудника за месяц (Employee.norma) или None"""
+    match = NORMA_RE.search(value or '')
+    return Decimal(match.group().replace(',', '.')) if match else None
+
+
+def get_raw_hours(start, end, employee_id=None, using=None):
+    """
+    Часы записей TimeWork за месяцы start - end по сотруднику, договору и
+    месяцу (группировка по TruncMonth в базе)
+    """
+    queryset = TimeWork.objects.using(using).filter(
+        date__gte=start, date__lt=add_months(end, 1)
+    )
+    if employee_id is not None:
+        queryset = queryset.filter(member__employee_id=employee_id)
+    return (
+        queryset.annotate(month=TruncMonth('date'))
+        .order_by()
+        .values('month', 'member__employee', 'contract')
+        .annotate(hours=Sum('time'))
+    )
+
+
+def refresh_rollup(start=None, end=None, employee_id=None, using=None):
+    """
+    Пересчет часов по месяцам start - end (по умолчанию - все месяцы с
+    записями) в одной транзакции, при employee_id - только по сотруднику.
+    Возвращает количество строк
+    """
+    using = using or router.db_for_write(TimeWorkMonth)
+    if start is None or end is None:
+        dates = TimeWork.objects.using(using).filter(
+            date__isnull=False
+        ).order_by('date').values_list('date', flat=True)
+        first, last = dates.first(), dates.last()
+        if first is None:
+            start = end = datetime.date.today().replace(day=1)
+        else:
+            start = start or first.replace(day=1)
+            end = end or last.replace(day=1)
+    rows = [
+        TimeWorkMonth(
+            month=values['month'],
+            employee_id=values['member__employee'],
+            contract_id=values['contract'],
+            hours=values['hours'] or 0,
+        )
+        for values in get_raw_hours(start, end, employee_id, using)
+    ]
+    stale = TimeWorkMonth.objects.using(using).filter(
+        month__range=(start, end)
+    )
+    if employee_id is not None:
+        stale = stale.filter(employee_id=employee_id)
+    with transaction.atomic(using=using):
+        stale.delete()
+        TimeWorkMonth.objects.using(using).bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def get_rollup_keys(rows):
+    """{(месяц, сотрудник)} строк часов по месяцам для [(дата, сотрудник)]"""
+    return {
+        (date.replace(day=1), employee_id)
+        for date, employee_id in rows
+        if date is not None
+    }
+
+
+def get_stored_keys(pks, using):
+    """Строки часов по месяцам записей TimeWork по значениям в базе"""
+    return get_rollup_keys(
+        TimeWork._base_manager.using(using)
+        .filter(pk__in=pks)
+        .values_list('date', 'member__employee_id')
+    )
+
+
+def refresh_rollup_keys(keys, using=None):
+    """
+    Пересчет строк часов по месяцам {(месяц, сотрудник)} в текущей
+    транзакции, внутри defer_rollup() - при выходе из него. Без
+    сотрудника пересчитывается весь месяц
+    """
+    using = using or router.db_for_write(TimeWorkMonth)
+    pending = pending_rollup.get()
+    if pending is not None:
+        pending.update((using, *key) for key in keys)
+        return
+    for month, employee_id in keys:
+        refresh_rollup(month, month, employee_id, using)
+
+
+@contextmanager
+def defer_rollup():
+    """
+    Пересчет часов по месяцам один раз для всех записей TimeWork,
+    измененных внутри блока. Используется внутри транзакции: при
+    исключении пересчет не выполняется
+    """
+    if pending_rollup.get() is not None:
+        yield
+        return
+    pending = set()
+    token = pending_rollup.set(pending)
+    try:
+        yield
+    finally:
+        pending_rollup.reset(token)
+    for using, month, employee_id in pending:
+        refresh_rollup(month, month, employee_id, using)
+
+
+def timework_pre_save(sender, instance, raw=False, using=None,
+                      update_fields=None, **kwargs):
+    """Строка часов по месяцам записи до сохранения"""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields).intersection(
+            ROLLUP_FIELDS
+    ):
+        return
+    instance.__dict__[ROLLUP_KEYS] = get_stored_keys([instance.pk], using)
+
+
+def timework_post_save(sender, instance, raw=False, using=None, **kwargs):
+    """Пересчет строк часов по месяцам до и после сохранения записи"""
+    keys = instance.__dict__.pop(ROLLUP_KEYS, set())
+    if raw:
+        return
+    refresh_rollup_keys(keys | get_stored_keys([instance.pk], using), using)
+
+
+def timework_post_bulk_save(sender, instances, using=None, **kwargs):
+    """
+    Пересчет строк часов по месяцам записей, записанных списком (дата и
+    сотрудник записей при этом не изменяются)
+    """
+    refresh_rollup_keys(
+        get_stored_keys([obj.pk for obj in instances], using), using
+    )
+
+
+def timework_pre_delete(sender, instance, using=None, **kwargs):
+    instance.__dict__[ROLLUP_KEYS] = get_stored_keys([instance.pk], using)
+
+
+def timework_post_delete(sender, instance, using=None, **kwargs):
+    """Пересчет строки часов по месяцам удаленной записи"""
+    refresh_rollup_keys(instance.__dict__.pop(ROLLUP_KEYS, set()), using)
+
+
+def member_pre_save(sender, instance, raw=False, using=None,
+                    update_fields=None, **kwargs):
+    """Сотрудник участника договора до сохранения"""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields).intersection(
+            ('employee', 'employee_id')
+    ):
+        return
+    instance.__dict__[ROLLUP_KEYS] = list(
+        sender._base_manager.using(using)
+        .filter(pk=instance.pk)
+        .values_list('employee_id', flat=True)
+    )
+
+
+def member_post_save(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Перенос часов записей участника договора на другого сотрудника:
+    пересчет месяцев записей у прежнего и нового сотрудника
+    """
+    old_employees = instance.__dict__.pop(ROLLUP_KEYS, [])
+    if raw or not old_employees or old_employees[0] == instance.employee_id:
+        return
+    months = TimeWork._base_manager.using(using).filter(
+        member=instance
+    ).dates('date', 'month')
+    refresh_rollup_keys(
+        {
+            (month, employee_id)
+            for month in months
+            for employee_id in (old_employees[0], instance.employee_id)
+        },
+        using,
+    )
+
+
+def get_hours(start, end, groups, use_rollup=True, using=None):
+    """
+    Часы за месяцы start - end по группировкам groups:
+    {(значения группировок): часы}. Завершенные месяцы читаются из
+    часов по месяцам, текущий и последующие - из записей TimeWork
+    """
+    using = using or router.db_for_read(TimeWork)
+    current = datetime.date.today().replace(day=1)
+    parts = []
+    raw_start = start
+    if use_rollup and start < current:
+        rollup_end = min(end, add_months(current, -1))
+        raw_start = add_months(rollup_end, 1)
+        parts.append(
+            TimeWorkMonth.objects.using(using)
+            .filter(month__range=(start, rollup_end))
+            .order_by()
+            .values_list(*(GROUPS[name]['rollup'] for name in groups))
+            .annotate(total=Sum('hours'))
+        )
+    if raw_start <= end:
+        queryset = TimeWork.objects.using(using).filter(
+            date__gte=raw_start, date__lt=add_months(end, 1)
+        )
+        if 'month' in groups:
+            queryset = queryset.annotate(month=TruncMonth('date'))
+        parts.append(
+            queryset.order_by()
+            .values_list(*(GROUPS[name]['raw'] for name in groups))
+            .annotate(total=Sum('time'))
+        )
+    hours = {}
+    for part in parts:
+        for *keys, total in part:
+            keys = tuple(keys)
+            hours[keys] = hours.get(keys, 0) + (total or 0)
+    return {
+        keys: Decimal(total).quantize(HOURS_PLACES)
+        for keys, total in hours.items()
+    }
+
+
+def get_report(start, end, groups=DEFAULT_GROUPS, use_rollup=True):
+    """
+    Строки отчета по часам: [(наименования группировок, часы, норма,
+    отклонение)] и итог. Норма - Employee.norma за месяц, умноженная на
+    количество месяцев строки; определяется при группировке по сотруднику
+    """
+    hours = get_hours(start, end, groups, use_rollup)
+    names = {}
+    for index, name in enumerate(groups):
+        model = GROUPS[name].get('model')
+        if model is not None:
+            keys = {key[index] for key in hours if key[index] is not None}
+            names[name] = model._base_manager.in_bulk(keys)
+    norma = {}
+    if 'employee' in groups:
+        norma = {
+            pk: parse_norma(employee.norma)
+            for pk, employee in names['employee'].items()
+        }
+    months = 1 if 'month' in groups else count_months(start, end)
+
+    rows = []
+    for key, total in sorted(hours.items(), key=get_sort_key(groups, names)):
+        labels = [
+            get_label(name, value, names) for name, value in zip(groups, key)
+        ]
+        row_norma = None
+        if 'employee' in groups:
+            employee_norma = norma.get(key[groups.index('employee')])
+            if employee_norma is not None:
+                row_norma = employee_norma * months
+        rows.append((
+            labels,
+            total,
+            row_norma,
+            None if row_norma is None else total - row_norma,
+        ))
+    return rows, sum(hours.values(), Decimal(0))
+
+
+def get_label(name, value, names):
+    if value is None:
+        return 'не указано'
+    if name == 'month':
+        return f'{value:%m.%Y}'
+    return str(names[name].get(value, value))
+
+
+def get_sort_key(groups, names):
+    """Сортировка строк: месяцы по дате, остальное по наименованию"""
+    def sort_key(item):
+        return [
+            (value is None, value if name == 'month' and value else
+             get_label(name, value, names).lower())
+            for name, value in zip(groups, item[0])
+        ]
+    return sort_key
@@ -0,0 +1,138 @@
+import hashlib
+
+from core.choices import choices_cache
+from core.utils import get_cache_version
+from database.models import Client, Department, Post, SubDivision
+
+# Данные, заполняемые на странице при выборе значения в списке:
+#     'model' - модель данных, 'fields' - поля данных,
+#     'key' - поле отбора записей (данные - список записей с выбранным
+#         значением поля, без значения - все записи), иначе данные -
+#         значения полей записи с выбранным pk,
+#     'depends' - справочники, от которых зависят данные (версия ответа),
+#     'prefetch' - все данные можно получить одним запросом при загрузке
+#         страницы
+LOOKUPS = {
+    'client_name': {
+        'model': Client,
+        'fields': ('city', 'inn', 'department__name'),
+        'depends': (Client, Department),
+    },
+    'post_abbr': {
+        'model': Post,
+        'fields': ('abbr',),
+        'depends': (Post,),
+        'prefetch': True,
+    },
+    'division': {
+        'model': SubDivision,
+        'key': 'division',
+        'fields': ('id', 'name'),
+        'depends': (SubDivision,),
+        'prefetch': True,
+    },
+}
+MAX_LOOKUPS = 100
+
+
+def get_version(elements):
+    """
+    Версия данных элементов: изменяется при изменении справочников, от
+    которых они зависят (версии core.choices)
+    """
+    models = {
+        model for element in elements for model in LOOKUPS[element]['depends']
+    }
+    versions = sorted(
+        f'{model._meta.label_lower}:'
+        f'{get_cache_version(choices_cache.get_version_key(model))}'
+        for model in models
+    )
+    return hashlib.md5(';'.join(versions).encode()).hexdigest()
+
+
+def parse_id(value):
+    """pk из значения списка или None (значение не выбрано)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_empty_data(element):
+    opts = LOOKUPS[element]
+    if 'key' in opts:
+        return []
+    return {field: '' for field in opts['fields']}
+
+
+def get_item(opts, values):
+    if 'key' in opts:
+        return {'id': values['id'], 'text': values['name']}
+    return {
+        field: '' if values[field] is None else values[field]
+        for field in opts['fields']
+    }
+
+
+def get_data(element, ids=None):
+    """
+    Данные элемента одним запросом values(): {id: data} для выбранных ids
+    (None в ids - значение не выбрано), при ids=None - для всех значений
+    """
+    opts = LOOKUPS[element]
+    queryset = opts['model']._default_manager.all()
+    ids = None if ids is None else set(ids)
+    if 'key' in opts:
+        key = f'{opts["key"]}_id'
+        if ids is not None and None not in ids:
+            queryset = queryset.filter(**{f'{key}__in': ids})
+        data = {pk: [] for pk in ids or ()}
+        data[None] = []
+        for values in queryset.values(key, *opts['fields']):
+            item = get_item(opts, values)
+            data.setdefault(values[key], []).append(item)
+            data[None].append(item)
+        return data
+
+    data = {pk: get_empty_data(element) for pk in ids or ()}
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids - {None})
+    for values in queryset.values('pk', *opts['fields']):
+        data[values['pk']] = get_item(opts, values)
+    return data
+
+
+def format_id(pk):
+    return '' if pk is None else str(pk)
+
+
+def get_lookups(pairs, prefetch=()):
+    """
+    Ответ на запросы [(element, id)] и полные данные элементов prefetch:
+    {'results': [{'element', 'id', 'data'}], 'prefetch': {element:
+    {id: data}}}. Один запрос на элемент
+    """
+    requested = {}
+    for element, pk in pairs:
+        requested.setdefault(element, set()).add(pk)
+    data = {
+        element: get_data(element, ids) for element, ids in requested.items()
+    }
+    return {
+        'results': [
+            {
+                'element': element,
+                'id': format_id(pk),
+                'data': data[element].get(pk, get_empty_data(element)),
+            }
+            for element, pk in pairs
+        ],
+        'prefetch': {
+            element: {
+                format_id(pk): element_data
+                for pk, element_data in get_data(element).items()
+            }
+            for element in prefetch
+        },
+    }
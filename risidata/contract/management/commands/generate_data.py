@@ -0,0 +1,348 @@
+import datetime
+import json
+import random
+from decimal import Decimal
+from itertools import chain
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from contract.models import (
+    Contract, Calculation, Member, Letter, AddAgreement, Contact, TimeWork,
+    StageBeginList, StageMiddleList, StageEndList, INCOMING, OUTGOING,
+    choices_contract_control_price,
+)
+from contract.hours import refresh_rollup
+from contract.search import rebuild_search_index
+from contract.statistics import rebuild_statistics
+from database.models import (
+    Post, Division, SubDivision, ConditionContract, StatusContract,
+    Department, Client, StageBeginName, StageMiddleName, StageEndName,
+    Employee,
+)
+from risi.models import ADDITION, CHANGE, LogEntrySite
+
+LAST_NAMES = ('Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов',
+              'Попов', 'Соколов', 'Лебедев', 'Козлов', 'Новиков')
+FIRST_NAMES = ('Алексей', 'Борис', 'Виктор', 'Геннадий', 'Дмитрий',
+               'Евгений', 'Иван', 'Михаил', 'Николай', 'Сергей')
+MIDDLE_NAMES = ('Алексеевич', 'Борисович', 'Викторович', 'Дмитриевич',
+                'Иванович', 'Михайлович', 'Николаевич', 'Сергеевич')
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Самара')
+REFERENCE_DATA = {
+    Post: 20,
+    Division: 10,
+    Department: 10,
+    ConditionContract: 6,
+    StatusContract: 6,
+    StageBeginName: 8,
+    StageMiddleName: 12,
+    StageEndName: 8,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнение базы данных синтетическими договорами со связанными '
+        'записями: сотрудники договора, этапы, письма, доп. соглашения, '
+        'контакты, время работы, журнал изменений и справочники.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contracts', type=int, default=1000,
+            help='Количество договоров (по умолчанию 1000)',
+        )
+        parser.add_argument(
+            '--employees', type=int, default=200,
+            help='Количество сотрудников (по умолчанию 200)',
+        )
+        parser.add_argument(
+            '--clients', type=int, default=300,
+            help='Количество организаций (по умолчанию 300)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество договоров в одной транзакции',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = datetime.date.today()
+
+        with transaction.atomic():
+            reference = self.create_reference_data(options)
+            self.user = self.get_user()
+        self.content_types = {
+            model: ContentType.objects.get_for_model(model).pk
+            for model in (Contract, Letter, AddAgreement, Member)
+        }
+
+        total = options['contracts']
+        created = 0
+        while created < total:
+            count = min(self.batch_size, total - created)
+            with transaction.atomic():
+                self.create_contracts(created, count, reference)
+            created += count
+            self.stdout.write(f'договоров: {created} из {total}')
+        # Договора и время работы созданы bulk_create без обработчиков
+        # сохранения
+        rebuild_statistics()
+        refresh_rollup()
+        with transaction.atomic():
+            rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Данные сформированы'))
+
+    def get_date(self, days=1500):
+        return self.today - datetime.timedelta(
+            days=self.random.randint(0, days)
+        )
+
+    def get_name(self):
+        return (
+            self.random.choice(LAST_NAMES),
+            self.random.choice(FIRST_NAMES),
+            self.random.choice(MIDDLE_NAMES),
+        )
+
+    def bulk_create_names(self, model, prefix, count, **kwargs):
+        """Записи справочника с уникальными наименованиями"""
+        names = [f'{prefix} {index}' for index in range(1, count + 1)]
+        model.objects.bulk_create(
+            [model(name=name, **kwargs) for name in names],
+            ignore_conflicts=True,
+        )
+        return list(
+            model.objects.filter(name__in=names).values_list('pk', flat=True)
+        )
+
+    def create_reference_data(self, options):
+        reference = {
+            model: self.bulk_create_names(
+                model, model._meta.verbose_name.capitalize(), count
+            )
+            for model, count in REFERENCE_DATA.items()
+        }
+        for division_id in reference[Division][:5]:
+            self.bulk_create_names(
+                SubDivision, f'Субподразделение {division_id}', 3,
+                division_id=division_id,
+            )
+
+        names = [f'Организация {index}'
+                 for index in range(1, options['clients'] + 1)]
+        Client.objects.bulk_create(
+            [
+                Client(
+                    name=name,
+                    city=self.random.choice(CITIES),
+                    inn=self.random.randint(10 ** 9, 10 ** 10 - 1),
+                    department_id=self.random.choice(reference[Department]),
+                )
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+        reference[Client] = list(
+            Client.objects.filter(name__in=names).values_list('pk', flat=True)
+        )
+
+        tabel = (Employee.objects.order_by('-tabel')
+                 .values_list('tabel', flat=True).first() or 0)
+        employees = []
+        for index in range(1, options['employees'] + 1):
+            last_name, first_name, middle_name = self.get_name()
+            employees.append(Employee(
+                last_name=last_name,
+                first_name=first_name,
+                middle_name=middle_name,
+                tabel=tabel + index,
+                post_id=self.random.choice(reference[Post]),
+                division_id=self.random.choice(reference[Division]),
+            ))
+        Employee.objects.bulk_create(employees)
+        reference[Employee] = list(
+            Employee.objects.values_list('pk', flat=True)
+        )
+        if len(reference[Employee]) < 4:
+            raise CommandError('Требуется не менее 4 сотрудников')
+        return reference
+
+    def get_user(self):
+        user_model = get_user_model()
+        user = user_model.objects.filter(is_superuser=True).first()
+        if user is None:
+            user = user_model.objects.filter(username='generator').first()
+        if user is None:
+            user = user_model.objects.create_user(
+                'generator', last_name='Генератор', first_name='Данных'
+            )
+        return user
+
+    def create_contracts(self, start, count, reference):
+        choice = self.random.choice
+        randint = self.random.randint
+        control_price = [value for value, _ in choices_contract_control_price]
+
+        contracts = []
+        for index in range(start + 1, start + count + 1):
+            price = Decimal(randint(10 ** 5, 10 ** 8))
+            date = self.get_date()
+            contracts.append(Contract(
+                number=f'{randint(1, 999)}/{date.year}-{index}',
+                date=date,
+                eosdo=f'ЕОСДО-{index}',
+                title=f'Выполнение работ по договору {index}',
+                comment='Синтетические данные' if index % 5 else '',
+                condition_id=choice(reference[ConditionContract]),
+                status_id=choice(reference[StatusContract]),
+                client_id=choice(reference[Client]),
+                great_client_id=choice(reference[Client]),
+                concurs=not index % 3,
+                closed=not index % 10,
+                num_ng=randint(1, 100),
+                num_stage=randint(1, 5),
+                igk=f'{randint(10 ** 9, 10 ** 10 - 1)}',
+                date_begin=date,
+                date_end_plan=date + datetime.timedelta(days=365),
+                control_price=choice(control_price),
+                city=choice(CITIES),
+                price_no_nds=price,
+                nds=20,
+                price_plus_nds=price * Decimal('1.2'),
+                summ_nds=price * Decimal('0.2'),
+            ))
+        contracts = Contract.objects.bulk_create(contracts)
+        Calculation.objects.bulk_create(
+            [Calculation(contract=contract) for contract in contracts]
+        )
+
+        members = []
+        for contract in contracts:
+            employees = self.random.sample(reference[Employee], 4)
+            members += [
+                Member(contract=contract, employee_id=employees[0],
+                       otvetstvenny=True, function='Ответственный'),
+                Member(contract=contract, employee_id=employees[1],
+                       soprovojdenie=True, function='Сопровождение'),
+                Member(contract=contract, employee_id=employees[2],
+                       ispolnitel=True, function='Исполнитель'),
+                Member(contract=contract, employee_id=employees[3],
+                       ispolnitel=True, function='Исполнитель'),
+            ]
+        members = Member.objects.bulk_create(members)
+        contract_members = {}
+        for member in members:
+            contract_members.setdefault(member.contract_id, []).append(member)
+        for contract in contracts:
+            contract.otvetstvenny = contract_members[contract.pk][0]
+            contract.soprovojdenie = contract_members[contract.pk][1]
+        Contract.objects.bulk_update(
+            contracts, ['otvetstvenny', 'soprovojdenie']
+        )
+
+        stages = {
+            StageBeginList: reference[StageBeginName],
+            StageMiddleList: reference[StageMiddleName],
+            StageEndList: reference[StageEndName],
+        }
+        stage_lists = {model: [] for model in stages}
+        letters, agreements, contacts, timework = [], [], [], []
+        for contract in contracts:
+            ispolnitel = contract_members[contract.pk][2:]
+            for model, names in stages.items():
+                for _ in range(randint(1, 3)):
+                    stage_lists[model].append(model(
+                        contract=contract,
+                        name_id=choice(names),
+                        ispolnitel=choice(ispolnitel),
+                        date_end_plan=self.get_date(),
+                        date_end_fact=self.get_date(),
+                    ))
+            for number in range(randint(0, 8)):
+                letters.append(Letter(
+                    contract=contract,
+                    number=f'{contract.pk}-{number + 1}',
+                    date=self.get_date(),
+                    ispolnitel=choice(ispolnitel),
+                    status=choice((INCOMING, OUTGOING)),
+                    content=f'Письмо по договору {contract.number}',
+                ))
+            for number in range(randint(0, 3)):
+                agreements.append(AddAgreement(
+                    contract=contract,
+                    number=f'{number + 1}',
+                    date=self.get_date(),
+                    comment='Изменение сроков',
+                ))
+            for _ in range(randint(0, 3)):
+                last_name, first_name, middle_name = self.get_name()
+                contacts.append(Contact(
+                    contract=contract,
+                    last_name=last_name,
+                    first_name=first_name,
+                    middle_name=middle_name,
+                    post='Инженер',
+                    telephone=f'+7 900 {randint(1000000, 9999999)}',
+                    email=f'contact{randint(1, 10 ** 6)}@example.com',
+                ))
+            for _ in range(randint(0, 20)):
+                timework.append(TimeWork(
+                    contract=contract,
+                    member=choice(ispolnitel),
+                    date=self.get_date(90),
+                    time=Decimal(randint(1, 16)) / 2,
+                ))
+        for model, objs in (
+                *stage_lists.items(),
+                (Letter, letters),
+                (AddAgreement, agreements),
+                (Contact, contacts),
+                (TimeWork, timework),
+        ):
+            model.objects.bulk_create(objs, batch_size=1000)
+
+        log_entries = self.get_log_entries(contracts, letters, agreements)
+        for log_entry in log_entries:
+            log_entry.set_change_message_text()
+        LogEntrySite.objects.bulk_create(log_entries, batch_size=1000)
+
+    def get_log_entries(self, contracts, letters, agreements):
+        """Записи журнала: добавление объектов и изменения договоров"""
+        entries = []
+        for obj in chain(contracts, letters, agreements):
+            entries.append(LogEntrySite(
+                user_id=self.user.pk,
+                content_type_id=self.content_types[type(obj)],
+                object_id=str(obj.pk),
+                object_id_int=obj.pk,
+                object_repr=str(obj)[:200],
+                action_flag=ADDITION,
+                change_message=json.dumps([{'added': {}}]),
+            ))
+        for contract in contracts:
+            for _ in range(self.random.randint(0, 5)):
+                fields = self.random.sample(
+                    ['Номер', 'Дата', 'Наименование', 'Статус договора',
+                     'Состояние договора', 'Заказчик'],
+                    2,
+                )
+                entries.append(LogEntrySite(
+                    user_id=self.user.pk,
+                    content_type_id=self.content_types[Contract],
+                    object_id=str(contract.pk),
+                    object_id_int=contract.pk,
+                    object_repr=str(contract)[:200],
+                    action_flag=CHANGE,
+                    change_message=json.dumps(
+                        [{'changed': {'fields': fields}}],
+                        ensure_ascii=False,
+                    ),
+                ))
+        return entries
+
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from contract.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Полное перестроение полнотекстового индекса договоров и их '
+        'документов (SQLite FTS5). Нужно после загрузки данных в обход '
+        'сохранения объектов (bulk_create, update, loaddata).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию "default")',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            count = rebuild_search_index(using=using)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен: записей {count}'
+        ))
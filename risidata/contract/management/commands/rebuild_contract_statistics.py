@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from contract.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        'Полный пересчет сводки по открытым договорам (ContractStatistics). '
+        'Нужен после загрузки данных в обход сохранения договоров '
+        '(bulk_create, update, loaddata).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию "default")',
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_statistics(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводка пересчитана: строк {len(rows)}'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from contract.hours import get_month, refresh_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет часов по месяцам (TimeWorkMonth) из записей времени '
+        'работы. Нужен после изменения записей за завершенные месяцы вне '
+        'табеля сотрудника (список времени по дню, загрузка данных).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', help='Первый месяц, ГГГГ-ММ (по умолчанию - первый '
+                            'месяц с записями)',
+        )
+        parser.add_argument(
+            '--end', help='Последний месяц, ГГГГ-ММ (по умолчанию - '
+                          'последний месяц с записями)',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='База данных (по умолчанию "default")',
+        )
+
+    def handle(self, *args, **options):
+        months = {}
+        for name in ('start', 'end'):
+            value = options[name]
+            months[name] = get_month(value)
+            if value and months[name] is None:
+                raise CommandError(f'Неверный месяц {value}, нужен ГГГГ-ММ')
+        count = refresh_rollup(
+            months['start'], months['end'], using=options['database']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Часы по месяцам пересчитаны: строк {count}'
+        ))
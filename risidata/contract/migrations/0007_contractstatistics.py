@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:27
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_contract_statistics(apps, schema_editor):
+    """Начальное заполнение сводки по открытым договорам"""
+    Contract = apps.get_model('contract', 'Contract')
+    ContractStatistics = apps.get_model('contract', 'ContractStatistics')
+    using = schema_editor.connection.alias
+    contracts = Contract.objects.using(using).filter(closed=False)
+    aggregates = {
+        'count': Count('pk'),
+        'price_no_nds': Sum('price_no_nds'),
+        'price_plus_nds': Sum('price_plus_nds'),
+    }
+    values_list = [('total', None, contracts.aggregate(**aggregates))]
+    for dimension in ('status', 'condition', 'client'):
+        attname = f'{dimension}_id'
+        values_list.extend(
+            (dimension, values[attname], values)
+            for values in contracts.order_by().values(attname).annotate(
+                **aggregates
+            )
+        )
+    ContractStatistics.objects.using(using).bulk_create(
+        ContractStatistics(
+            dimension=dimension,
+            key=key or 0,
+            count=values['count'],
+            price_no_nds=values['price_no_nds'] or 0,
+            price_plus_nds=values['price_plus_nds'] or 0,
+        )
+        for dimension, key, values in values_list
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0006_rename_name_timework_member'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Всего'), ('status', 'Статус договора'), ('condition', 'Состояние договора'), ('client', 'Заказчик')], max_length=15, verbose_name='Разрез')),
+                ('key', models.BigIntegerField(default=0, verbose_name='Значение')),
+                ('count', models.IntegerField(default=0, verbose_name='Открытых договоров')),
+                ('price_no_nds', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Цена без НДС, руб')),
+                ('price_plus_nds', models.DecimalField(decimal_places=2, default=0, max_digits=20, verbose_name='Цена с НДС, руб')),
+            ],
+            options={
+                'verbose_name': 'сводка по договорам',
+                'verbose_name_plural': 'сводка по договорам',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='contract_statistics_dimension_key')],
+            },
+        ),
+        migrations.RunPython(
+            fill_contract_statistics, migrations.RunPython.noop
+        ),
+    ]
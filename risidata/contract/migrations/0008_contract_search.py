@@ -0,0 +1,37 @@
+from django.db import migrations
+
+from contract.search import rebuild_search_index, search_tables
+
+# Полнотекстовый индекс договоров и их документов (SQLite FTS5),
+# rowid записи = pk * 8 + код модели (contract.search.SEARCH_MODELS)
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE contract_search USING fts5(
+        number, body, contract_id UNINDEXED, prefix='2 3'
+    )
+"""
+
+
+def create_search_table(apps, schema_editor):
+    """Индекс создается только для SQLite"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    # Записи строятся так же, как при перестроении индекса
+    rebuild_search_index(schema_editor.connection.alias, apps)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS contract_search')
+        search_tables.discard(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0007_contractstatistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_timework_month(apps, schema_editor):
+    """Начальное заполнение часов по месяцам"""
+    TimeWork = apps.get_model('contract', 'TimeWork')
+    TimeWorkMonth = apps.get_model('contract', 'TimeWorkMonth')
+    using = schema_editor.connection.alias
+    values_list = (
+        TimeWork.objects.using(using)
+        .filter(date__isnull=False)
+        .annotate(month=TruncMonth('date'))
+        .order_by()
+        .values('month', 'member__employee', 'contract')
+        .annotate(hours=Sum('time'))
+    )
+    TimeWorkMonth.objects.using(using).bulk_create(
+        (
+            TimeWorkMonth(
+                month=values['month'],
+                employee_id=values['member__employee'],
+                contract_id=values['contract'],
+                hours=values['hours'] or 0,
+            )
+            for values in values_list
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0008_contract_search'),
+        ('database', '0002_remove_employee_name_remove_employee_post_abbr'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeWorkMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(db_index=True, verbose_name='Месяц')),
+                ('hours', models.DecimalField(decimal_places=1, default=0, max_digits=10, verbose_name='Часы')),
+                ('contract', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contract.contract', verbose_name='Договор')),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='database.employee', verbose_name='Сотрудник')),
+            ],
+            options={
+                'verbose_name': 'часы по месяцам',
+                'verbose_name_plural': 'часы по месяцам',
+                'constraints': [models.UniqueConstraint(fields=('month', 'employee', 'contract'), name='contract_timeworkmonth_month_employee_contract')],
+            },
+        ),
+        migrations.RunPython(fill_timework_month, migrations.RunPython.noop),
+    ]
@@ -468,3 +468,90 @@ class TimeWork(ContractRelated):
 
     def __str__(self):
         return str(self.contract)
+
+
+class ContractStatistics(models.Model):
+    """
+    Сводка по открытым договорам в разрезе статуса, состояния договора и
+    заказчика. Обновляется обработчиками сохранения и удаления договора
+    (contract.statistics), полностью пересчитывается командой
+    rebuild_contract_statistics
+    """
+
+    TOTAL = 'total'
+    STATUS = 'status'
+    CONDITION = 'condition'
+    CLIENT = 'client'
+    DIMENSION_CHOICES = [
+        (TOTAL, 'Всего'),
+        (STATUS, 'Статус договора'),
+        (CONDITION, 'Состояние договора'),
+        (CLIENT, 'Заказчик'),
+    ]
+
+    dimension = models.CharField(
+        'Разрез', max_length=15, choices=DIMENSION_CHOICES
+    )
+    # id значения разреза, 0 - значение не задано
+    key = models.BigIntegerField('Значение', default=0)
+    count = models.IntegerField('Открытых договоров', default=0)
+    price_no_nds = models.DecimalField(
+        max_digits=20, decimal_places=2, default=0,
+        verbose_name='Цена без НДС, руб'
+    )
+    price_plus_nds = models.DecimalField(
+        max_digits=20, decimal_places=2, default=0,
+        verbose_name='Цена с НДС, руб'
+    )
+
+    class Meta:
+        verbose_name = 'сводка по договорам'
+        verbose_name_plural = 'сводка по договорам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dimension', 'key'],
+                name='contract_statistics_dimension_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_dimension_display()}: {self.key}'
+
+
+class TimeWorkMonth(models.Model):
+    """
+    Часы работы по месяцам: сумма TimeWork за месяц по сотруднику и
+    договору. Обновляется при записи TimeWork и командой
+    refresh_timework_rollup (contract.hours), используется отчетом по
+    часам вместо исходных записей завершенных месяцев. Одна строка на
+    месяц, сотрудника и договор: при одновременном пересчете одна из
+    транзакций завершается ошибкой, а не удваивает часы
+    """
+
+    month = models.DateField('Месяц', db_index=True)
+    # Без обратных связей: строки не выводятся среди записей договора и
+    # сотрудника
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='+', verbose_name='Сотрудник',
+    )
+    contract = models.ForeignKey(
+        Contract, on_delete=models.CASCADE, blank=True, null=True,
+        related_name='+', verbose_name='Договор',
+    )
+    hours = models.DecimalField(
+        max_digits=10, decimal_places=1, default=0, verbose_name='Часы'
+    )
+
+    class Meta:
+        verbose_name = 'часы по месяцам'
+        verbose_name_plural = 'часы по месяцам'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'employee', 'contract'],
+                name='contract_timeworkmonth_month_employee_contract',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.month:%m.%Y}: {self.hours}'
@@ -0,0 +1,206 @@
+import re
+
+from django.db import connections, router
+
+from contract.models import Contract, Letter, AddAgreement, Contact
+
+# Полнотекстовый индекс SQLite FTS5: number - номера (больший вес),
+# body - тексты, contract_id - договор записи (не индексируется)
+SEARCH_TABLE = 'contract_search'
+SEARCH_WEIGHTS = (4.0, 1.0, 0.0)
+# Модели индекса: код модели в rowid записи (rowid = pk * 8 + код)
+SEARCH_MODELS = {
+    1: Contract,
+    2: Letter,
+    3: AddAgreement,
+    4: Contact,
+}
+MODEL_CODES = {model: code for code, model in SEARCH_MODELS.items()}
+CODE_BITS = 3
+# Поля записи индекса: (поля number, поля body, поле договора)
+SEARCH_FIELDS = {
+    Contract: (
+        ('number', 'eosdo', 'igk'),
+        ('title', 'comment', 'client__name'),
+        'pk',
+    ),
+    Letter: (('number',), ('content',), 'contract_id'),
+    AddAgreement: (('number',), ('comment',), 'contract_id'),
+    Contact: ((), ('last_name', 'first_name', 'middle_name'), 'contract_id'),
+}
+MAX_TERMS = 10
+SNIPPET_START, SNIPPET_END = '\x02', '\x03'
+# Таблица индекса существует (проверяется один раз для базы)
+search_tables = set()
+
+
+def get_rowid(model, pk):
+    return pk << CODE_BITS | MODEL_CODES[model]
+
+
+def parse_rowid(rowid):
+    """(модель, pk) записи индекса"""
+    return SEARCH_MODELS[rowid & (1 << CODE_BITS) - 1], rowid >> CODE_BITS
+
+
+def search_available(using):
+    """Индекс доступен: база SQLite с таблицей индекса"""
+    if using in search_tables:
+        return True
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if SEARCH_TABLE in connection.introspection.table_names():
+        search_tables.add(using)
+        return True
+    return False
+
+
+def get_documents(model, queryset):
+    """Записи индекса объектов queryset: (rowid, number, body, contract_id)"""
+    number_fields, body_fields, contract_field = SEARCH_FIELDS[model]
+    values_list = queryset.values_list(
+        'pk', contract_field, *number_fields, *body_fields
+    )
+    for values in values_list.iterator(chunk_size=2000):
+        pk, contract_id, *texts = values
+        number = ' '.join(filter(None, texts[:len(number_fields)]))
+        body = ' '.join(filter(None, texts[len(number_fields):]))
+        yield get_rowid(model, pk), number, body, contract_id
+
+
+def delete_documents(model, pks, using):
+    rowids = [get_rowid(model, pk) for pk in pks]
+    with connections[using].cursor() as cursor:
+        for i in range(0, len(rowids), 500):
+            chunk = rowids[i:i + 500]
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN'
+                f' ({", ".join(["%s"] * len(chunk))})',
+                chunk,
+            )
+
+
+def insert_documents(documents, using):
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, number, body, contract_id)'
+            f' VALUES (%s, %s, %s, %s)',
+            documents,
+        )
+
+
+def update_index(model, pks, using=None):
+    """Обновление записей индекса объектов модели в текущей транзакции"""
+    using = using or router.db_for_write(model)
+    pks = [pk for pk in pks if pk is not None]
+    if not pks or not search_available(using):
+        return
+    delete_documents(model, pks, using)
+    queryset = model._base_manager.using(using).filter(pk__in=pks)
+    insert_documents(list(get_documents(model, queryset)), using)
+
+
+def rebuild_search_index(using=None, apps=None):
+    """
+    Полное перестроение индекса, возвращает количество записей. apps -
+    реестр моделей миграции (записи читаются через исторические модели)
+    """
+    using = using or router.db_for_write(Contract)
+    if not search_available(using):
+        return 0
+    count = 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    for model in SEARCH_MODELS.values():
+        documents = []
+        if apps is not None:
+            manager = apps.get_model(model._meta.label)._base_manager
+        else:
+            manager = model._base_manager
+        queryset = manager.using(using).order_by()
+        for document in get_documents(model, queryset):
+            documents.append(document)
+            if len(documents) >= 2000:
+                insert_documents(documents, using)
+                count += len(documents)
+                documents = []
+        insert_documents(documents, using)
+        count += len(documents)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return count
+
+
+def get_match(query):
+    """
+    Запрос FTS5 по тексту: все слова, каждое как начало слова
+    ("слово"*). Пустая строка, если слов нет
+    """
+    terms = re.findall(r'\w+', query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(query, limit=200, using=None):
+    """
+    Записи индекса по запросу в порядке релевантности (bm25):
+    [(model, pk, contract_id, rank, snippet)]. Совпадения в snippet
+    отмечены SNIPPET_START/SNIPPET_END
+    """
+    using = using or router.db_for_read(Contract)
+    match = get_match(query)
+    if not match or not search_available(using):
+        return []
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, contract_id, bm25({SEARCH_TABLE}, {weights}),'
+            f" snippet({SEARCH_TABLE}, -1, %s, %s, '…', 12)"
+            f' FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+            f' ORDER BY 3 LIMIT %s',
+            [SNIPPET_START, SNIPPET_END, match, limit],
+        )
+        rows = cursor.fetchall()
+    return [
+        (*parse_rowid(rowid), contract_id, rank, snippet)
+        for rowid, contract_id, rank, snippet in rows
+    ]
+
+
+def group_by_contract(hits):
+    """
+    Записи индекса по договорам: [(contract_id, [hit])] в порядке лучшей
+    записи договора
+    """
+    groups = {}
+    for hit in hits:
+        groups.setdefault(hit[2], []).append(hit)
+    return list(groups.items())
+
+
+def object_post_save(sender, instance, raw=False, using=None, **kwargs):
+    """Обновление записи индекса объекта"""
+    if not raw:
+        update_index(sender, [instance.pk], using)
+
+
+def objects_post_bulk_save(sender, instances, using=None, **kwargs):
+    """Обновление записей индекса объектов, записанных списком"""
+    update_index(sender, [obj.pk for obj in instances], using)
+
+
+def object_post_delete(sender, instance, using=None, **kwargs):
+    """Удаление записи индекса объекта"""
+    using = using or router.db_for_write(sender)
+    if search_available(using):
+        delete_documents(sender, [instance.pk], using)
+
+
+def client_post_save(sender, instance, raw=False, using=None, **kwargs):
+    """Наименование заказчика входит в записи индекса его договоров"""
+    if raw or not search_available(using):
+        return
+    contracts = Contract._base_manager.using(using).filter(client=instance)
+    update_index(Contract, list(contracts.values_list('pk', flat=True)), using)
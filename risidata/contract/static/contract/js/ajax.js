@@ -1,31 +1,69 @@
 'use strict';
 {
+    // Адрес данных для заполнения страницы (contract.views.LookupView)
+    const lookupUrl = document.currentScript.dataset.lookupUrl;
+
     window.addEventListener('load', function() {
+        // Все данные элементов, полученные при загрузке страницы
+        const tables = {};
+        // Данные элемента без выбранного значения
+        const emptyData = {
+            'post_abbr': {'abbr': ''},
+            'division': [],
+        };
+        // Запросы, отправляемые одним обращением
+        let queue = [];
 
         // Отправляем запрос
-        function ajaxSend(url, params) {
-            fetch(`${url}?${params}`, {
+        function ajaxSend(params) {
+            return fetch(`${lookupUrl}?${params}`, {
                 method: 'GET',
                 headers: {
-                    'Content-Type': 'application/x-www-urlencoded',
+                    'Accept': 'application/json',
                 },
             })
-                .then(response => response.json())
-                .then(json => render(json))
-                .catch(error => console.error(error))
+                .then(response => response.json());
+        };
+
+        // Данные элемента: из полученных при загрузке страницы, иначе
+        // запросом вместе с остальными запросами того же момента
+        function lookup(element, id) {
+            const table = tables[element];
+            if (table) {
+                render(element, table[id] ?? emptyData[element]);
+                return;
+            }
+            queue.push([element, id]);
+            if (queue.length === 1) {
+                setTimeout(flush, 0);
+            }
+        };
+
+        function flush() {
+            const params = new URLSearchParams();
+            for (const [element, id] of queue) {
+                params.append('element', element);
+                params.append('id', id);
+            }
+            queue = [];
+            ajaxSend(params)
+                .then(json => json.results.forEach(
+                    result => render(result.element, result.data)
+                ))
+                .catch(error => console.error(error));
         };
 
         //Вывод ответа от сервера
-        function render(data) {
-            switch (data.element) {
+        function render(element, data) {
+            switch (element) {
                 case 'client_name':
-                    render_client_name(data.data);
+                    render_client_name(data);
                     break;
                 case 'post_abbr':
-                    render_post_abbr(data.data);
+                    render_post_abbr(data);
                     break;
                 case 'division':
-                    render_select_chaild(data.data);
+                    render_select_chaild(data);
                     break;
             }
         };
@@ -34,13 +72,7 @@
         const clientChange = document.querySelector('select[name=client]');
         if (clientChange) {
             clientChange.addEventListener('change', () => {
-                //Формирование запроса
-                let url = '/valuechange/';
-                let params = new URLSearchParams({
-                    'element': 'client_name',
-                    'id': clientChange.value
-                });
-                ajaxSend(url, params);
+                lookup('client_name', clientChange.value);
             });
         };
         function render_client_name(data) {
@@ -57,41 +89,29 @@
         };
 
         const postChange = document.querySelector('select[name=post]');
-        if (postChange) {
+        const post_abbr = document.querySelector('#id_post_abbr');
+        const post_abbr_div = document.querySelector('.id_post_abbr');
+        if (postChange && post_abbr && post_abbr_div) {
             postChange.addEventListener('change', () => {
-                //Формирование запроса
-                let url = '/valuechange/';
-                let params = new URLSearchParams({
-                    'element': 'post_abbr',
-                    'id': postChange.value
-                });
-                ajaxSend(url, params);
+                lookup('post_abbr', postChange.value);
             });
         };
         function render_post_abbr(data) {
-            //Вывод информации выбранной организации
-            const post_abbr = document.querySelector('#id_post_abbr');
-            const post_abbr_div = document.querySelector('.id_post_abbr');
+            //Вывод сокращенного наименования выбранной должности
             post_abbr.value = post_abbr_div.innerHTML = data.abbr;
         };
 
         //Изменение содержимого субподразделения при выборе подразделения
         const select_parent = document.querySelector('select[name=division]');
         const select_chaild = document.querySelector('select[name=sub_division]');
-        if (select_parent) {
+        if (select_parent && select_chaild) {
             select_parent.addEventListener('change', () => {
-                //Формирование запроса                
-                let url = '/valuechange/';
-                let params = new URLSearchParams({
-                    'element': 'division',
-                    'id': select_parent.value
-                });
-                ajaxSend(url, params);
+                lookup('division', select_parent.value);
             });
         };
 
         //Изменение значений в дочернем select
-        function render_select_chaild(data) {            
+        function render_select_chaild(data) {
             select_chaild.innerHTML = '';// Очистка select
             const option = document.createElement('option');
             option.value = '';
@@ -104,5 +124,19 @@
                 select_chaild.appendChild(option);
             }
         };
+
+        // Все данные небольших справочников - одним запросом при загрузке
+        const prefetch = new URLSearchParams();
+        if (postChange && post_abbr && post_abbr_div) {
+            prefetch.append('prefetch', 'post_abbr');
+        }
+        if (select_parent && select_chaild) {
+            prefetch.append('prefetch', 'division');
+        }
+        if (prefetch.toString()) {
+            ajaxSend(prefetch)
+                .then(json => Object.assign(tables, json.prefetch))
+                .catch(error => console.error(error));
+        }
     })
 }
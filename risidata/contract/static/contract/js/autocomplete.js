@@ -0,0 +1,36 @@
+'use strict';
+{
+    // Выбор значения с поиском (core.widgets.AutocompleteSelect)
+    const $ = window.jQuery;
+
+    function initAutocomplete(element) {
+        $(element).select2({
+            width: 'style',
+            language: {
+                noResults: () => 'Ничего не найдено',
+                searching: () => 'Поиск…',
+                loadingMore: () => 'Загрузка…',
+            },
+            ajax: {
+                delay: 250,
+                data: (params) => ({
+                    term: params.term || '',
+                    page: params.page || 1,
+                    app_label: element.dataset.appLabel,
+                    model_name: element.dataset.modelName,
+                    field_name: element.dataset.fieldName,
+                }),
+            },
+        });
+        // Обработчики addEventListener (ajax.js) получают событие change
+        $(element).on('select2:select select2:clear', () => {
+            element.dispatchEvent(new Event('change'));
+        });
+    }
+
+    window.addEventListener('load', function() {
+        document.querySelectorAll('select.autocomplete').forEach(
+            initAutocomplete
+        );
+    });
+}
@@ -0,0 +1,178 @@
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Count, F, Sum
+
+from contract.models import Contract, ContractStatistics
+
+# Разрезы сводки: поле договора
+STATISTICS_FIELDS = {
+    ContractStatistics.STATUS: 'status',
+    ContractStatistics.CONDITION: 'condition',
+    ContractStatistics.CLIENT: 'client',
+}
+# Поля договора, от которых зависит сводка
+TRACKED_FIELDS = (
+    'closed', 'price_no_nds', 'price_plus_nds', *STATISTICS_FIELDS.values()
+)
+TRACKED_ATTNAMES = tuple(
+    Contract._meta.get_field(name).attname for name in TRACKED_FIELDS
+)
+STATISTICS_VALUES = '_statistics_values'
+
+
+def get_contract_values(contract):
+    """Значения полей договора, от которых зависит сводка"""
+    return {
+        attname: getattr(contract, attname) for attname in TRACKED_ATTNAMES
+    }
+
+
+def get_contract_deltas(values, sign=1):
+    """
+    Вклад договора в строки сводки:
+    {(dimension, key): [count, price_no_nds, price_plus_nds]}.
+    Закрытые договора в сводку не входят
+    """
+    if not values or values['closed']:
+        return {}
+    delta = (
+        sign,
+        sign * Decimal(values['price_no_nds'] or 0),
+        sign * Decimal(values['price_plus_nds'] or 0),
+    )
+    deltas = {(ContractStatistics.TOTAL, 0): list(delta)}
+    for dimension, name in STATISTICS_FIELDS.items():
+        key = values[Contract._meta.get_field(name).attname] or 0
+        deltas[dimension, key] = list(delta)
+    return deltas
+
+
+def merge_deltas(*deltas_list):
+    """Сложение изменений строк сводки без нулевых изменений"""
+    merged = {}
+    for deltas in deltas_list:
+        for row_key, delta in deltas.items():
+            if row_key in merged:
+                merged[row_key] = [
+                    a + b for a, b in zip(merged[row_key], delta)
+                ]
+            else:
+                merged[row_key] = delta
+    return {
+        row_key: delta for row_key, delta in merged.items() if any(delta)
+    }
+
+
+def apply_deltas(deltas, using=None):
+    """
+    Изменение строк сводки выражениями F() в текущей транзакции: при ее
+    откате откатывается и сводка. Недостающие строки создаются
+    """
+    if not deltas:
+        return
+    using = using or router.db_for_write(ContractStatistics)
+    queryset = ContractStatistics.objects.using(using)
+    with transaction.atomic(using=using):
+        for (dimension, key), (count, no_nds, plus_nds) in deltas.items():
+            row_filter = {'dimension': dimension, 'key': key}
+            changes = {
+                'count': F('count') + count,
+                'price_no_nds': F('price_no_nds') + no_nds,
+                'price_plus_nds': F('price_plus_nds') + plus_nds,
+            }
+            if not queryset.filter(**row_filter).update(**changes):
+                queryset.get_or_create(**row_filter)
+                queryset.filter(**row_filter).update(**changes)
+
+
+def rebuild_statistics(using=None):
+    """Полный пересчет сводки по открытым договорам"""
+    using = using or router.db_for_write(ContractStatistics)
+    contracts = Contract._base_manager.using(using).filter(closed=False)
+    aggregates = {
+        'count': Count('pk'),
+        'price_no_nds': Sum('price_no_nds'),
+        'price_plus_nds': Sum('price_plus_nds'),
+    }
+
+    def get_row(dimension, key, values):
+        return ContractStatistics(
+            dimension=dimension,
+            key=key or 0,
+            count=values['count'],
+            price_no_nds=values['price_no_nds'] or 0,
+            price_plus_nds=values['price_plus_nds'] or 0,
+        )
+
+    total = contracts.aggregate(**aggregates)
+    rows = [get_row(ContractStatistics.TOTAL, 0, total)]
+    for dimension, name in STATISTICS_FIELDS.items():
+        attname = Contract._meta.get_field(name).attname
+        for values in (
+                contracts.order_by().values(attname).annotate(**aggregates)
+        ):
+            rows.append(get_row(dimension, values[attname], values))
+
+    with transaction.atomic(using=using):
+        ContractStatistics.objects.using(using).delete()
+        ContractStatistics.objects.using(using).bulk_create(rows)
+    return rows
+
+
+def get_stored_values(sender, instance, using):
+    """Значения полей договора в базе, от которых зависит сводка"""
+    return (
+        sender._base_manager.using(using)
+        .filter(pk=instance.pk)
+        .values(*TRACKED_ATTNAMES)
+        .first()
+    )
+
+
+def contract_pre_save(sender, instance, raw=False, using=None,
+                      update_fields=None, **kwargs):
+    """Значения полей договора до сохранения"""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields).intersection(
+            TRACKED_FIELDS + TRACKED_ATTNAMES
+    ):
+        return
+    instance.__dict__[STATISTICS_VALUES] = get_stored_values(
+        sender, instance, using
+    )
+
+
+def contract_post_save(sender, instance, created=False, raw=False,
+                       using=None, update_fields=None, **kwargs):
+    """Перенос вклада договора в сводке со старых значений на новые"""
+    old_values = instance.__dict__.pop(STATISTICS_VALUES, None)
+    if raw:
+        return
+    if not created and old_values is None:
+        # Сохранение без полей сводки (update_fields)
+        return
+    apply_deltas(
+        merge_deltas(
+            get_contract_deltas(old_values, -1),
+            get_contract_deltas(get_contract_values(instance)),
+        ),
+        using=using,
+    )
+
+
+def contract_pre_delete(sender, instance, using=None, **kwargs):
+    """
+    Значения полей удаляемого договора из базы: значения экземпляра могут
+    не совпадать с сохраненными
+    """
+    instance.__dict__[STATISTICS_VALUES] = get_stored_values(
+        sender, instance, using
+    )
+
+
+def contract_post_delete(sender, instance, using=None, **kwargs):
+    """Исключение удаленного договора из сводки"""
+    values = instance.__dict__.pop(STATISTICS_VALUES, None)
+    apply_deltas(get_contract_deltas(values, -1), using=using)
@@ -1,3 +1,925 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.db.migrations.executor import MigrationExecutor
+from django.forms import modelform_factory, modelformset_factory
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import UserSettings
+from contract import filters, hours, search
+from contract.models import (
+    Calculation, Contact, Contract, ContractStatistics, Letter, Member,
+    StageMiddleList, TimeWork, TimeWorkMonth,
+)
+from contract.statistics import rebuild_statistics
+from contract.timesheet import TimeSheet
+from contract.views import ContractExportView, LookupView
+from core.audit import audit_atomic
+from core.mixins import DataFormMixin, MultipleListMixin
+from core.signals import (
+    connect_post_save, is_bulk_save_covered, post_bulk_save,
+    post_save_receivers,
+)
+from core.utils import annotate_related_exists, related_exists_map
+from database.models import (
+    Client, ConditionContract, Department, Employee, StageMiddleName,
+    StatusContract,
+)
+from risi.models import LogEntrySite
+from users.models import UserProfile
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+def get_statistics():
+    """Строки сводки без нулевых: {(dimension, key): (count, цены)}"""
+    return {
+        (row.dimension, row.key): (
+            row.count, row.price_no_nds, row.price_plus_nds
+        )
+        for row in ContractStatistics.objects.all()
+        if row.count or row.price_no_nds or row.price_plus_nds
+    }
+
+
+def get_index():
+    """Записи полнотекстового индекса в порядке rowid"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, number, body, contract_id'
+            f' FROM {search.SEARCH_TABLE} ORDER BY rowid'
+        )
+        return cursor.fetchall()
+
+
+class RelatedExistsTest(TestCase):
+    """Признаки наличия связанных объектов для выведенных договоров"""
+
+    def test_related_exists_map(self):
+        with_letter = Contract.objects.create(number='1')
+        with_contact = Contract.objects.create(number='2')
+        Contract.objects.create(number='3')
+        Letter.objects.create(contract=with_letter, number='1')
+        Letter.objects.create(contract=with_letter, number='2')
+        Contact.objects.create(contract=with_contact, last_name='Петров')
+        related_objects = [
+            rel
+            for rel in Contract._meta.related_objects
+            if rel.related_model in (Letter, Contact)
+        ]
+        queryset = annotate_related_exists(
+            Contract.objects.order_by('pk'), related_objects
+        )
+        with self.assertNumQueries(1):
+            result_list = list(queryset)
+        self.assertEqual(len(result_list), 3)
+        self.assertEqual(
+            related_exists_map(result_list, related_objects),
+            {'letter': {with_letter.pk}, 'contact': {with_contact.pk}},
+        )
+        # Учитываются только выведенные записи списка
+        self.assertEqual(
+            related_exists_map(result_list[1:], related_objects),
+            {'letter': set(), 'contact': {with_contact.pk}},
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ContractExportTest(TestCase):
+    """Выгрузка списка договоров по столбцам настроек пользователя"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(
+            username='admin', is_superuser=True
+        )
+        customer = Client.objects.create(name='Альфа', city='Город')
+        cls.contract = Contract.objects.create(
+            number='=1+1', title='Поставка', client=customer
+        )
+        Letter.objects.create(contract=cls.contract, number='1')
+        Contract.objects.create(number='2')
+
+    def setUp(self):
+        user_settings = UserSettings.objects.get(user=self.user)
+        user_settings.update_settings(
+            'contract_list', {'0': 'number', '1': 'client', '2': 'letter'}
+        )
+
+    def get_export(self, file_format, user=None):
+        request = RequestFactory().get(
+            reverse('contract_export'), {'format': file_format}
+        )
+        request.user = user or self.user
+        return ContractExportView.as_view()(request)
+
+    def test_csv(self):
+        response = self.get_export('csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('contracts.csv', response['Content-Disposition'])
+        text = b''.join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(text[1:]), delimiter=';'))
+        self.assertEqual(len(rows[0]), 3)
+        self.assertEqual(rows[1:], [["'=1+1", 'Альфа', 'да'], ['2', '', '']])
+
+    def test_format(self):
+        self.assertEqual(self.get_export('xlsx').status_code, 200)
+        with self.assertRaises(Http404):
+            self.get_export('pdf')
+
+    def test_permission(self):
+        user = UserProfile.objects.create(username='user')
+        with self.assertRaises(Http404):
+            self.get_export('csv', user)
+
+
+class LetterListView(MultipleListMixin):
+
+    def action_pre_save(self, obj, form, *args, **kwargs):
+        if obj.pk is None:
+            obj.contract_id = self.contract.pk
+        obj.date = datetime.date(2025, 3, 3)
+
+
+class BulkSaveFormsetTest(TestCase):
+    """Запись списка через bulk_update/bulk_create"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(
+            username='admin', is_superuser=True
+        )
+        cls.contract = Contract.objects.create(number='1')
+        cls.letters = [
+            Letter.objects.create(contract=cls.contract, number=str(number))
+            for number in range(3)
+        ]
+
+    def get_formset(self, data):
+        LetterFormSet = modelformset_factory(
+            Letter, fields=('number', 'content'), extra=1
+        )
+        prefix = 'form'
+        post = {
+            f'{prefix}-TOTAL_FORMS': len(self.letters) + 1,
+            f'{prefix}-INITIAL_FORMS': len(self.letters),
+        }
+        for index, letter in enumerate(self.letters):
+            post[f'{prefix}-{index}-id'] = letter.pk
+            post[f'{prefix}-{index}-number'] = letter.number
+            post[f'{prefix}-{index}-content'] = ''
+        for index, values in data.items():
+            for name, value in values.items():
+                post[f'{prefix}-{index}-{name}'] = value
+        formset = LetterFormSet(
+            post, queryset=Letter.objects.order_by('pk'), prefix=prefix
+        )
+        self.assertTrue(formset.is_valid(), formset.errors)
+        return formset
+
+    def get_view(self):
+        view = LetterListView()
+        view.request = RequestFactory().post('/')
+        view.request.user = self.user
+        view.contract = self.contract
+        return view
+
+    def test_can_bulk_save(self):
+        view = self.get_view()
+        self.assertTrue(view.can_bulk_save(self.get_formset({})))
+        view.bulk_save = False
+        self.assertFalse(view.can_bulk_save(self.get_formset({})))
+
+    def test_bulk_save_covered(self):
+        self.assertTrue(is_bulk_save_covered(Letter))
+        self.assertTrue(is_bulk_save_covered(Calculation))
+        # Сводка договоров обновляется только post_save
+        self.assertFalse(is_bulk_save_covered(Contract))
+
+        def receiver(**kwargs):
+            pass
+
+        connect_post_save(receiver, Letter)
+        try:
+            self.assertFalse(is_bulk_save_covered(Letter))
+        finally:
+            post_save.disconnect(receiver, sender=Letter)
+            del post_save_receivers[Letter][receiver]
+
+    def test_bulk_save(self):
+        formset = self.get_formset({
+            0: {'number': 'П-1'},
+            2: {'content': 'Согласование'},
+            3: {'number': 'П-4'},
+        })
+        with CaptureQueriesContext(connection) as queries:
+            with audit_atomic():
+                count = self.get_view().bulk_save_formset(formset)
+        self.assertEqual(count, 3)
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(
+            sum(sql.startswith('UPDATE "contract_letter"')
+                for sql in statements),
+            1,
+        )
+        self.assertEqual(
+            sum(sql.startswith('INSERT INTO "contract_letter"')
+                for sql in statements),
+            1,
+        )
+        self.assertEqual(
+            sum(sql.startswith('INSERT INTO "risi_log"')
+                for sql in statements),
+            1,
+        )
+        self.assertEqual(
+            list(
+                Letter.objects.order_by('pk')
+                .values_list('number', 'content', 'date')
+            ),
+            [
+                ('П-1', '', datetime.date(2025, 3, 3)),
+                ('1', '', None),
+                ('2', 'Согласование', datetime.date(2025, 3, 3)),
+                ('П-4', '', datetime.date(2025, 3, 3)),
+            ],
+        )
+        self.assertEqual(
+            sorted(LogEntrySite.objects.values_list('action_flag', flat=True)),
+            [1, 2, 2],
+        )
+
+
+class FieldChangesTest(TestCase):
+    """Прежние и новые значения полей формы изменения договора"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.status_1 = StatusContract.objects.create(name='Статус 1')
+        cls.status_2 = StatusContract.objects.create(name='Статус 2')
+        cls.client_1 = Client.objects.create(name='Альфа', city='Город')
+        cls.client_2 = Client.objects.create(name='Бета', city='Город')
+        cls.contract = Contract.objects.create(
+            number='1', title='Поставка', status=cls.status_1,
+            client=cls.client_1, great_client=cls.client_2,
+        )
+
+    def get_form(self, **data):
+        ContractChangeForm = modelform_factory(
+            Contract,
+            fields=('number', 'title', 'status', 'client', 'great_client'),
+        )
+        values = {
+            'number': self.contract.number,
+            'title': self.contract.title,
+            'status': self.contract.status_id,
+            'client': self.contract.client_id,
+            'great_client': self.contract.great_client_id,
+        }
+        values.update(data)
+        form = ContractChangeForm(values, instance=self.contract)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form
+
+    def get_view(self):
+        view = DataFormMixin()
+        view.model = Contract
+        view.action = 'change'
+        return view
+
+    def test_field_changes(self):
+        form = self.get_form(
+            title='Ремонт', status=self.status_2.pk,
+            client=self.client_2.pk, great_client=self.client_1.pk,
+        )
+        view = self.get_view()
+        # Прежние значения - одним запросом на модель
+        with self.assertNumQueries(2):
+            changes = view.get_field_changes(form)
+        self.assertEqual(
+            {change['name']: (change['kind'], change['old'], change['new'])
+             for change in changes},
+            {
+                'title': ('changed', 'Поставка', 'Ремонт'),
+                'status': ('changed', self.status_1, self.status_2),
+                'client': ('changed', self.client_1, self.client_2),
+                'great_client': ('changed', self.client_2, self.client_1),
+            },
+        )
+        with self.assertNumQueries(0):
+            self.assertIs(view.get_field_changes(form), changes)
+            last_change = view.get_last_change(form)
+        self.assertIn('было: Альфа стало: Бета', last_change)
+
+    def test_construct_message(self):
+        form = self.get_form(title='Ремонт', status='')
+        message = self.get_view().construct_message(form)
+        self.assertEqual(
+            message[0]['changed']['values'],
+            [
+                {'field': 'title', 'old': 'Поставка', 'new': 'Ремонт'},
+                {'field': 'status', 'old': 'Статус 1', 'new': ''},
+            ],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LookupViewTest(TestCase):
+    """Данные для заполнения страницы при выборе значений в списках"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(username='user')
+        department = Department.objects.create(name='Ведомство')
+        cls.customer = Client.objects.create(
+            name='Альфа', city='Город', inn=123, department=department
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_response(self, params, **headers):
+        request = RequestFactory().get('/lookup/', params, headers=headers)
+        request.user = self.user
+        return LookupView.as_view()(request)
+
+    def test_lookups(self):
+        params = {
+            'element': ['client_name', 'client_name'],
+            'id': [str(self.customer.pk), ''],
+        }
+        with self.assertNumQueries(1):
+            data = json.loads(self.get_response(params).content)
+        self.assertEqual(data['results'], [
+            {
+                'element': 'client_name', 'id': str(self.customer.pk),
+                'data': {
+                    'city': 'Город', 'inn': 123,
+                    'department__name': 'Ведомство',
+                },
+            },
+            {
+                'element': 'client_name', 'id': '',
+                'data': {'city': '', 'inn': '', 'department__name': ''},
+            },
+        ])
+
+    def test_unknown_element(self):
+        for params in (
+                {'element': 'no_such_element'},
+                {'prefetch': 'client_name'},
+        ):
+            with self.assertRaises(Http404):
+                self.get_response(params)
+
+    def test_not_shared_cache(self):
+        """Без общего кэша версий ответ не кэшируется браузером"""
+        response = self.get_response({'prefetch': 'post_abbr'})
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('no-store', response['Cache-Control'])
+
+    @mock.patch('contract.views.is_cache_shared', return_value=True)
+    def test_etag(self, is_cache_shared):
+        params = {'element': 'client_name', 'id': str(self.customer.pk)}
+        response = self.get_response(params)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.get_response(params, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        # Изменение справочника меняет версию ответа
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.city = 'Новый город'
+            self.customer.save()
+        response = self.get_response(params, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            json.loads(response.content)['results'][0]['data']['city'],
+            'Новый город',
+        )
+
+
+class ContractStatisticsTest(TestCase):
+    """Сводка после изменений договоров совпадает с полным пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.status_1 = StatusContract.objects.create(name='Статус 1')
+        cls.status_2 = StatusContract.objects.create(name='Статус 2')
+        cls.condition = ConditionContract.objects.create(name='Состояние')
+        cls.customer = Client.objects.create(name='Заказчик', city='Город')
+
+    def create_contract(self, **kwargs):
+        values = {
+            'number': '1',
+            'status': self.status_1,
+            'condition': self.condition,
+            'client': self.customer,
+            'price_no_nds': Decimal('100.00'),
+            'price_plus_nds': Decimal('120.00'),
+        }
+        values.update(kwargs)
+        return Contract.objects.create(**values)
+
+    def assertStatisticsRebuilt(self):
+        statistics = get_statistics()
+        rebuild_statistics()
+        self.assertEqual(statistics, get_statistics())
+
+    def test_create(self):
+        self.create_contract()
+        self.create_contract(number='2', status=None, price_no_nds=None)
+        self.assertStatisticsRebuilt()
+        self.assertEqual(
+            get_statistics()[ContractStatistics.TOTAL, 0][0], 2
+        )
+
+    def test_change_price_and_status(self):
+        contract = self.create_contract()
+        self.create_contract(number='2')
+        contract.price_no_nds = Decimal('250.00')
+        contract.status = self.status_2
+        contract.save()
+        self.assertStatisticsRebuilt()
+        contract.status = None
+        contract.save(update_fields=['status'])
+        self.assertStatisticsRebuilt()
+
+    def test_close(self):
+        contract = self.create_contract()
+        self.create_contract(number='2')
+        contract.closed = True
+        contract.save()
+        self.assertStatisticsRebuilt()
+        self.assertEqual(
+            get_statistics()[ContractStatistics.TOTAL, 0][0], 1
+        )
+        contract.closed = False
+        contract.save()
+        self.assertStatisticsRebuilt()
+
+    def test_delete(self):
+        contract = self.create_contract()
+        self.create_contract(number='2', status=self.status_2)
+        # Значения экземпляра не совпадают с сохраненными
+        contract.price_no_nds = Decimal('1.00')
+        contract.delete()
+        self.assertStatisticsRebuilt()
+
+
+class ContractFiltersTest(TestCase):
+    """Количество договоров по значениям фильтров боковой панели"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.status_1 = StatusContract.objects.create(name='Статус 1')
+        cls.status_2 = StatusContract.objects.create(name='Статус 2')
+        cls.status_3 = StatusContract.objects.create(name='Статус 3')
+        cls.condition_1 = ConditionContract.objects.create(name='Состояние 1')
+        cls.condition_2 = ConditionContract.objects.create(name='Состояние 2')
+        cls.employee = Employee.objects.create(
+            first_name='Иван', last_name='Иванов', middle_name='Иванович',
+            tabel=1,
+        )
+        cls.stage = StageMiddleName.objects.create(name='Этап')
+        cls.contract_1 = Contract.objects.create(
+            number='1', status=cls.status_1, condition=cls.condition_1
+        )
+        cls.contract_2 = Contract.objects.create(
+            number='2', status=cls.status_1, condition=cls.condition_2
+        )
+        cls.contract_3 = Contract.objects.create(
+            number='3', status=cls.status_2, condition=cls.condition_1
+        )
+        for contract in (cls.contract_1, cls.contract_3):
+            Member.objects.create(
+                contract=contract, employee=cls.employee, ispolnitel=True
+            )
+        StageMiddleList.objects.create(
+            contract=cls.contract_1, name=cls.stage,
+            date_end_prognoz=datetime.date(2025, 3, 1),
+        )
+        StageMiddleList.objects.create(
+            contract=cls.contract_2, name=cls.stage,
+            date_end_prognoz=datetime.date(2025, 6, 1),
+        )
+
+    def get_items(self, params):
+        result, _ = filters.get_filters(Contract.objects.all(), params)
+        return {
+            name: [(key, count) for key, label, count in item['queryitems']]
+            for name, item in result.items()
+        }
+
+    def test_counts(self):
+        with self.assertNumQueries(1):
+            counts = filters.get_counts(Contract.objects.all(), {})
+        self.assertEqual(
+            counts['status'], {self.status_1.pk: 2, self.status_2.pk: 1}
+        )
+        self.assertEqual(counts['ispolnitel'], {self.employee.pk: 2})
+        self.assertEqual(counts['middlename'], {self.stage.pk: 2})
+
+    def test_selected(self):
+        """Для фильтра учитываются выбранные значения остальных фильтров"""
+        items = self.get_items({
+            'condition': str(self.condition_1.pk),
+            'status': str(self.status_1.pk),
+        })
+        self.assertEqual(
+            items['status'],
+            [(self.status_1.pk, 1), (self.status_2.pk, 1)],
+        )
+        self.assertEqual(
+            items['condition'],
+            [(self.condition_1.pk, 1), (self.condition_2.pk, 1)],
+        )
+        self.assertEqual(items['ispolnitel'], [(self.employee.pk, 1)])
+
+    def test_selected_without_contracts(self):
+        """Выбранное значение без договоров выводится с нулем"""
+        items = self.get_items({'status': str(self.status_3.pk)})
+        self.assertEqual(
+            items['status'],
+            [(self.status_1.pk, 2), (self.status_2.pk, 1),
+             (self.status_3.pk, 0)],
+        )
+        self.assertEqual(items['condition'], [])
+
+    def test_date(self):
+        params = {'middlename': str(self.stage.pk), 'date': '2025-04-01'}
+        self.assertEqual(
+            self.get_items(params)['middlename'], [(self.stage.pk, 1)]
+        )
+        self.assertEqual(
+            list(filters.filter_contracts(Contract.objects.all(), params)),
+            [self.contract_1],
+        )
+
+    def test_filter_contracts(self):
+        params = {'ispolnitel': str(self.employee.pk), 'status': 'x'}
+        self.assertEqual(
+            set(filters.filter_contracts(Contract.objects.all(), params)),
+            {self.contract_1, self.contract_3},
+        )
+
+
+class SearchIndexTest(TestCase):
+    """Индекс после изменений объектов совпадает с полным перестроением"""
+
+    def setUp(self):
+        if not search.search_available(connection.alias):
+            self.skipTest('нет таблицы индекса SQLite FTS5')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Client.objects.create(name='Альфа', city='Город')
+
+    def assertIndexRebuilt(self):
+        index = get_index()
+        search.rebuild_search_index()
+        self.assertEqual(index, get_index())
+
+    def get_contract_ids(self, query):
+        return {hit[2] for hit in search.search(query)}
+
+    def test_save_and_delete(self):
+        contract = Contract.objects.create(
+            number='А-17', title='Поставка', client=self.customer
+        )
+        letter = Letter.objects.create(
+            contract=contract, number='П-5', content='Согласование сроков'
+        )
+        self.assertIndexRebuilt()
+        self.assertEqual(self.get_contract_ids('поставка'), {contract.pk})
+        self.assertEqual(self.get_contract_ids('согласован'), {contract.pk})
+
+        contract.title = 'Ремонт'
+        contract.save()
+        self.assertIndexRebuilt()
+        self.assertEqual(self.get_contract_ids('поставка'), set())
+
+        letter.delete()
+        self.assertIndexRebuilt()
+        self.assertEqual(self.get_contract_ids('согласован'), set())
+
+        contract.delete()
+        self.assertIndexRebuilt()
+        self.assertEqual(get_index(), [])
+
+    def test_client_rename(self):
+        contract = Contract.objects.create(number='1', client=self.customer)
+        self.customer.name = 'Бета'
+        self.customer.save()
+        self.assertIndexRebuilt()
+        self.assertEqual(self.get_contract_ids('бета'), {contract.pk})
+        self.assertEqual(self.get_contract_ids('альфа'), set())
+
+    def test_rebuild_with_migration_apps(self):
+        """Первое заполнение индекса в миграции через исторические модели"""
+        contract = Contract.objects.create(number='1', client=self.customer)
+        Contact.objects.create(
+            contract=contract, last_name='Петров', first_name='Петр'
+        )
+        index = get_index()
+        apps = MigrationExecutor(connection).loader.project_state(
+            ('contract', '0008_contract_search')
+        ).apps
+        search.rebuild_search_index(connection.alias, apps)
+        self.assertEqual(index, get_index())
+
+    def test_bulk_save(self):
+        contract = Contract.objects.create(number='1')
+        letters = Letter.objects.bulk_create([
+            Letter(contract=contract, number=str(number))
+            for number in range(3)
+        ])
+        for letter in letters:
+            letter.content = 'Акт приемки'
+        Letter.objects.bulk_update(letters, ['content'])
+        post_bulk_save.send(sender=Letter, instances=letters, using='default')
+        self.assertIndexRebuilt()
+        self.assertEqual(self.get_contract_ids('приемки'), {contract.pk})
+
+
+class TimeSheetChangesTest(TestCase):
+    """Изменения записей TimeWork по значениям ячеек табеля"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(
+            first_name='Иван', last_name='Иванов', middle_name='Иванович',
+            tabel=1,
+        )
+        cls.contract = Contract.objects.create(number='1')
+        cls.member = Member.objects.create(
+            contract=cls.contract, employee=cls.employee
+        )
+        cls.start = datetime.date(2025, 3, 3)
+        cls.end = datetime.date(2025, 3, 9)
+
+    def create_timework(self, date, time):
+        return TimeWork.objects.create(
+            contract=self.contract, member=self.member, date=date, time=time
+        )
+
+    def get_timesheet(self):
+        return TimeSheet(self.employee.pk, self.start, self.end)
+
+    def get_values(self, timesheet, cells):
+        """Значения ячеек табеля {имя поля: часы} по {дата: часы}"""
+        return {
+            timesheet.get_field_name(self.contract.pk, date): time
+            for date, time in cells.items()
+        }
+
+    def test_unchanged(self):
+        timework = self.create_timework(self.start, Decimal('8.0'))
+        timesheet = self.get_timesheet()
+        self.assertEqual(
+            timesheet.get_changes(timesheet.get_initial()), ([], [], [])
+        )
+        values = self.get_values(timesheet, {timework.date: Decimal('8')})
+        self.assertEqual(timesheet.get_changes(values), ([], [], []))
+
+    def test_create(self):
+        timesheet = self.get_timesheet()
+        created, changed, deleted = timesheet.get_changes(
+            self.get_values(timesheet, {self.start: Decimal('4.5')})
+        )
+        self.assertEqual((changed, deleted), ([], []))
+        self.assertEqual(len(created), 1)
+        self.assertEqual(
+            (created[0].contract_id, created[0].member_id, created[0].date,
+             created[0].time),
+            (self.contract.pk, self.member.pk, self.start, Decimal('4.5')),
+        )
+
+    def test_change_and_delete(self):
+        changed_timework = self.create_timework(self.start, Decimal('8.0'))
+        deleted_timework = self.create_timework(self.end, Decimal('2.0'))
+        timesheet = self.get_timesheet()
+        created, changed, deleted = timesheet.get_changes(
+            self.get_values(timesheet, {
+                self.start: Decimal('6.0'),
+                self.end: None,
+            })
+        )
+        self.assertEqual(created, [])
+        self.assertEqual(
+            [(obj.pk, obj.time) for obj in changed],
+            [(changed_timework.pk, Decimal('6.0'))],
+        )
+        self.assertEqual(deleted, [deleted_timework.pk])
+
+    def test_merge_cell(self):
+        """Несколько записей ячейки заменяются одной"""
+        first = self.create_timework(self.start, Decimal('3.0'))
+        second = self.create_timework(self.start, Decimal('5.0'))
+        timesheet = self.get_timesheet()
+        created, changed, deleted = timesheet.get_changes(
+            timesheet.get_initial()
+        )
+        self.assertEqual(created, [])
+        self.assertEqual(
+            [(obj.pk, obj.time) for obj in changed],
+            [(first.pk, Decimal('8.0'))],
+        )
+        self.assertEqual(deleted, [second.pk])
+
+    def test_save(self):
+        self.create_timework(self.start, Decimal('3.0'))
+        self.create_timework(self.start, Decimal('5.0'))
+        timesheet = self.get_timesheet()
+        values = self.get_values(timesheet, {
+            self.start: Decimal('7.0'),
+            self.end: Decimal('1.5'),
+        })
+        self.assertEqual(timesheet.save(values), 3)
+        self.assertEqual(
+            list(
+                TimeWork.objects.order_by('date')
+                .values_list('date', 'time')
+            ),
+            [(self.start, Decimal('7.0')), (self.end, Decimal('1.5'))],
+        )
+
+
+class HoursRollupTest(TestCase):
+    """Часы по месяцам после изменений записей совпадают с пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee_1 = Employee.objects.create(
+            first_name='Иван', last_name='Иванов', middle_name='Иванович',
+            tabel=1, norma='160 ч',
+        )
+        cls.employee_2 = Employee.objects.create(
+            first_name='Петр', last_name='Петров', middle_name='Петрович',
+            tabel=2,
+        )
+        cls.contract = Contract.objects.create(number='1')
+        cls.member_1 = Member.objects.create(
+            contract=cls.contract, employee=cls.employee_1
+        )
+        cls.member_2 = Member.objects.create(
+            contract=cls.contract, employee=cls.employee_2
+        )
+        cls.march = datetime.date(2025, 3, 1)
+        cls.april = datetime.date(2025, 4, 1)
+
+    def create_timework(self, date, time, member=None):
+        return TimeWork.objects.create(
+            contract=self.contract, member=member or self.member_1,
+            date=date, time=time,
+        )
+
+    def get_rollup(self):
+        return {
+            (row.month, row.employee_id, row.contract_id): row.hours
+            for row in TimeWorkMonth.objects.all()
+        }
+
+    def assertRollupRefreshed(self):
+        rollup = self.get_rollup()
+        hours.refresh_rollup()
+        self.assertEqual(rollup, self.get_rollup())
+
+    def test_create_update_delete(self):
+        timework = self.create_timework(self.march, Decimal('8.0'))
+        self.create_timework(
+            self.march.replace(day=5), Decimal('2.5'), self.member_2
+        )
+        self.assertRollupRefreshed()
+        self.assertEqual(
+            self.get_rollup()[self.march, self.employee_1.pk,
+                              self.contract.pk],
+            Decimal('8.0'),
+        )
+
+        timework.time = Decimal('6.0')
+        timework.save(update_fields=['time'])
+        self.assertRollupRefreshed()
+        # Перенос записи в другой месяц
+        timework.date = self.april
+        timework.save()
+        self.assertRollupRefreshed()
+        self.assertNotIn(
+            (self.march, self.employee_1.pk, self.contract.pk),
+            self.get_rollup(),
+        )
+
+        timework.delete()
+        self.assertRollupRefreshed()
+        self.assertEqual(len(self.get_rollup()), 1)
+
+    def test_member_employee(self):
+        """Часы переходят к новому сотруднику участника договора"""
+        self.create_timework(self.march, Decimal('8.0'))
+        self.member_1.employee = self.employee_2
+        self.member_1.save()
+        self.assertRollupRefreshed()
+        self.assertEqual(
+            self.get_rollup(),
+            {(self.march, self.employee_2.pk, self.contract.pk):
+             Decimal('8.0')},
+        )
+        self.member_1.employee = self.employee_1
+        self.member_1.save()
+
+    def test_bulk_save(self):
+        timework = self.create_timework(self.march, Decimal('8.0'))
+        timework.time = Decimal('4.0')
+        TimeWork.objects.bulk_update([timework], ['time'])
+        post_bulk_save.send(
+            sender=TimeWork, instances=[timework], using='default'
+        )
+        self.assertRollupRefreshed()
+        self.assertEqual(list(self.get_rollup().values()), [Decimal('4.0')])
+
+    def test_timesheet_save(self):
+        """Запись табеля пересчитывает каждый месяц один раз"""
+        self.create_timework(self.march, Decimal('8.0'))
+        timesheet = TimeSheet(
+            self.employee_1.pk, datetime.date(2025, 3, 31),
+            datetime.date(2025, 4, 2),
+        )
+        values = {
+            timesheet.get_field_name(self.contract.pk, date): Decimal('3.0')
+            for date in (
+                datetime.date(2025, 3, 31), self.april,
+                datetime.date(2025, 4, 2),
+            )
+        }
+        with mock.patch.object(
+            hours, 'refresh_rollup', wraps=hours.refresh_rollup
+        ) as refresh_rollup:
+            timesheet.save(values)
+        self.assertEqual(refresh_rollup.call_count, 2)
+        self.assertRollupRefreshed()
+        self.assertEqual(
+            self.get_rollup(),
+            {
+                (self.march, self.employee_1.pk, self.contract.pk):
+                    Decimal('11.0'),
+                (self.april, self.employee_1.pk, self.contract.pk):
+                    Decimal('6.0'),
+            },
+        )
+
+    def test_unique(self):
+        TimeWorkMonth.objects.create(
+            month=self.march, employee=self.employee_1,
+            contract=self.contract, hours=1,
+        )
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                TimeWorkMonth.objects.create(
+                    month=self.march, employee=self.employee_1,
+                    contract=self.contract, hours=2,
+                )
+
+    def test_report(self):
+        """Отчет по часам по месяцам совпадает с отчетом по записям"""
+        self.create_timework(self.march, Decimal('8.0'))
+        self.create_timework(self.april, Decimal('4.0'))
+        self.create_timework(self.april, Decimal('2.0'), self.member_2)
+        for groups in (('employee',), ('contract', 'month')):
+            self.assertEqual(
+                hours.get_hours(self.march, self.april, groups),
+                hours.get_hours(
+                    self.march, self.april, groups, use_rollup=False
+                ),
+            )
+        rows, total = hours.get_report(self.march, self.april)
+        self.assertEqual(total, Decimal('14.0'))
+        self.assertEqual(
+            rows[0],
+            (['Иванов И.И.'], Decimal('12.0'), Decimal('320'),
+             Decimal('-308.0')),
+        )
+
+    def test_helpers(self):
+        self.assertEqual(hours.get_month('2025-03'), self.march)
+        self.assertIsNone(hours.get_month('март'))
+        self.assertEqual(
+            hours.add_months(self.march, 10), datetime.date(2026, 1, 1)
+        )
+        self.assertEqual(
+            hours.count_months(self.march, datetime.date(2026, 2, 1)), 12
+        )
+        self.assertEqual(hours.parse_norma('164,5 ч'), Decimal('164.5'))
+        self.assertIsNone(hours.parse_norma(''))
@@ -0,0 +1,168 @@
+import calendar
+import datetime
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Q
+
+from contract.hours import defer_rollup
+from contract.models import Contract, Member, TimeWork
+from core.signals import post_bulk_save
+
+WEEK, MONTH = 'week', 'month'
+PERIODS = {WEEK: 'неделя', MONTH: 'месяц'}
+DATE_VAR, PERIOD_VAR = 'date', 'period'
+
+
+def get_period(params):
+    """
+    Период табеля из GET запроса: (period, начало, конец). Неделя
+    начинается с понедельника, по умолчанию - текущий месяц
+    """
+    period = params.get(PERIOD_VAR)
+    if period not in PERIODS:
+        period = MONTH
+    try:
+        date = datetime.date.fromisoformat(params.get(DATE_VAR, ''))
+    except ValueError:
+        date = datetime.date.today()
+    if period == WEEK:
+        start = date - datetime.timedelta(days=date.weekday())
+        return period, start, start + datetime.timedelta(days=6)
+    start = date.replace(day=1)
+    days = calendar.monthrange(date.year, date.month)[1]
+    return period, start, date.replace(day=days)
+
+
+def get_days(start, end):
+    return [
+        start + datetime.timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+    ]
+
+
+def get_adjacent_dates(period, start):
+    """Начало предыдущего и следующего периода"""
+    if period == WEEK:
+        return (
+            start - datetime.timedelta(days=7),
+            start + datetime.timedelta(days=7),
+        )
+    previous = (start - datetime.timedelta(days=1)).replace(day=1)
+    days = calendar.monthrange(start.year, start.month)[1]
+    return previous, start + datetime.timedelta(days=days)
+
+
+class TimeSheet:
+    """
+    Табель сотрудника за период: строки - договоры, столбцы - дни.
+    Записи TimeWork периода читаются одним запросом; записи одного
+    договора за день складываются в одну ячейку.
+
+    cells - {(contract_id, date): [time, [pk записей]]},
+    members - {contract_id: member_id} для новых записей,
+    contracts - договоры строк табеля
+    """
+
+    def __init__(self, employee_id, start, end, using=None):
+        self.employee_id = employee_id
+        self.start, self.end = start, end
+        self.days = get_days(start, end)
+        self.using = using or router.db_for_write(TimeWork)
+        self.load()
+
+    def load(self):
+        self.cells, self.members = {}, {}
+        timework = TimeWork.objects.using(self.using).filter(
+            member__employee_id=self.employee_id,
+            date__range=(self.start, self.end),
+        ).order_by('pk').values_list(
+            'pk', 'contract_id', 'member_id', 'date', 'time'
+        )
+        for pk, contract_id, member_id, date, time in timework:
+            cell = self.cells.setdefault(
+                (contract_id, date), [Decimal(0), []]
+            )
+            cell[0] += time or 0
+            cell[1].append(pk)
+            self.members.setdefault(contract_id, member_id)
+
+        # Открытые договоры сотрудника и договоры с записями периода
+        members = Member.objects.using(self.using).filter(
+            Q(contract__closed=False) | Q(contract_id__in=self.members),
+            employee_id=self.employee_id,
+        ).order_by('pk').values_list('contract_id', 'pk')
+        for contract_id, member_id in members:
+            self.members.setdefault(contract_id, member_id)
+        self.contracts = list(
+            Contract.objects.using(self.using)
+            .filter(pk__in=self.members)
+            .order_by('number', 'pk')
+        )
+
+    def get_field_name(self, contract_id, date):
+        return f't_{contract_id}_{date:%Y%m%d}'
+
+    def get_fields(self):
+        """[(contract_id, date, имя поля)] ячеек табеля"""
+        return [
+            (contract.pk, date, self.get_field_name(contract.pk, date))
+            for contract in self.contracts
+            for date in self.days
+        ]
+
+    def get_initial(self):
+        return {
+            name: self.cells[contract_id, date][0]
+            for contract_id, date, name in self.get_fields()
+            if (contract_id, date) in self.cells
+        }
+
+    def get_changes(self, values):
+        """
+        Изменения табеля по значениям ячеек {имя поля: часы}:
+        (новые записи, измененные записи, pk удаляемых записей)
+        """
+        created, changed, deleted = [], [], []
+        for contract_id, date, name in self.get_fields():
+            time = values.get(name) or Decimal(0)
+            old_time, pks = self.cells.get((contract_id, date), (0, []))
+            if time == old_time and len(pks) <= 1:
+                continue
+            if not time:
+                deleted.extend(pks)
+            elif pks:
+                changed.append(TimeWork(pk=pks[0], time=time))
+                deleted.extend(pks[1:])
+            else:
+                created.append(TimeWork(
+                    contract_id=contract_id,
+                    member_id=self.members[contract_id],
+                    date=date,
+                    time=time,
+                ))
+        return created, changed, deleted
+
+    def save(self, values):
+        """
+        Запись изменений табеля в одной транзакции: bulk_create,
+        bulk_update (post_bulk_save) и одно удаление, один пересчет часов
+        по месяцам для всех записей. Возвращает количество измененных
+        записей
+        """
+        created, changed, deleted = self.get_changes(values)
+        manager = TimeWork._default_manager.db_manager(self.using)
+        with transaction.atomic(using=self.using), defer_rollup():
+            if created:
+                manager.bulk_create(created)
+            if changed:
+                manager.bulk_update(changed, ['time'])
+            if created or changed:
+                post_bulk_save.send(
+                    sender=TimeWork,
+                    instances=created + changed,
+                    using=self.using,
+                )
+            if deleted:
+                manager.filter(pk__in=deleted).delete()
+        return len(created) + len(changed) + len(deleted)
@@ -5,20 +5,32 @@ from contract.views import (
     APP_LABEL,
     SettingsContractListView,
     ContractCloseView,
-    EmployeeListView, EmployeeChangeView,
+    ContractStatisticsView,
+    ContractSearchView,
+    HoursReportView,
+    EmployeeListView, EmployeeChangeView, EmployeeTimeSheetView,
     ProjectsView,
     # FilterContractView,
-    ValueChangeView,
+    LookupView,
     ArchiveListView, ArchiveChangeView, ArchiveHistoryView,
+    ContractExportView, ArchiveContractExportView,
 )
 
 
 urlpatterns = [
     # path('filter/', FilterContractView.as_view(), name='filter'),
-    path('valuechange/', ValueChangeView.as_view()),
+    path('lookup/', LookupView.as_view(), name='lookup'),
     # path('pdf/', PDFView.as_view(), name='pdf'),
+    path('contract/export/', ContractExportView.as_view(),
+         name='contract_export'),
+    path('archive/contract/export/', ArchiveContractExportView.as_view(),
+         name='archive_contract_export'),
 
     path('', ProjectsView.as_view(), name='home'),
+    path('statistics/', ContractStatisticsView.as_view(),
+         name='contract_statistics'),
+    path('search/', ContractSearchView.as_view(), name='contract_search'),
+    path('hours/', HoursReportView.as_view(), name='hours_report'),
     path('', include(get_path(APP_LABEL))),
 
     path('contract/', include([
@@ -42,6 +54,8 @@ urlpatterns = [
     path('employee/<slug:slug>/', include([
         path('', EmployeeListView.as_view(), name='employee_list'),
         path('change', EmployeeChangeView.as_view(), name='employee_change'),
+        path('timesheet', EmployeeTimeSheetView.as_view(),
+             name='employee_timesheet'),
     ])),
 ]
 
@@ -1,33 +1,49 @@
-from itertools import chain
+import datetime
+from itertools import chain, zip_longest
 
 from django import forms
-from django.db import models
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, router
 from django.db.models import Q
 from django.http import (
     HttpResponseRedirect, JsonResponse, FileResponse, Http404
 )
 from django.urls import NoReverseMatch
-from django.utils.html import format_html
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.html import escape, format_html
+from django.utils.http import quote_etag, urlencode
+from django.utils.safestring import mark_safe
 from django.views.generic.base import View, TemplateView
 
 from account.models import UserSettings
 from account.views import UserSettingsView
+from contract import filters, hours, lookups, search, timesheet
 from contract.forms import (
     ContractForm, LetterForm, AddAgreementForm, StageBeginListForm,
     StageMiddleListForm, StageEndListForm, StageAddForm, SetTimeWorkForm,
+    TimeSheetForm,
+)
+from contract.models import Contract, ContractStatistics, Member, TimeWork
+from core.audit import audit_atomic
+from core.export import (
+    EXPORT_FORMATS, ExportColumn, export_response, field_export_column,
 )
-from contract.models import Contract
 from core.mixins import (
     BaseSiteMixin, MultipleListView, DataObjectMixin,
     AddFormView, ChangeFormView, DeleteFormView, HistoryListView,
 )
+from core.registry import site_registry
 from core.utils import (
-    has_permission_add, has_permission_change, has_permission_view,
-    get_slug_url, try_get_url, id_list,
-
+    get_permission_matrix, has_permission_view, has_permission_add,
+    has_permission_change, has_permission_delete, get_slug_kwarg,
+    get_slug_url, try_get_url, label_for_column,
+    annotate_related_exists, related_exists_map, related_exists_name,
+    is_cache_shared,
+)
+from database.models import (
+    Employee, Client, ConditionContract, StatusContract, get_short_name,
 )
-from database.models import Post, SubDivision, Employee, Client
-from users.models import UserProfile
 
 APP_LABEL = 'contract'
 
@@ -46,6 +62,7 @@ settings_dict = {
         'fields_link': ('number',),
         # 'fields_editable': ('date',),
         'readonly_fields': (),
+        'search_fields': ('number', 'title'),
     },
     'member': {
         'fields_related': ('employee',),
@@ -69,6 +86,7 @@ settings_dict = {
         'fields_link': ('number',),
         # 'fields_editable': ('date',),
         'readonly_fields': (),
+        'search_fields': ('number', 'title'),
     },
     'contact': {
         # 'fields_related': (),
@@ -164,6 +182,7 @@ class ContractMixin:
 
         action = self.action
         utlargs = {**self.kwargs}
+        permission_matrix = get_permission_matrix(request)
         menu = []
         exclude_model = [
             value
@@ -189,9 +208,11 @@ class ContractMixin:
                     continue
                 model_name = opts.model_name
                 vnp = opts.verbose_name_plural
-            if not all(
-                    has_permission_view(request, model) for model in model_list
-            ):
+            model_list_perms = [
+                permission_matrix.get_model_perms(model)
+                for model in model_list
+            ]
+            if not all(perms['view'] for perms in model_list_perms):
                 continue
 
             model_dict = {
@@ -200,8 +221,7 @@ class ContractMixin:
                 'perms': {},
             }
             if (
-                    all(has_permission_change(request, model)
-                        for model in model_list)
+                    all(perms['change'] for perms in model_list_perms)
                     and action != 'view'
             ):
                 model_dict['perms']['change'] = True
@@ -220,8 +240,7 @@ class ContractMixin:
                     f'{APP_LABEL}_list', **utlargs
                 )
                 if (
-                        all(has_permission_add(request, model)
-                            for model in model_list)
+                        all(perms['add'] for perms in model_list_perms)
                         and action != 'view'
                 ):
                     model_dict['perms']['add'] = True
@@ -282,90 +301,57 @@ class ContractMixin:
 class ObjectListView(ContractMixin, MultipleListView):
     """Список форм"""
 
+    @property
+    def sidebar(self):
+        if self.model_name == 'contract':
+            return 'filter_sidebar'
+        return super().sidebar
+
     def get_filters(self):
-        """Фильтры
-            'title' - заголовок фильтра,
-            'name' - название фильтра в GET запросе,
-            'select' - переменная для записи выбранного значения,
-            'queryitems' - список из базы данных,
         """
-        filters = {
-            'condition': {
-                'title': 'состояние:',
-                'name': 'condition',
-                'select': '',
-                'queryitems': ConditionContract.objects.all(),
-            },
-            'status': {
-                'title': 'статус:',
-                'name': 'status',
-                'select': '',
-                'queryitems': StatusContract.objects.all(),
-            },
-            # 'controlPrice': {
-            #     'title': 'контроль цены:',
-            #     'name': 'control_price',
-            #     'select': '',
-            #     'queryitems': ControlPrice.objects.all(),
-            # },
-            'otvetstvenny': {
-                'title': 'Ответственный:',
-                'name': 'otvetstvenny',
-                'select': '',
-                'queryitems': UserProfile.objects.filter(otvetstvenny=True),
-            },
-            'soprovojdenie': {
-                'title': 'Сопровождение:',
-                'name': 'soprovojdenie',
-                'select': '',
-                'queryitems': UserProfile.objects.filter(soprovojdenie=True),
-            },
-            'ispolnitel': {
-                'title': 'Исполнитель:',
-                'name': 'ispolnitel',
-                'select': '',
-                # 'queryitems': get_contract_id(UserProfile, kwargs={'user_otvetstvenny': True}),
-                'queryitems': UserProfile.objects.filter(ispolnitel=True),
-            },
-            'middlename': {
-                'title': 'этапы выполнения',
-                'name': 'middlename',
-                'select': '',
-                # 'queryitems': get_contract_id(UserProfile, kwargs={'user_otvetstvenny': True}),
-                'queryitems': StageMiddleName.objects.all(),
-            },
-        }
-        return filters
+        Фильтры боковой панели (contract.filters.FILTERS) с количеством
+        договоров по значениям
+        """
+        queryset = self.model._default_manager.filter(self.get_query())
+        return filters.get_filters(queryset, self.request.GET)
 
-    def get_changelist_instance(self, formset=None, **kwargs):
+    def get_changelist_instance(self, formset=None, index=0, **kwargs):
         if self.model_name != 'contract':
-            return super().get_changelist_instance(formset, **kwargs)
+            return super().get_changelist_instance(formset, index, **kwargs)
         ChangeList = self.get_changelist()
-        object_list = kwargs.get('queryset')
+        settings = UserSettings.objects.get_settings(self.request.user.pk)
+        columns = settings.get('contract_list', ['number'])
+
+        related_objects = [
+            rel
+            for rel in Contract._meta.related_objects
+            if rel.one_to_many and rel.name in columns
+        ]
+        object_list = annotate_related_exists(
+            kwargs.get('queryset'), related_objects
+        )
         cl = ChangeList(
-            self.request, object_list, self, self.model, self.form_changelist
+            self.request, object_list, self, self.model, self.form_changelist,
+            list_index=index,
         )
-        user_settings = UserSettings.objects.get(user=self.request.user)
-        settings = user_settings.get_settings()
-        cl.columns = settings.get('contract_list', ['number'])
-
-        related_models = [
-            model.related_model
-            for model in Contract._meta.related_objects
-            if model.one_to_many and model.name in cl.columns
-        ]
-        check = {}
-        for model in related_models:
-            ids = id_list(Contract, model)
-            check.update({model._meta.model_name: ids})
-        cl.check = check
+        cl.columns = columns
+        cl.check = related_exists_map(cl.result_list, related_objects)
 
         return cl
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # if self.model_name == 'contract':
-        #     context['filters'] = self.get_filters()
+        if self.model_name == 'contract':
+            context['filters'], context['date'] = self.get_filters()
+            context['filter_reset_url'] = self.request.path
+            export_url = try_get_url(
+                'contract_export', current_app=APP_LABEL, action=self.action
+            )
+            if export_url:
+                context['export_urls'] = [
+                    (file_format, f'{export_url}?format={file_format}')
+                    for file_format in EXPORT_FORMATS
+                ]
 
         return context
 
@@ -373,7 +359,10 @@ class ObjectListView(ContractMixin, MultipleListView):
         query &= self.get_query()
         if self.model_name != 'contract':
             query &= Q(('contract__id', self.related_id), )
-        return super().get_queryset(query)
+            return super().get_queryset(query)
+        return filters.filter_contracts(
+            super().get_queryset(query), self.request.GET
+        )
 
 
 class ObjectChangeView(ContractMixin, ChangeFormView):
@@ -441,14 +430,19 @@ class ObjectAddView(ContractMixin, AddFormView):
                     for model_name in self.dict_models_list[name_list]['list']
                 ]
                 changecount = 0
-                for field, model in zip(fields_list, model_list):
-                    values = form.cleaned_data.get(field)
-                    if values:
-                        for value in values:
-                            model.objects.create(
-                                contract_id=self.related_id, name=value,
-                            )
-                            changecount += 1
+                # Записи журнала добавляются одной вставкой в конце блока
+                with audit_atomic(using=router.db_for_write(Contract)):
+                    for field, model in zip(fields_list, model_list):
+                        values = form.cleaned_data.get(field)
+                        if values:
+                            for value in values:
+                                obj = model.objects.create(
+                                    contract_id=self.related_id, name=value,
+                                )
+                                self.log_entry(
+                                    self.request, obj, [{'added': {}}], 'add'
+                                )
+                                changecount += 1
 
                 # Формирование сообщения об успешной записи
                 if changecount:
@@ -484,8 +478,7 @@ class ProjectsView(BaseSiteMixin, TemplateView):
             'employee'
         ]
         for project in projects:
-            model = self.get_model(project)
-            app_label = model._meta.app_label
+            app_label, model = site_registry.get_model_by_name(project)
             name = f'{project}_list'
             slug = get_slug_url({}, project)
             list_url = try_get_url(name, slug, current_app=app_label)
@@ -497,6 +490,24 @@ class ProjectsView(BaseSiteMixin, TemplateView):
 
             project_list.append(app_dict)
 
+        if has_permission_view(self.request, Contract):
+            project_list.append({
+                "vnp": ContractStatistics._meta.verbose_name_plural,
+                "label": APP_LABEL,
+                "list_url": try_get_url('contract_statistics'),
+            })
+            project_list.append({
+                "vnp": 'поиск по договорам',
+                "label": APP_LABEL,
+                "list_url": try_get_url('contract_search'),
+            })
+        if has_permission_view(self.request, TimeWork):
+            project_list.append({
+                "vnp": 'отчет по часам',
+                "label": APP_LABEL,
+                "list_url": try_get_url('hours_report'),
+            })
+
         return project_list
 
     def get_context_data(self, **kwargs):
@@ -506,6 +517,235 @@ class ProjectsView(BaseSiteMixin, TemplateView):
         return context
 
 
+class ContractStatisticsView(BaseSiteMixin, TemplateView):
+    """
+    Сводка по открытым договорам. Читается только таблица сводки
+    (ContractStatistics) и наименования значений из справочников
+    """
+
+    template_name = 'contract/statistics.html'
+    app_label = APP_LABEL
+    # Разрезы сводки: модель значений
+    dimension_models = {
+        ContractStatistics.STATUS: StatusContract,
+        ContractStatistics.CONDITION: ConditionContract,
+        ContractStatistics.CLIENT: Client,
+    }
+
+    def get_statistics(self):
+        """
+        Строки сводки по разрезам: {dimension: [row]}, где row - строка
+        сводки с наименованием значения (row.name)
+        """
+        statistics = {
+            dimension: []
+            for dimension, _ in ContractStatistics.DIMENSION_CHOICES
+        }
+        rows = ContractStatistics.objects.filter(count__gt=0).order_by(
+            '-count', '-price_plus_nds'
+        )
+        for row in rows:
+            statistics[row.dimension].append(row)
+
+        for dimension, model in self.dimension_models.items():
+            keys = [row.key for row in statistics[dimension] if row.key]
+            names = model._base_manager.in_bulk(keys)
+            for row in statistics[dimension]:
+                row.name = names.get(row.key, 'не указано')
+        return statistics
+
+    def get(self, request, *args, **kwargs):
+        if not has_permission_view(request, Contract):
+            raise Http404
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        statistics = self.get_statistics()
+        total = statistics.pop(ContractStatistics.TOTAL)
+        context.update(
+            title='Сводка по договорам',
+            total=total[0] if total else None,
+            statistics=[
+                (label, statistics[dimension])
+                for dimension, label in ContractStatistics.DIMENSION_CHOICES
+                if dimension in statistics
+            ],
+        )
+        return context
+
+
+class HoursReportView(BaseSiteMixin, TemplateView):
+    """
+    Отчет по часам работы (contract.hours) за месяцы по сотрудникам,
+    подразделениям, договорам и месяцам с нормой часов сотрудника.
+    Выгрузка в CSV/XLSX - параметр format
+
+    GET параметры: start, end - месяцы ГГГГ-ММ, group - группировки
+    (повторяется), raw - расчет по исходным записям
+    """
+
+    template_name = 'contract/hours_report.html'
+    app_label = APP_LABEL
+
+    def get_params(self):
+        params = self.request.GET
+        current = datetime.date.today().replace(day=1)
+        end = hours.get_month(params.get('end'), current)
+        start = hours.get_month(params.get('start'), end.replace(month=1))
+        if start > end:
+            start, end = end, start
+        groups = [
+            name for name in hours.GROUPS if name in params.getlist('group')
+        ] or list(hours.DEFAULT_GROUPS)
+        return start, end, groups, not params.get('raw')
+
+    def get_header(self, groups):
+        header = [hours.GROUPS[name]['title'] for name in groups]
+        header.append('Часы')
+        if 'employee' in groups:
+            header.extend(['Норма', 'Отклонение'])
+        return header
+
+    def get(self, request, *args, **kwargs):
+        if not has_permission_view(request, TimeWork):
+            raise Http404
+        file_format = request.GET.get('format')
+        if file_format is None:
+            return super().get(request, *args, **kwargs)
+        if file_format not in EXPORT_FORMATS:
+            raise Http404
+        start, end, groups, use_rollup = self.get_params()
+        rows, total = hours.get_report(start, end, groups, use_rollup)
+        with_norma = 'employee' in groups
+        return export_response(
+            file_format,
+            f'hours_{start:%Y%m}_{end:%Y%m}',
+            self.get_header(groups),
+            (self.get_export_row(row, with_norma) for row in rows),
+        )
+
+    def get_export_row(self, row, with_norma):
+        labels, row_hours, norma, deviation = row
+        values = [*labels, row_hours]
+        if with_norma:
+            values.extend(
+                '' if value is None else value for value in (norma, deviation)
+            )
+        return values
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        start, end, groups, use_rollup = self.get_params()
+        rows, total = hours.get_report(start, end, groups, use_rollup)
+        query = self.request.GET.copy()
+        query.pop('format', None)
+        context.update(
+            title='Отчет по часам',
+            start=start,
+            end=end,
+            group_options=[
+                (name, opts['title'], name in groups)
+                for name, opts in hours.GROUPS.items()
+            ],
+            group_count=len(groups),
+            raw=not use_rollup,
+            header=self.get_header(groups),
+            rows=rows,
+            total=total,
+            with_norma='employee' in groups,
+            export_urls=[
+                (file_format, '?' + urlencode(
+                    [*query.lists(), ('format', [file_format])], doseq=True
+                ))
+                for file_format in EXPORT_FORMATS
+            ],
+        )
+        return context
+
+
+class ContractSearchView(BaseSiteMixin, TemplateView):
+    """
+    Полнотекстовый поиск по договорам и их документам (contract.search):
+    найденные записи по договорам в порядке релевантности
+    """
+
+    template_name = 'contract/search.html'
+    app_label = APP_LABEL
+    search_var = 'q'
+    hits_limit = 200
+
+    def get_object_url(self, model, obj_id, contract):
+        model_name = model._meta.model_name
+        if model is Contract:
+            slug = get_slug_url({}, model_name, obj_id)
+        else:
+            slug = get_slug_url({}, model_name, obj_id, contract.pk)
+        return try_get_url(
+            f'{APP_LABEL}_change',
+            slug,
+            current_app=APP_LABEL,
+            action='view' if contract.closed else None,
+        )
+
+    def get_snippet(self, snippet):
+        return mark_safe(
+            escape(snippet)
+            .replace(search.SNIPPET_START, '<mark>')
+            .replace(search.SNIPPET_END, '</mark>')
+        )
+
+    def get_results(self, query):
+        """
+        Найденные договора: [{'contract', 'url', 'hits'}], hits - записи
+        индекса объектов, доступных пользователю
+        """
+        hits = [
+            hit
+            for hit in search.search(query, self.hits_limit)
+            if has_permission_view(self.request, hit[0])
+        ]
+        groups = search.group_by_contract(hits)
+        contracts = Contract._base_manager.only(
+            'number', 'title', 'date', 'closed'
+        ).in_bulk([contract_id for contract_id, _ in groups])
+
+        results = []
+        for contract_id, contract_hits in groups:
+            contract = contracts.get(contract_id)
+            if contract is None:
+                continue
+            results.append({
+                'contract': contract,
+                'url': self.get_object_url(Contract, contract.pk, contract),
+                'hits': [
+                    {
+                        'name': model._meta.verbose_name,
+                        'url': self.get_object_url(model, obj_id, contract),
+                        'snippet': self.get_snippet(snippet),
+                    }
+                    for model, obj_id, _, _, snippet in contract_hits
+                ],
+            })
+        return results
+
+    def get(self, request, *args, **kwargs):
+        if not has_permission_view(request, Contract):
+            raise Http404
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get(self.search_var, '').strip()
+        context.update(
+            title='Поиск по договорам',
+            search_var=self.search_var,
+            query=query,
+            results=self.get_results(query) if query else [],
+        )
+        return context
+
+
 # class MainListView(MultipleListView):
 # class MainListView(BaseSiteMixin, ListView):
 #     """Главная страница (список договоров)"""
@@ -689,6 +929,7 @@ class EmployeeChangeView(MultipleListView):
     app_label = APP_LABEL
     btn_add = False
     form_class = SetTimeWorkForm
+    paginate_by = None
 
     opts_dict = {
         'timework': {
@@ -740,6 +981,9 @@ class EmployeeChangeView(MultipleListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Время сотрудника'
+        context['timesheet_url'] = try_get_url(
+            'employee_timesheet', self.kwargs.get('slug'), APP_LABEL
+        )
         if "form_object" not in context:
             self.object = Employee.objects.get(pk=self.obj_id)
         context['total_result_count'] += len(self.get_formset_initial())
@@ -790,6 +1034,10 @@ class EmployeeChangeView(MultipleListView):
         """Отключение записи изменений в журнал"""
         pass
 
+    def log_changes(self, changes):
+        """Отключение записи изменений списка в журнал"""
+        pass
+
     def post(self, request, *args, **kwargs):
         self.get_attributes_model_list()
         self.user_perm = self.get_model_list_perms(request, self.models_list)
@@ -804,6 +1052,92 @@ class EmployeeChangeView(MultipleListView):
         return super().post(request, *args, **kwargs)
 
 
+class EmployeeTimeSheetView(BaseSiteMixin, TemplateView):
+    """
+    Табель сотрудника за неделю или месяц (contract.timesheet): строки -
+    договоры, столбцы - дни. Изменения записываются списком в одной
+    транзакции
+    """
+    template_name = 'contract/timesheet.html'
+    app_label = APP_LABEL
+
+    def get_timesheet(self):
+        employee_id = get_slug_kwarg(self.kwargs)[1]
+        try:
+            self.object = Employee.objects.get(pk=employee_id)
+        except (Employee.DoesNotExist, ValueError):
+            raise Http404
+        self.period, start, end = timesheet.get_period(self.request.GET)
+        return timesheet.TimeSheet(self.object.pk, start, end)
+
+    def get_period_url(self, period, date):
+        return '?' + urlencode({
+            timesheet.PERIOD_VAR: period,
+            timesheet.DATE_VAR: date.isoformat(),
+        })
+
+    def get(self, request, *args, **kwargs):
+        if not has_permission_view(request, TimeWork):
+            raise Http404
+        self.form = TimeSheetForm(self.get_timesheet())
+        return super().get(request, *args, **kwargs)
+
+    def has_save_permission(self, request):
+        return all(
+            has_permission(request, TimeWork)
+            for has_permission in (
+                has_permission_add,
+                has_permission_change,
+                has_permission_delete,
+            )
+        )
+
+    def post(self, request, *args, **kwargs):
+        if not self.has_save_permission(request):
+            raise Http404
+        self.form = TimeSheetForm(self.get_timesheet(), request.POST)
+        if not self.form.is_valid():
+            return self.render_to_response(self.get_context_data())
+        count = self.form.timesheet.save(self.form.cleaned_data)
+        if count:
+            self.message_user_success(
+                request, f'Табель сохранен, изменено записей: {count}'
+            )
+        else:
+            self.message_user_warning(request)
+        return HttpResponseRedirect(request.get_full_path())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        sheet = self.form.timesheet
+        rows = self.form.get_rows()
+        totals = [0] * len(sheet.days)
+        for contract, fields, total in rows:
+            for index, field in enumerate(fields):
+                totals[index] += self.form.get_value(field)
+        previous, following = timesheet.get_adjacent_dates(
+            self.period, sheet.start
+        )
+        context.update(
+            title=f'Табель: {self.object}',
+            employee=self.object,
+            form=self.form,
+            days=sheet.days,
+            rows=rows,
+            totals=totals,
+            total=sum(totals),
+            period_urls=[
+                (label, self.get_period_url(period, sheet.start),
+                 period == self.period)
+                for period, label in timesheet.PERIODS.items()
+            ],
+            previous_url=self.get_period_url(self.period, previous),
+            next_url=self.get_period_url(self.period, following),
+            btn={'btn_save': self.has_save_permission(self.request)},
+        )
+        return context
+
+
 class ArchiveMixin:
     """Архив"""
     action = 'view'
@@ -829,37 +1163,148 @@ class ArchiveHistoryView(ArchiveMixin, ObjectHistoryView):
     """Архив - история изменений"""
 
 
-class ValueChangeView(View):
-    """Автозаполнение объектов при выборе значений в списке"""
+class ContractExportView(ContractMixin, BaseSiteMixin, View):
+    """
+    Выгрузка списка договоров в CSV/XLSX. Столбцы - по настройкам списка
+    пользователя, записи читаются частями через values() без создания
+    объектов модели
+    """
 
-    def get(self, request):
-        new_data = {'element': request.GET.get('element')}
-        if new_data['element'] == 'client_name':
-            if request.GET.get('id'):
-                data = Client.objects.filter(pk=request.GET.get('id')).values(
-                    'city', 'inn', 'department__name').first()
-            else:
-                data = {'city': '', 'inn': '', 'department__name': ''}
-        elif new_data['element'] == 'post_abbr':
-            if request.GET.get('id'):
-                data = Post.objects.filter(pk=request.GET.get('id')).values(
-                    'abbr').first()
-            else:
-                data = {'abbr': ''}
-        elif new_data['element'] == 'division':
-            if request.GET.get('id'):
-                second_list = SubDivision.objects.filter(
-                    division__id=request.GET.get('id'))
-                data = [{'id': item.id, 'text': item.name} for item in
-                        second_list]
-            else:
-                second_list = SubDivision.objects.all()
-                data = [{'id': item.id, 'text': item.name} for item in
-                        second_list]
+    model = Contract
+    chunk_size = 2000
+
+    def get_related_column(self, field, label):
+        """Столбец для связанной модели: значение по полям values()"""
+        name = field.name
+        if field.related_model is Member:
+            lookups = [
+                f'{name}__employee__{attr}'
+                for attr in ('last_name', 'first_name', 'middle_name')
+            ]
+
+            def get_value(values):
+                if values[lookups[0]] is None:
+                    return ''
+                return get_short_name(*(values[key] for key in lookups))
+
+            return ExportColumn(label, lookups, get_value)
+
+        related_opts = field.related_model._meta
+        try:
+            related_opts.get_field('name')
+            lookup = f'{name}__name'
+        except FieldDoesNotExist:
+            lookup = f'{name}__number'
+        return ExportColumn(label, (lookup,))
+
+    def get_export_columns(self, columns):
+        permission_matrix = get_permission_matrix(self.request)
+        opts = self.model._meta
+        export_columns, related_objects = [], []
+        for name in columns:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            label = label_for_column(name, self.model, form=ContractForm)
+            if field.one_to_many:
+                if not permission_matrix.has_perm(field.related_model,
+                                                  'view'):
+                    continue
+                related_objects.append(field)
+                key = related_exists_name(field)
+                export_columns.append(ExportColumn(
+                    label,
+                    (key,),
+                    lambda values, key=key: 'да' if values[key] else '',
+                ))
+            elif field.many_to_one:
+                export_columns.append(self.get_related_column(field, label))
+            elif not field.is_relation:
+                export_columns.append(field_export_column(field, label))
+        return export_columns, related_objects
 
-        new_data.update(data=data)
+    def get(self, request, *args, **kwargs):
+        self.model_name = 'contract'
+        if not get_permission_matrix(request).has_perm(self.model, 'view'):
+            raise Http404
+        file_format = request.GET.get('format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            raise Http404
+
+        settings = UserSettings.objects.get_settings(request.user.pk)
+        columns, related_objects = self.get_export_columns(
+            settings.get('contract_list', ['number'])
+        )
+        queryset = annotate_related_exists(
+            self.model._default_manager.filter(self.get_query()),
+            related_objects,
+        ).order_by('pk')
+        lookups = [lookup for column in columns for lookup in column.lookups]
+        rows = (
+            [column.get_value(values) for column in columns]
+            for values in queryset.values(*lookups).iterator(
+                chunk_size=self.chunk_size
+            )
+        )
+        filename = 'archive' if self.action == 'view' else 'contracts'
+        return export_response(
+            file_format,
+            filename,
+            [column.label for column in columns],
+            rows,
+        )
+
+
+class ArchiveContractExportView(ArchiveMixin, ContractExportView):
+    """Архив - выгрузка списка договоров"""
+
+
+class LookupView(LoginRequiredMixin, View):
+    """
+    Данные для заполнения страницы при выборе значений в списках
+    (contract.lookups) в JSON. Несколько пар element/id - одним
+    запросом, prefetch - все данные элементов для загрузки страницы.
+    Ответ проверяется браузером по ETag версии справочников, если версии
+    общие для процессов сервера (core.utils.is_cache_shared), иначе не
+    кэшируется
+
+    GET параметры: element и id (повторяются парами), prefetch
+    """
+
+    def get_params(self, request):
+        elements = request.GET.getlist('element')
+        ids = request.GET.getlist('id')[:len(elements)]
+        pairs = [
+            (element, lookups.parse_id(pk))
+            for element, pk in zip_longest(elements, ids, fillvalue='')
+        ]
+        prefetch = list(dict.fromkeys(request.GET.getlist('prefetch')))
+        if len(pairs) > lookups.MAX_LOOKUPS:
+            raise Http404
+        for element, _ in pairs:
+            if element not in lookups.LOOKUPS:
+                raise Http404
+        for element in prefetch:
+            if not lookups.LOOKUPS.get(element, {}).get('prefetch'):
+                raise Http404
+        return pairs, prefetch
+
+    def get(self, request, *args, **kwargs):
+        pairs, prefetch = self.get_params(request)
+        if not is_cache_shared():
+            response = JsonResponse(lookups.get_lookups(pairs, prefetch))
+            patch_cache_control(response, private=True, no_store=True)
+            return response
+        elements = {element for element, _ in pairs}.union(prefetch)
+        etag = quote_etag(lookups.get_version(elements))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse(lookups.get_lookups(pairs, prefetch))
+        response.headers['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
-        return JsonResponse(new_data, safe=False)
 
 # class FilterContractView(MainListView):
 #     """Работа фильтров по договорам боковой панели"""
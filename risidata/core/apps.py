@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.core.signals import setting_changed
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        super().ready()
+        from core.mixins import clear_main_menu
+        from core.registry import site_registry
+        from core.utils import clear_url_templates
+
+        # Параметры разделов: settings_dict, формы и поля списков
+        site_registry.populate()
+
+        setting_changed.connect(clear_url_templates)
+        setting_changed.connect(clear_main_menu)
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router, transaction
+
+from risi.models import LogEntrySite
+
+# Буферы журнала изменений открытых блоков audit_atomic(), от внешнего к
+# вложенному
+audit_logs = ContextVar('audit_logs', default=())
+
+
+class AuditLog:
+    """
+    Записи журнала изменений блока audit_atomic(). Записываются одной
+    вставкой в конце внешнего блока, при исключении в блоке отбрасываются
+    вместе с его изменениями
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.entries = []
+
+    def add(self, *entries):
+        self.entries.extend(entries)
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if entries:
+            LogEntrySite.objects.using(self.using).bulk_create(entries)
+
+
+@contextmanager
+def audit_atomic(using=None):
+    """
+    transaction.atomic() с буфером журнала изменений: записи вложенного
+    блока переносятся в буфер внешнего при успешном выходе из него,
+    записи внешнего блока вставляются перед фиксацией транзакции
+    """
+    using = using or router.db_for_write(LogEntrySite)
+    audit_log = AuditLog(using)
+    parents = audit_logs.get()
+    with transaction.atomic(using=using):
+        token = audit_logs.set((*parents, audit_log))
+        try:
+            yield audit_log
+        finally:
+            audit_logs.reset(token)
+        parent = get_audit_log(using, parents)
+        if parent is None:
+            audit_log.flush()
+        else:
+            parent.add(*audit_log.entries)
+
+
+def get_audit_log(using=None, logs=None):
+    """Буфер журнала изменений вложенного блока audit_atomic() или None"""
+    using = using or router.db_for_write(LogEntrySite)
+    for audit_log in reversed(audit_logs.get() if logs is None else logs):
+        if audit_log.using == using:
+            return audit_log
+    return None
+
+
+def add_log_entries(*entries):
+    """
+    Запись журнала изменений: внутри audit_atomic() - через буфер блока,
+    иначе - сразу одной вставкой. Сообщение об изменениях сохраняется в
+    подготовленном для вывода виде
+    """
+    if not entries:
+        return
+    # Сообщения готовятся при записи на языке запроса
+    for entry in entries:
+        entry.set_change_message_text()
+    audit_log = get_audit_log()
+    if audit_log is None:
+        LogEntrySite.objects.bulk_create(entries)
+    else:
+        audit_log.add(*entries)
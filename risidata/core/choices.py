@@ -0,0 +1,153 @@
+import time
+
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete
+from django.forms.models import ModelChoiceField, ModelChoiceIterator
+
+from core.signals import connect_post_save
+from core.utils import bump_cache_version, get_cache_version
+
+
+class ChoicesCache:
+    """
+    Варианты выбора справочников в памяти процесса: {(модель, база):
+    (версия, [(pk, наименование)], {str(pk): наименование}, время)}.
+    Версия справочника хранится в общем для процессов кэше Django
+    (settings.CACHES) и изменяется при фиксации сохранения или удаления
+    его записей. Записи старше timeout перечитываются и без изменения
+    версии (изменения в обход сохранения, кэш в памяти процесса)
+    """
+
+    timeout = 300
+
+    def __init__(self):
+        self.models = set()
+        self.entries = {}
+
+    @staticmethod
+    def get_version_key(model):
+        return f'core:choices:{model._meta.label_lower}:version'
+
+    def register(self, *models):
+        """Справочники, варианты выбора которых кэшируются"""
+        for model in models:
+            self.models.add(model)
+            uid = f'choices_cache:{model._meta.label_lower}'
+            connect_post_save(
+                self.invalidate, model, self.invalidate, dispatch_uid=uid
+            )
+            post_delete.connect(
+                self.invalidate, sender=model, dispatch_uid=uid
+            )
+
+    def invalidate(self, sender, using=None, **kwargs):
+        """
+        Сброс вариантов выбора справочника. Версия изменяется при фиксации
+        транзакции: до нее другие процессы читают прежние записи
+        """
+        using = using or router.db_for_write(sender)
+        for key in [key for key in self.entries if key[0] is sender]:
+            del self.entries[key]
+        transaction.on_commit(
+            lambda: bump_cache_version(self.get_version_key(sender)),
+            using=using,
+        )
+
+    def get_entry(self, model, using):
+        version = get_cache_version(self.get_version_key(model))
+        entry = self.entries.get((model, using))
+        if (
+                entry is not None
+                and entry[0] == version
+                and time.monotonic() - entry[3] < self.timeout
+        ):
+            return entry
+        choices = [
+            (obj.pk, str(obj))
+            for obj in model._default_manager.using(using).all()
+        ]
+        entry = (
+            version,
+            choices,
+            {str(pk): label for pk, label in choices},
+            time.monotonic(),
+        )
+        # Внутри транзакции могут читаться не зафиксированные записи
+        if not connections[using].in_atomic_block:
+            self.entries[model, using] = entry
+        return entry
+
+    def get_choices(self, model, using=None):
+        """[(pk, наименование)] записей справочника в порядке модели"""
+        using = using or router.db_for_read(model)
+        return self.get_entry(model, using)[1]
+
+    def get_labels(self, model, using=None):
+        """{str(pk): наименование} записей справочника"""
+        using = using or router.db_for_read(model)
+        return self.get_entry(model, using)[2]
+
+
+choices_cache = ChoicesCache()
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора из кэша справочника, если поле его использует"""
+
+    def __iter__(self):
+        if not self.field.uses_cache():
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from choices_cache.get_choices(
+            self.queryset.model, self.queryset.db
+        )
+
+    def __len__(self):
+        if not self.field.uses_cache():
+            return super().__len__()
+        return len(choices_cache.get_choices(
+            self.queryset.model, self.queryset.db
+        )) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        if not self.field.uses_cache():
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(
+            choices_cache.get_choices(self.queryset.model, self.queryset.db)
+        )
+
+    def get_labels(self):
+        """
+        {str(pk): наименование} для вывода выбранных значений без запроса
+        либо None, если кэш не используется
+        """
+        if not self.field.uses_cache():
+            return None
+        return choices_cache.get_labels(
+            self.queryset.model, self.queryset.db
+        )
+
+
+class CachedModelChoiceField(ModelChoiceField):
+    """
+    ModelChoiceField справочника с вариантами выбора из choices_cache.
+    Кэш используется для всех записей справочника в порядке модели
+    (queryset без отбора и сортировки), наименование - str(obj); при
+    другом queryset варианты читаются запросом. Выбранное значение
+    проверяется по queryset
+    """
+
+    iterator = CachedModelChoiceIterator
+
+    def uses_cache(self):
+        query = self.queryset.query
+        return (
+            self.queryset.model in choices_cache.models
+            and self.to_field_name is None
+            and not query.where
+            and not query.order_by
+            and not query.is_sliced
+            and not query.distinct
+        )
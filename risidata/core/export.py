@@ -0,0 +1,226 @@
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+XLSX_CONTENT_TYPE = (
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+)
+EXPORT_FORMATS = ('csv', 'xlsx')
+XLSX_FLUSH_ROWS = 500
+XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Начало текста, которое табличный редактор считает формулой
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'content-types">'
+    '<Default Extension="rels" ContentType="application/'
+    'vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships">'
+    '<sheets><sheet name="{}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/'
+    '2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf/><xf fontId="1" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+XLSX_SHEET_BEGIN = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main"><sheetData>'
+)
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+class ExportColumn:
+    """
+    Столбец выгрузки: заголовок, поля для values() и функция получения
+    значения ячейки из словаря значений записи
+    """
+
+    def __init__(self, label, lookups, get_value=None):
+        self.label = label
+        self.lookups = tuple(lookups)
+        if get_value is None:
+            lookup = self.lookups[0]
+
+            def get_value(values):
+                return values[lookup]
+
+        self.get_value = get_value
+
+
+def field_export_column(field, label=None, lookup=None):
+    """Столбец выгрузки для поля модели без связей"""
+    lookup = lookup or field.name
+    label = label or field.verbose_name
+    if field.flatchoices:
+        choices = dict(field.flatchoices)
+
+        def get_value(values):
+            return choices.get(values[lookup], values[lookup])
+
+    elif field.get_internal_type() == 'BooleanField':
+        def get_value(values):
+            return 'да' if values[lookup] else 'нет'
+
+    else:
+        get_value = None
+    return ExportColumn(label, (lookup,), get_value)
+
+
+class StreamBuffer:
+    """Буфер записи без позиционирования: содержимое выдается частями"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    """
+    Значение ячейки CSV. Текст, начинающийся как формула, выводится с
+    апострофом, чтобы редактор не выполнил его при открытии файла
+    """
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo(), delimiter=';')
+    # BOM - для корректного открытия в Excel
+    yield '\ufeff' + writer.writerow([csv_value(value) for value in header])
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+
+def xlsx_cell(value, style=''):
+    if value is None or value == '':
+        return '<c%s/>' % style
+    if isinstance(value, bool):
+        value = 'да' if value else 'нет'
+    elif isinstance(value, (int, float, Decimal)):
+        return '<c%s><v>%s</v></c>' % (style, value)
+    elif isinstance(value, datetime.date):
+        value = value.strftime('%d.%m.%Y')
+    text = escape(XML_ILLEGAL_RE.sub('', str(value)))
+    return '<c%s t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % (
+        style, text
+    )
+
+
+def xlsx_row(row, style=''):
+    return '<row>%s</row>' % ''.join(xlsx_cell(value, style) for value in row)
+
+
+def stream_xlsx(header, rows, sheet_name='Лист1'):
+    """
+    Построчная запись XLSX. Архив пишется в буфер без позиционирования,
+    содержимое буфера выдается каждые XLSX_FLUSH_ROWS строк
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_RELS)
+        archive.writestr(
+            'xl/workbook.xml', XLSX_WORKBOOK.format(escape(sheet_name[:31]))
+        )
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', XLSX_STYLES)
+        with archive.open(
+                'xl/worksheets/sheet1.xml', 'w', force_zip64=True
+        ) as sheet:
+            sheet.write(XLSX_SHEET_BEGIN.encode())
+            sheet.write(xlsx_row(header, ' s="1"').encode())
+            for index, row in enumerate(rows, 1):
+                sheet.write(xlsx_row(row).encode())
+                if not index % XLSX_FLUSH_ROWS:
+                    yield buffer.drain()
+            sheet.write(XLSX_SHEET_END.encode())
+    yield buffer.drain()
+
+
+def export_response(file_format, filename, header, rows):
+    """Потоковый ответ с выгрузкой строк в CSV или XLSX"""
+    if file_format == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(header, rows), content_type=XLSX_CONTENT_TYPE
+        )
+    else:
+        file_format = 'csv'
+        response = StreamingHttpResponse(
+            stream_csv(header, rows), content_type=CSV_CONTENT_TYPE
+        )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{filename}.{file_format}"'
+    )
+    return response
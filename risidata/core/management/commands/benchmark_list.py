@@ -0,0 +1,108 @@
+import time
+from itertools import islice, cycle
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+
+from core.templatetags.base_list_tags import results
+from core.utils import get_slug_url, try_get_url
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер времени вывода строк списка: параметры столбцов вычисляются '
+        'один раз для списка и, для сравнения, заново для каждой строки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', help='Раздел сайта, например contract'
+        )
+        parser.add_argument(
+            'model_name', help='Модель списка, например letter'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Количество строк списка (по умолчанию 1000)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество повторов замера (по умолчанию 5)',
+        )
+
+    def get_changelist(self, app_label, model_name):
+        url = try_get_url(
+            f'{app_label}_list',
+            slug=get_slug_url({}, model_name),
+            current_app=app_label,
+        )
+        try:
+            match = resolve(url)
+        except Resolver404:
+            raise CommandError(f'Список {app_label}_list не найден')
+
+        request = RequestFactory().get(url)
+        request.user = get_user_model()._default_manager.filter(
+            is_superuser=True
+        ).first()
+        if request.user is None:
+            raise CommandError('Требуется суперпользователь')
+
+        view = match.func.view_class(**match.func.view_initkwargs)
+        view.setup(request, *match.args, **match.kwargs)
+        view.paginate_by = None
+        view.get_attributes_model_list()
+        view.get_attributes_list(model_name)
+        view.kwargs.update(action=view.action, current_app=view.app_label)
+        cl = view.get_changelist_instance(
+            queryset=view.model._default_manager.none()
+        )
+        if hasattr(cl, 'columns'):
+            raise CommandError(
+                f'Список {model_name} выводится по настройкам пользователя'
+            )
+        cl.formset = None
+        return cl
+
+    def measure(self, cl, repeat, compiled=True):
+        best = None
+        for _ in range(repeat):
+            cl.__dict__.pop('list_columns', None)
+            start = time.perf_counter()
+            if compiled:
+                for row in results(cl):
+                    list(row)
+            else:
+                for row in results(cl):
+                    cl.__dict__.pop('list_columns', None)
+                    list(row)
+            duration = time.perf_counter() - start
+            best = duration if best is None else min(best, duration)
+        return best
+
+    def handle(self, app_label, model_name, rows, repeat, **options):
+        cl = self.get_changelist(app_label, model_name)
+        objects = list(cl.model._default_manager.all()[:rows])
+        if not objects:
+            raise CommandError(f'Записи {model_name} отсутствуют')
+
+        # Записей может быть меньше заданного количества строк -
+        # объекты повторяются
+        cl.result_list = list(islice(cycle(objects), rows))
+        cl.result_count = len(cl.result_list)
+
+        per_row = self.measure(cl, repeat, compiled=False)
+        compiled = self.measure(cl, repeat)
+        self.stdout.write(
+            f'{cl.model.__name__}: строк {cl.result_count}, '
+            f'столбцов {len(cl.list_columns)}'
+        )
+        self.stdout.write(
+            f'параметры столбцов для каждой строки: {per_row * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            f'параметры столбцов один раз: {compiled * 1000:.1f} мс'
+        )
+        self.stdout.write(f'ускорение: {per_row / compiled:.2f}x')
@@ -0,0 +1,128 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.registry import site_registry
+from core.utils import get_slug_url, try_get_url
+
+ACTIONS = ('list', 'add', 'change', 'history', 'delete')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер страниц, сформированных core.urls.get_path: время ответа, '
+        'количество запросов к базе данных и размер ответа по каждому '
+        'адресу. Запросы выполняются тестовым клиентом без изменения данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_labels', nargs='*',
+            help='Разделы сайта (по умолчанию все с settings_dict)',
+        )
+        parser.add_argument(
+            '--username',
+            help='Пользователь (по умолчанию первый суперпользователь)',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Количество повторов каждого запроса (по умолчанию 3)',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывод результатов в формате JSON',
+        )
+
+    def get_user(self, username):
+        users = get_user_model()._default_manager
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('Пользователь не найден')
+        return user
+
+    def get_app_labels(self, app_labels):
+        if app_labels:
+            return app_labels
+        return list(site_registry.opts)
+
+    def get_routes(self, app_label):
+        """Адреса страниц раздела по записям, имеющимся в базе данных"""
+        for model_name in site_registry.get_opts(app_label):
+            model = site_registry.get_model(app_label, model_name)
+            if model is None:
+                continue
+            obj = model._default_manager.order_by('pk').first()
+            related_id = getattr(obj, 'contract_id', None) or 0
+            for action in ACTIONS:
+                if action in ('list', 'add'):
+                    obj_id = 0
+                elif obj is None:
+                    continue
+                else:
+                    obj_id = obj.pk
+                slug = get_slug_url({}, model_name, obj_id, related_id)
+                name = f'{app_label}_{action}'
+                url = try_get_url(name, slug, current_app=app_label)
+                if url:
+                    yield name, url
+
+    def measure(self, client, url, repeat):
+        durations = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    size = sum(len(chunk) for chunk in response)
+                else:
+                    size = len(response.content)
+                durations.append(time.perf_counter() - start)
+        return {
+            'status': response.status_code,
+            'time_ms': round(statistics.median(durations) * 1000, 1),
+            'time_min_ms': round(min(durations) * 1000, 1),
+            'queries': len(queries),
+            'bytes': size,
+        }
+
+    def handle(self, *args, app_labels, username, repeat, **options):
+        client = Client(raise_request_exception=False)
+        client.force_login(self.get_user(username))
+
+        results = []
+        for app_label in self.get_app_labels(app_labels):
+            for name, url in self.get_routes(app_label):
+                results.append({
+                    'name': name,
+                    'url': url,
+                    **self.measure(client, url, repeat),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f'{"статус":>6} {"мс":>8} {"мин. мс":>8} {"запросы":>8} '
+            f'{"байт":>9}  адрес'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["status"]:>6} {result["time_ms"]:>8} '
+                f'{result["time_min_ms"]:>8} {result["queries"]:>8} '
+                f'{result["bytes"]:>9}  {result["url"]}'
+            )
+        self.stdout.write(
+            f'адресов: {len(results)}, '
+            f'время: {sum(r["time_ms"] for r in results):.1f} мс, '
+            f'запросов: {sum(r["queries"] for r in results)}'
+        )
@@ -0,0 +1,126 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('core.performance')
+
+PERFORMANCE_METRICS = ('view_ms', 'sql_count', 'sql_ms', 'result_list_ms')
+
+
+def percentile(values, percent):
+    """Значение процентиля по отсортированному списку (nearest-rank)"""
+    if not values:
+        return None
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+class PerformanceHistory:
+    """
+    Скользящая выборка замеров по имени адреса. Хранится в памяти
+    процесса, для каждого адреса - не более size последних замеров
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self.new_samples)
+
+    def new_samples(self):
+        return deque(maxlen=self.size)
+
+    def add(self, name, sample):
+        with self.lock:
+            self.samples[name].append(sample)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def get_stats(self):
+        with self.lock:
+            samples = {name: list(values)
+                       for name, values in self.samples.items()}
+        stats = {}
+        for name, values in sorted(samples.items()):
+            stats[name] = {'count': len(values)}
+            for metric in PERFORMANCE_METRICS:
+                metric_values = sorted(value[metric] for value in values)
+                stats[name][metric] = {
+                    'p50': percentile(metric_values, 50),
+                    'p95': percentile(metric_values, 95),
+                    'max': metric_values[-1],
+                }
+        return stats
+
+
+performance_history = PerformanceHistory(
+    getattr(settings, 'PERFORMANCE_HISTORY_SIZE', 500)
+)
+
+
+def add_timing(request, metric, start):
+    """Добавление времени от start к замеру текущего запроса"""
+    metrics = getattr(request, 'performance', None)
+    if metrics is not None:
+        metrics[metric] += (time.perf_counter() - start) * 1000
+
+
+class QueryTimer:
+    """Подсчет количества и времени запросов к базе данных"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics['sql_count'] += 1
+            self.metrics['sql_ms'] += (time.perf_counter() - start) * 1000
+
+
+class PerformanceMiddleware:
+    """
+    Замер выполнения представлений: время ответа, количество и время
+    запросов к базе данных, время вывода списка (тег result_list).
+    Результат записывается в журнал core.performance и в скользящую
+    выборку по имени адреса
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.performance = metrics = {
+            'sql_count': 0,
+            'sql_ms': 0.0,
+            'result_list_ms': 0.0,
+        }
+        start = time.perf_counter()
+        with connection.execute_wrapper(QueryTimer(metrics)):
+            response = self.get_response(request)
+        metrics['view_ms'] = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        if match is None:
+            return response
+        sample = {
+            metric: round(metrics[metric], 2)
+            for metric in PERFORMANCE_METRICS
+        }
+        performance_history.add(match.view_name, sample)
+        logger.info(json.dumps({
+            'url_name': match.view_name,
+            'method': request.method,
+            'status': response.status_code,
+            **sample,
+        }))
+        return response
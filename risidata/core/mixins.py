@@ -1,15 +1,15 @@
-import importlib
+import json
 import os
-from itertools import chain
 
 from django import forms
-from django.apps import apps
 from django.contrib.admin.utils import flatten_fieldsets
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 from django.core.paginator import Paginator
-from django.db import transaction, router, models
+from django.db import connections, router, models
+from django.db.models.signals import pre_save
 from django.db.models import Q
 from django.forms.models import modelform_factory, modelformset_factory
 from django.http import HttpResponseRedirect, Http404
@@ -20,15 +20,23 @@ from django.utils.text import capfirst
 from django.views.generic import TemplateView, FormView
 from django.views.generic.base import ContextMixin
 
+from core.audit import add_log_entries, audit_atomic
 from core.buildform import SiteForm
 from core.utils import (
     SETTINGS_APP_LIST,
+    bump_cache_version, get_cache_version,
     get_slug_kwarg, get_slug_url, try_get_url, label_for_field,
-    has_permission_add, has_permission_change, has_permission_delete,
-    has_permission_view, has_permission_close,
+    has_permission_delete, has_permission_view,
+    get_permission_matrix, has_module_permission,
     get_delete_models,
     NestedObjectsContract,
 )
+from core.paginator import KeysetPaginator
+from core.registry import site_registry
+from core.signals import is_bulk_save_covered, post_bulk_save
+
+MAIN_MENU_CACHE_TIMEOUT = 60 * 60
+MAIN_MENU_VERSION_KEY = 'core:main_menu:version'
 
 
 def get_main_menu(request):
@@ -50,8 +58,7 @@ def get_main_menu(request):
     menu.append({'title': 'Архив', 'url': archive})
 
     for app_label in SETTINGS_APP_LIST:
-        has_module_perms = request.user.has_module_perms(app_label)
-        if not has_module_perms:
+        if not has_module_permission(request, app_label):
             continue
         settings = try_get_url('settings', current_app='database')
         menu.append({'title': 'Настройки', 'url': settings})
@@ -60,6 +67,35 @@ def get_main_menu(request):
     return menu
 
 
+def get_site_menu(request):
+    """
+    Главное меню и ссылка настроек аккаунта. Зависят только от прав
+    пользователя на разделы, поэтому кэшируются по отпечатку набора прав
+    """
+    fingerprint = get_permission_matrix(request).fingerprint
+    version = get_cache_version(MAIN_MENU_VERSION_KEY)
+    key = f'core:main_menu:{version}:{fingerprint}'
+    site_menu = cache.get(key)
+    if site_menu is None:
+        site_menu = {
+            'main_menu': get_main_menu(request),
+            'account_settings_url': try_get_url(
+                name='account_settings', current_app='account'
+            ),
+        }
+        cache.set(key, site_menu, MAIN_MENU_CACHE_TIMEOUT)
+    return site_menu
+
+
+def clear_main_menu(setting=None, **kwargs):
+    """
+    Сброс кэша меню при изменении ROOT_URLCONF. Изменение прав
+    пользователя меняет отпечаток в ключе кэша, сброс для него не нужен
+    """
+    if setting in (None, 'ROOT_URLCONF'):
+        bump_cache_version(MAIN_MENU_VERSION_KEY)
+
+
 class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
     """
     Основной миксин сайта
@@ -110,18 +146,9 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
         super().__init__(**kwargs)
         if self.app_label is not None and not self.opts_dict:
             self.build_opts_dict()
-            aa = 1
 
     def build_opts_dict(self):
-        app_label = self.app_label
-        app_config = apps.get_app_config(app_label)
-        app_module = getattr(
-            app_config, 'module', None
-        ) or importlib.import_module(app_label)
-        try:
-            self.opts_dict = getattr(app_module.views, 'settings_dict', {})
-        except AttributeError:
-            pass
+        self.opts_dict = site_registry.get_opts(self.app_label)
 
     def get_add_url(self, model_name=None):
         app_label = self.app_label
@@ -206,16 +233,9 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
         ) = get_slug_kwarg(self.kwargs)
 
     def get_model(self, model_name=None):
-        model_name = model_name or self.model_name
-        try:
-            return apps.get_model(self.app_label, model_name)
-        except LookupError:
-            for app_configs in apps.get_app_configs():
-                app_config = apps.get_app_config(app_configs.label)
-                for model in app_config.get_models():
-                    if model._meta.model_name == model_name:
-                        self.app_label = app_configs.label
-                        return model
+        return site_registry.get_model(
+            self.app_label, model_name or self.model_name
+        )
 
     def get_attributes_model_list(self):
         self.get_attributes()
@@ -274,19 +294,7 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
         return kwargs
 
     def get_form_class_model(self, model=None):
-        model = model or self.model
-        opts = model._meta
-        app_module = (
-                getattr(opts.app_config, 'module', None)
-                or importlib.import_module(opts.app_label)
-        )
-        form_class_name = model.__name__ + "Form"
-        try:
-            form_class = getattr(app_module.forms, form_class_name, None)
-        except AttributeError:
-            form_class = None
-
-        return form_class
+        return site_registry.get_form_class(model or self.model)
 
     def get_form_class(self):
         if self.form_class:
@@ -348,11 +356,8 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
     def get_context_data(self, **kwargs):
         kwargs["btn"] = {}
         context = super().get_context_data(**kwargs)
-        context['main_menu'] = get_main_menu(self.request)
+        context.update(get_site_menu(self.request))
         context['sidebar'] = self.sidebar
-        context['account_settings_url'] = try_get_url(
-            name='account_settings', current_app='account'
-        )
         if self.object_verbose_name:
             context['object_verbose_name'] = self.object_verbose_name
 
@@ -372,14 +377,15 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
 
         return ContentType.objects.get_for_model(obj, for_concrete_model=False)
 
-    def log_entry(self, request, obj, message=''):
-        """Запись сообщения в журнал изменений"""
-
-        if self.action == 'change' and not message:
+    def get_log_entry(self, request, obj, message='', action=None):
+        """Запись журнала изменений без сохранения в базу данных"""
+        action = action or self.action
+        if action == 'change' and not message:
             return None
 
         from risi.models import (
-            ADDITION, CHANGE, DELETION, CLOSING, LogEntrySite
+            ADDITION, CHANGE, DELETION, CLOSING, LogEntrySite,
+            object_id_to_int,
         )
 
         action_flag = {
@@ -388,16 +394,29 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
             'delete': DELETION,
             'close': CLOSING
         }
+        if isinstance(message, list):
+            message = json.dumps(message)
 
-        return LogEntrySite.objects.log_action(
+        return LogEntrySite(
             user_id=request.user.pk,
             content_type_id=self.get_content_type_for_model(obj).pk,
-            object_id=obj.pk,
-            object_repr=str(obj),
-            action_flag=action_flag[self.action],
+            object_id=str(obj.pk),
+            object_id_int=object_id_to_int(obj.pk),
+            object_repr=str(obj)[:200],
+            action_flag=action_flag[action],
             change_message=message,
         )
 
+    def log_entry(self, request, obj, message='', action=None):
+        """
+        Запись сообщения в журнал изменений. Внутри audit_atomic() запись
+        выполняется в конце блока вместе с остальными записями журнала
+        """
+        log_entry = self.get_log_entry(request, obj, message, action)
+        if log_entry is not None:
+            add_log_entries(log_entry)
+        return log_entry
+
     def construct_message(self, form, formsets=None, add=False):
         """Возвращает сообщение об изменениях"""
         from django.contrib.admin.utils import construct_change_message
@@ -409,7 +428,9 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
         if not add:
             add = self.action == 'add'
         change_message = self.construct_message(form, add=add)
-        self.log_entry(self.request, obj, change_message)
+        # В списках self.action не задан: действие определяется по записи
+        action = 'add' if add else self.action or 'change'
+        self.log_entry(self.request, obj, change_message, action)
 
     def get_success_message(self, obj):
         action = {'add': 'добавлен', 'change': 'изменен', 'delete': 'удален'}
@@ -457,22 +478,13 @@ class BaseSiteMixin(LoginRequiredMixin, ContextMixin):
             ]
         except AttributeError:
             pass
+        permission_matrix = get_permission_matrix(request)
         return {
-            "add": all(
-                has_permission_add(request, model) for model in model_list
-            ),
-            "change": all(
-                has_permission_change(request, model) for model in model_list
-            ),
-            "delete": all(
-                has_permission_delete(request, model) for model in model_list
-            ),
-            "view": all(
-                has_permission_view(request, model) for model in model_list
-            ),
-            "close": all(
-                has_permission_close(request, model) for model in model_list
-            ),
+            action: all(
+                permission_matrix.has_perm(model, action)
+                for model in model_list
+            )
+            for action in permission_matrix.actions
         }
 
 
@@ -591,46 +603,121 @@ class DataFormMixin(DataObjectMixin):
 
         return context
 
+    def get_field_changes(self, form):
+        """
+        Изменения полей формы: список словарей с ключами
+            name - имя поля,
+            label - подпись поля,
+            kind - 'added' (новое значение), 'changed' (было/стало) или
+                'm2m' (добавленные и убранные значения многие-ко-многим),
+            old, new - прежнее и новое значения,
+            added, removed - для 'm2m'.
+        Прежние значения внешних ключей загружаются одним in_bulk на модель.
+        Результат сохраняется в форме и используется для last_change
+        и журнала изменений
+        """
+        changes = getattr(form, 'field_changes', None)
+        if changes is not None:
+            return changes
+
+        opts = self.model._meta
+        changes = []
+        old_pks = {}  # model: {pk}
+        for field_name in form.changed_data:
+            change = {
+                'name': field_name,
+                'label': label_for_field(field_name, self.model, form),
+                'kind': 'added',
+                'old': None,
+                'new': form.cleaned_data.get(field_name),
+            }
+            changes.append(change)
+            if self.action != 'change':
+                continue
+            try:
+                field = opts.get_field(field_name)
+            except FieldDoesNotExist:
+                field = None
+            old_value = form.initial.get(field_name)
+            remote_field = getattr(field, 'remote_field', None)
+            if isinstance(remote_field, models.ManyToManyRel):
+                old_value = list(old_value or ())
+                new_value = change['new'] or ()
+                change.update(
+                    kind='m2m',
+                    old=old_value,
+                    added=set(new_value) - set(old_value),
+                    removed=set(old_value) - set(new_value),
+                )
+            elif isinstance(remote_field, models.ManyToOneRel):
+                if isinstance(old_value, int):
+                    change.update(kind='changed', old=old_value)
+                    old_pks.setdefault(field.related_model, set()).add(
+                        old_value
+                    )
+                    change['related_model'] = field.related_model
+            else:
+                change.update(kind='changed', old=old_value)
+
+        related_objects = {
+            model: model._default_manager.in_bulk(pks)
+            for model, pks in old_pks.items()
+        }
+        for change in changes:
+            model = change.pop('related_model', None)
+            if model is not None:
+                change['old'] = related_objects[model].get(change['old'])
+
+        form.field_changes = changes
+        return changes
+
     def get_last_change(self, form):
         text = []
         add_msg = '{}: добавлено: {}'
         change_msg = '{}: было: {} стало: {}'
-        for field_name in form.changed_data:
-            label = label_for_field(field_name, self.model, form)
-            new_value = form.cleaned_data[field_name]
-            if self.action == 'change':
-                f = self.model._meta.get_field(field_name)
-                if isinstance(f.remote_field, models.ManyToManyRel):
-                    old_value = [item for item in form.initial[field_name]]
-                    add_value = set(new_value) - set(old_value)
-                    delete_value = set(old_value) - set(new_value)
-
-                    if add_value and delete_value:
-                        text.append(f'{label}: добавлено: {add_value} '
-                                    f'убрано: {delete_value}')
-                    elif add_value:
-                        text.append(f'{label}: добавлено: {add_value}')
-                    elif delete_value:
-                        text.append(f'{label}: убрано: {delete_value}')
-
-                elif isinstance(f.remote_field, models.ManyToOneRel):
-                    if isinstance(form.initial[field_name], int):
-                        old_value = f.related_model._meta.model.objects.get(
-                            pk=form.initial[field_name]
-                        )
-                        text.append(
-                            change_msg.format(label, old_value, new_value)
-                        )
-                    else:
-                        text.append(add_msg.format(label, new_value))
-                else:
-                    old_value = form.initial.get(field_name)
-                    text.append(change_msg.format(label, old_value, new_value))
+        for change in self.get_field_changes(form):
+            label = change['label']
+            if change['kind'] == 'm2m':
+                add_value, delete_value = change['added'], change['removed']
+                if add_value and delete_value:
+                    text.append(f'{label}: добавлено: {add_value} '
+                                f'убрано: {delete_value}')
+                elif add_value:
+                    text.append(f'{label}: добавлено: {add_value}')
+                elif delete_value:
+                    text.append(f'{label}: убрано: {delete_value}')
+            elif change['kind'] == 'changed':
+                text.append(
+                    change_msg.format(label, change['old'], change['new'])
+                )
             else:
-                text.append(add_msg.format(label, new_value))
+                text.append(add_msg.format(label, change['new']))
 
         return '\n'.join(text)
 
+    def construct_message(self, form, formsets=None, add=False):
+        """
+        Сообщение об изменениях с прежними и новыми значениями полей
+        (ключ 'values' записи 'changed')
+        """
+        message = super().construct_message(form, formsets, add)
+        if add or not message:
+            return message
+        values = [
+            {
+                'field': change['name'],
+                'old': '' if change['old'] is None else str(change['old']),
+                'new': '' if change['new'] is None else str(change['new']),
+            }
+            for change in self.get_field_changes(form)
+            if change['kind'] == 'changed'
+        ]
+        for sub_message in message:
+            changed = sub_message.get('changed')
+            if changed is not None and 'name' not in changed and values:
+                changed['values'] = values
+        return message
+
     def form_valid(self, form):
         request = self.request
         if form.has_changed():
@@ -671,12 +758,13 @@ class MultipleListMixin(BaseSiteMixin):
     """Несколько списков на одной странице."""
 
     btn_add = True
+    bulk_save = True  # Запись списка через bulk_update/bulk_create
     formset_initial = []
     list_formset = False
     ordering = None
     page_kwarg = "page"
-    paginate_by = None
-    paginator_class = Paginator
+    paginate_by = 100
+    paginator_class = KeysetPaginator
     template_name = 'core/change_list.html'
 
     def get_ordering(self):
@@ -688,17 +776,27 @@ class MultipleListMixin(BaseSiteMixin):
         """
         return self.paginate_by
 
-    def get_paginator(
-        self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs
-    ):
+    def get_paginator(self, queryset, per_page, **kwargs):
         """Return an instance of the paginator for this view."""
-        return self.paginator_class(
-            queryset,
-            per_page,
-            orphans=orphans,
-            allow_empty_first_page=allow_empty_first_page,
-            **kwargs,
+        return self.paginator_class(queryset, per_page, **kwargs)
+
+    def get_page_kwargs(self, index=0):
+        """Имена параметров GET запроса страницы списка с номером index"""
+        page_kwarg = f'{self.page_kwarg}{index}' if index else self.page_kwarg
+        return f'{page_kwarg}_after', f'{page_kwarg}_before'
+
+    def paginate_queryset(self, queryset, index=0):
+        """Возвращает paginator и текущую страницу списка"""
+        per_page = self.get_paginate_by()
+        if not per_page:
+            return None, None
+        paginator = self.get_paginator(queryset, per_page)
+        after_kwarg, before_kwarg = self.get_page_kwargs(index)
+        page = paginator.get_page(
+            after=self.request.GET.get(after_kwarg),
+            before=self.request.GET.get(before_kwarg),
         )
+        return paginator, page
 
     def get_fields_editable(self):
         return self.opts_dict.get(self.model_name, {}).get(
@@ -741,46 +839,9 @@ class MultipleListMixin(BaseSiteMixin):
 
     def get_fields_for_changelist(self, model_name=None):
         model_name = model_name or self.model_name
-        fields_display = self.opts_dict.get(model_name, {}).get(
-            'fields_display'
-        )
-        fields_link = self.opts_dict.get(model_name, {}).get(
-            'fields_link', ''
-        )
-
-        if not fields_display:
-            fields_display = ('id',)
-        elif fields_display == '__all__' or fields_display == ('__all__',):
-            raise ImproperlyConfigured(
-                '"__all__" is not allowed, specify specific fields.')
-
-        if fields_link:
-            fields_link_check = fields_link
-        elif fields_link is None:
-            fields_link_check = ()
-        else:
-            fields_link = fields_link_check = list(fields_display)[:1]
+        return site_registry.get_changelist_fields(self.opts_dict, model_name)
 
-        fields_editable = self.opts_dict.get(model_name, {}).get(
-            'fields_editable', ''
-        )
-
-        # Проверка заданных параметров полей
-        fields_raise = [
-            field
-            for field in chain(fields_link_check, fields_editable)
-            if field not in fields_display
-        ]
-        if fields_raise:
-            fields_raise = ', '.join(fields_raise)
-            raise ImproperlyConfigured(
-                f'Missing fields ({fields_raise}) in "fields_display" for'
-                f' {self.model.__name__}'
-            )
-
-        return fields_display, fields_link, fields_editable
-
-    def get_changelist_instance(self, formset=None, **kwargs):
+    def get_changelist_instance(self, formset=None, index=0, **kwargs):
         """Формирование списка"""
 
         ChangeList = self.get_changelist()
@@ -797,11 +858,13 @@ class MultipleListMixin(BaseSiteMixin):
             fields_display,
             fields_link,
             fields_editable,
+            index,
         )
         if cl.fields_editable:
             """Формирование редактируемых полей в списке, если требуется"""
             self.list_formset = True
             if formset is None:
+                kwargs.update(queryset=cl.result_list)
                 formset = self.get_formset(**kwargs)
             cl.formset = formset
 
@@ -821,12 +884,12 @@ class MultipleListMixin(BaseSiteMixin):
             if self.request.method == "POST":
                 formset = kwargs['formsets'][index]
                 default.update(formset=formset)
-            cl = self.get_changelist_instance(**default)
+            cl = self.get_changelist_instance(index=index, **default)
             cls.append(cl)
             if cl.formset is not None:
                 media += cl.formset.media
                 errors += cl.formset.errors
-            context['total_result_count'] += cl.result_count
+            context['total_result_count'] += cl.full_result_count
         context['cls'] = cls
         context['errors'] = errors
         context['list_formset'] = self.list_formset
@@ -881,19 +944,131 @@ class MultipleListMixin(BaseSiteMixin):
     def get_success_url(self):
         return self.request.get_full_path()
 
+    def can_bulk_save(self, formset):
+        """
+        Запись списка через bulk_update/bulk_create возможна, если модель
+        не переопределяет save(), не имеет обработчиков pre_save, каждый
+        обработчик post_save заменяется обработчиком post_bulk_save
+        (core.signals.is_bulk_save_covered), а в формах нет файлов и полей
+        многие-ко-многим
+        """
+        model = formset.model
+        form_fields = formset.form.base_fields
+        return (
+                self.bulk_save
+                and not self.request.FILES
+                and model.save is models.Model.save
+                and not pre_save.has_listeners(model)
+                and is_bulk_save_covered(model)
+                and not any(
+                    field.name in form_fields
+                    for field in model._meta.many_to_many
+                )
+                and (
+                        not formset.extra_forms
+                        or connections[
+                            router.db_for_write(model)
+                        ].features.can_return_rows_from_bulk_insert
+                )
+        )
+
+    def save_formset(self, formset, *args, **kwargs):
+        """Запись измененных форм списка по одной"""
+        changecount = 0
+        for form in formset.forms:
+            if form.has_changed():
+                obj = form.save(commit=False)
+                add = obj.pk is None
+                # Добавляем дополнительные сведения
+                self.action_pre_save(obj, form, *args, **kwargs)
+                obj.save()
+                form.save_m2m()
+                self.log_change(obj, form, add)
+                changecount += 1
+        return changecount
+
+    def bulk_save_formset(self, formset, *args, **kwargs):
+        """
+        Запись измененных форм списка: bulk_update по измененным полям
+        форм и полям, заданным action_pre_save, bulk_create для новых
+        записей и одна вставка записей журнала
+        """
+        model = formset.model
+        model_fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        field_names = {field.name for field in model_fields}
+        changed, created, update_fields = [], [], set()
+        for form in formset.forms:
+            if not form.has_changed():
+                continue
+            obj = form.save(commit=False)
+            values = {
+                field.attname: field.value_from_object(obj)
+                for field in model_fields
+            }
+            # Добавляем дополнительные сведения
+            self.action_pre_save(obj, form, *args, **kwargs)
+            if obj.pk is None:
+                created.append((obj, form))
+            else:
+                changed.append((obj, form))
+                update_fields.update(
+                    name for name in form.changed_data if name in field_names
+                )
+                update_fields.update(
+                    field.name
+                    for field in model_fields
+                    if field.value_from_object(obj) != values[field.attname]
+                )
+        if changed and update_fields:
+            model._default_manager.bulk_update(
+                [obj for obj, form in changed], sorted(update_fields)
+            )
+        if created:
+            model._default_manager.bulk_create(
+                [obj for obj, form in created]
+            )
+        post_bulk_save.send(
+            sender=model,
+            instances=[obj for obj, form in changed + created],
+            using=router.db_for_write(model),
+        )
+        self.log_changes(
+            [(obj, form, False) for obj, form in changed]
+            + [(obj, form, True) for obj, form in created]
+        )
+        return len(changed) + len(created)
+
+    def log_changes(self, changes):
+        """Запись в журнал изменений списка одним запросом"""
+        log_entries = []
+        for obj, form, add in changes:
+            log_entry = self.get_log_entry(
+                self.request,
+                obj,
+                self.construct_message(form, add=add),
+                'add' if add else 'change',
+            )
+            if log_entry is not None:
+                log_entries.append(log_entry)
+        add_log_entries(*log_entries)
+
     def formsets_valid(self, request, formsets, *args, **kwargs):
         changecount = 0
         for formset in formsets:
-            with transaction.atomic(using=router.db_for_write(self.model)):
-                for form in formset.forms:
-                    if form.has_changed():
-                        obj = form.save(commit=False)
-                        # Добавляем дополнительные сведения
-                        self.action_pre_save(obj, form, *args, **kwargs)
-                        obj.save()
-                        form.save_m2m()
-                        self.log_change(obj, form)
-                        changecount += 1
+            model = formset.model
+            with audit_atomic(using=router.db_for_write(model)):
+                if self.can_bulk_save(formset):
+                    changecount += self.bulk_save_formset(
+                        formset, *args, **kwargs
+                    )
+                else:
+                    changecount += self.save_formset(
+                        formset, *args, **kwargs
+                    )
         if changecount:
             # Формирование сообщения об успешной записи
             success_message = ("%(name)s в количестве %(count)s были успешно "
@@ -960,6 +1135,10 @@ class MultipleListMixin(BaseSiteMixin):
         for model_index, model_name in enumerate(self.models_list):
             self.get_attributes_list(model_name)
             object_list = self.get_queryset()
+            # Формы списка формируются только для текущей страницы
+            paginator, page = self.paginate_queryset(object_list, model_index)
+            if page is not None:
+                object_list = page.object_list
             prefix = f'table-{model_index}-form'
             default = {'queryset': object_list, 'prefix': prefix}
             formset = self.get_formset(**default)
@@ -1116,7 +1295,7 @@ class HistoryListView(BaseSiteMixin, TemplateView):
         self.get_attributes_model()
         action_list = (
             self.model_history.objects.filter(
-                object_id=self.obj_id,
+                self.get_history_query(),
                 content_type=self.get_content_type_for_model(self.model),
             )
             .select_related()
@@ -1141,6 +1320,18 @@ class HistoryListView(BaseSiteMixin, TemplateView):
 
         return context
 
+    def get_history_query(self):
+        """
+        Отбор записей объекта по индексу (content_type, object_id_int,
+        action_time), для нечисловых ключей - по тексту object_id
+        """
+        from risi.models import object_id_to_int
+
+        object_id_int = object_id_to_int(self.obj_id)
+        if object_id_int is None:
+            return Q(object_id=self.obj_id)
+        return Q(object_id_int=object_id_int)
+
     def get(self, request, *args, **kwargs):
         if not has_permission_view(request, self.model_history):
             raise Http404
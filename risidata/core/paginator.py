@@ -0,0 +1,83 @@
+from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    """Страница списка, ограниченная значениями ключа"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __repr__(self):
+        return '<KeysetPage of %s>' % self.paginator.per_page
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу (pk) вместо смещения.
+
+    Страница задается значением ключа последней записи предыдущей страницы
+    (after) или первой записи следующей страницы (before), поэтому выборка
+    не зависит от номера страницы и использует индекс первичного ключа.
+    Общее количество записей вычисляется запросом COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, key='pk'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def to_key(self, value):
+        """Возвращает значение ключа или None, если значение некорректно"""
+        if value in (None, ''):
+            return None
+        try:
+            return self.object_list.model._meta.pk.to_python(value)
+        except ValidationError:
+            return None
+
+    def get_page(self, after=None, before=None):
+        after, before = self.to_key(after), self.to_key(before)
+        key = self.key
+        queryset = self.object_list.order_by(key)
+
+        if before is not None:
+            keys = list(
+                queryset.filter(**{f'{key}__lt': before})
+                .order_by(f'-{key}')
+                .values_list(key, flat=True)[:self.per_page + 1]
+            )
+            has_previous = len(keys) > self.per_page
+            has_next = True
+        else:
+            if after is not None:
+                queryset_keys = queryset.filter(**{f'{key}__gt': after})
+            else:
+                queryset_keys = queryset
+            keys = list(
+                queryset_keys.values_list(key, flat=True)[:self.per_page + 1]
+            )
+            has_next = len(keys) > self.per_page
+            has_previous = after is not None
+        keys = sorted(keys[:self.per_page])
+
+        if not keys:
+            if after is not None or before is not None:
+                # Записи по ключу отсутствуют - выводится первая страница
+                return self.get_page()
+            return KeysetPage(queryset.none(), self, False, False)
+
+        object_list = queryset.filter(
+            **{f'{key}__gte': keys[0], f'{key}__lte': keys[-1]}
+        )
+        return KeysetPage(object_list, self, has_next, has_previous)
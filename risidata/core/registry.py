@@ -0,0 +1,151 @@
+from importlib import import_module
+from itertools import chain
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import module_has_submodule
+
+# Модели других приложений, используемые разделом сайта:
+# {app_label: {model_name: 'app_label.model_name'}}
+MODEL_ALIASES = {
+    'contract': {'employee': 'database.employee'},
+}
+
+
+def get_changelist_fields(opts_dict, model_name):
+    """
+    Поля списка модели по параметрам settings_dict:
+    (fields_display, fields_link, fields_editable)
+    """
+    opts = opts_dict.get(model_name, {})
+    fields_display = opts.get('fields_display')
+    fields_link = opts.get('fields_link', '')
+
+    if not fields_display:
+        fields_display = ('id',)
+    elif fields_display == '__all__' or fields_display == ('__all__',):
+        raise ImproperlyConfigured(
+            '"__all__" is not allowed, specify specific fields.')
+
+    if fields_link:
+        fields_link_check = fields_link
+    elif fields_link is None:
+        fields_link_check = ()
+    else:
+        fields_link = fields_link_check = list(fields_display)[:1]
+
+    fields_editable = opts.get('fields_editable', '')
+
+    # Проверка заданных параметров полей
+    fields_raise = [
+        field
+        for field in chain(fields_link_check, fields_editable)
+        if field not in fields_display
+    ]
+    if fields_raise:
+        fields_raise = ', '.join(fields_raise)
+        raise ImproperlyConfigured(
+            f'Missing fields ({fields_raise}) in "fields_display" for'
+            f' {model_name}'
+        )
+
+    return fields_display, fields_link, fields_editable
+
+
+class SiteRegistry:
+    """
+    Параметры разделов сайта, собранные при запуске приложения
+    (CoreConfig.ready): settings_dict из views, формы <Model>Form из forms,
+    проверенные поля списков и указатель моделей по model_name. Заменяет
+    поиск по модулям и моделям при каждом создании представления
+    """
+
+    def __init__(self):
+        self.opts = {}  # app_label: settings_dict
+        self.forms = {}  # model: form class
+        self.changelists = {}  # (id(settings_dict), model_name): fields
+        self.models = {}  # (app_label, model_name): model
+        self.model_names = {}  # model_name: (app_label, model)
+
+    def populate(self):
+        self.opts.clear()
+        self.forms.clear()
+        self.changelists.clear()
+        self.populate_models()
+        for app_config in apps.get_app_configs():
+            views = self.import_submodule(app_config, 'views')
+            opts_dict = getattr(views, 'settings_dict', None)
+            if opts_dict is None:
+                continue
+            self.opts[app_config.label] = opts_dict
+            for model_name in opts_dict:
+                self.changelists[id(opts_dict), model_name] = (
+                    get_changelist_fields(opts_dict, model_name)
+                )
+            for model in app_config.get_models():
+                self.forms[model] = self.find_form_class(model)
+
+    def populate_models(self):
+        self.models.clear()
+        self.model_names.clear()
+        for app_config in apps.get_app_configs():
+            for model in app_config.get_models(include_auto_created=True):
+                model_name = model._meta.model_name
+                self.models[app_config.label, model_name] = model
+                if not model._meta.auto_created:
+                    self.model_names.setdefault(
+                        model_name, (app_config.label, model)
+                    )
+        for app_label, aliases in MODEL_ALIASES.items():
+            for model_name, model_label in aliases.items():
+                self.models[app_label, model_name] = apps.get_model(
+                    model_label
+                )
+
+    def import_submodule(self, app_config, name):
+        if module_has_submodule(app_config.module, name):
+            return import_module(f'{app_config.name}.{name}')
+
+    def find_form_class(self, model):
+        forms = self.import_submodule(model._meta.app_config, 'forms')
+        return getattr(forms, model.__name__ + 'Form', None)
+
+    def get_opts(self, app_label):
+        return self.opts.get(app_label, {})
+
+    def get_model(self, app_label, model_name):
+        """
+        Модель раздела app_label (в том числе по MODEL_ALIASES), иначе
+        первая модель с именем model_name среди приложений
+        """
+        if model_name is None:
+            return None
+        model_name = model_name.lower()
+        try:
+            return self.models[app_label, model_name]
+        except KeyError:
+            return self.get_model_by_name(model_name)[1]
+
+    def get_model_by_name(self, model_name):
+        """(app_label, model) первой модели с именем model_name"""
+        return self.model_names.get(model_name.lower(), (None, None))
+
+    def get_form_class(self, model):
+        try:
+            return self.forms[model]
+        except KeyError:
+            form_class = self.forms[model] = self.find_form_class(model)
+            return form_class
+
+    def get_changelist_fields(self, opts_dict, model_name):
+        """
+        Проверенные при запуске поля списка. Для параметров, заданных
+        в представлении (opts_dict класса), поля формируются на месте
+        """
+        try:
+            return self.changelists[id(opts_dict), model_name]
+        except KeyError:
+            return get_changelist_fields(opts_dict, model_name)
+
+
+site_registry = SiteRegistry()
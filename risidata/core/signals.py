@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+
+# Запись списка объектов через bulk_update/bulk_create
+# (MultipleListMixin.bulk_save_formset): sender - модель, instances -
+# записанные объекты, using - база данных
+post_bulk_save = Signal()
+
+# Обработчики post_save, подключенные connect_post_save: {модель:
+# {обработчик: обработчик post_bulk_save, который его заменяет, или None}}
+post_save_receivers = {}
+
+
+def connect_post_save(receiver, sender, bulk_receiver=None, **kwargs):
+    """
+    Подключение обработчика post_save модели. bulk_receiver - обработчик
+    post_bulk_save, который заменяет его при записи списка; без него
+    список модели записывается по одному объекту
+    """
+    post_save.connect(receiver, sender=sender, **kwargs)
+    if bulk_receiver is not None:
+        post_bulk_save.connect(bulk_receiver, sender=sender, **kwargs)
+    post_save_receivers.setdefault(sender, {})[receiver] = bulk_receiver
+
+
+def is_bulk_save_covered(sender):
+    """
+    Запись списка модели без post_save допустима: у модели нет
+    обработчиков post_save либо все они подключены connect_post_save с
+    заменой при записи списка. Обработчики, подключенные напрямую
+    post_save.connect, должны быть подключены к моделям без
+    connect_post_save: такая модель записывается по одному объекту
+    """
+    if not post_save.has_listeners(sender):
+        return True
+    receivers = post_save_receivers.get(sender)
+    return bool(receivers) and None not in receivers.values()
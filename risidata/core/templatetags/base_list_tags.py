@@ -1,19 +1,17 @@
-import datetime
+import time
 
 from django import template
 from django.contrib.admin.templatetags.base import InclusionAdminNode
-from django.contrib.admin.utils import (
-    lookup_field, display_for_field, display_for_value
-)
 from django.db import models
 from django.core.exceptions import ObjectDoesNotExist
 from django.urls import NoReverseMatch
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
+from core.middleware import add_timing
 from core.utils import (
-    label_for_field, has_permission_view, get_slug_url, try_get_url,
-    has_permission_add, label_for_column
+    label_for_field, get_slug_url, try_get_url, label_for_column,
+    get_permission_matrix,
 )
 
 register = template.Library()
@@ -32,13 +30,14 @@ class InclusionSiteNode(InclusionAdminNode):
 def result_headers(cl):
     """Создание заголовков столбцов таблицы"""
     if hasattr(cl, 'columns'):
+        permission_matrix = get_permission_matrix(cl.request)
         for column in cl.columns:
             field = cl.model._meta.get_field(column)
             if (
                     field.remote_field
                     and not isinstance(field.remote_field, models.ManyToOneRel)
-                    and not has_permission_view(cl.request,
-                                                field.related_model)
+                    and not permission_matrix.has_perm(field.related_model,
+                                                       'view')
             ):
                 continue
             text = label_for_column(column, cl.model, form=cl.form)
@@ -91,9 +90,22 @@ def result_list(cl):
     }
 
 
+class ResultListNode(InclusionSiteNode):
+    """Вывод списка с замером времени для PerformanceMiddleware"""
+
+    def render(self, context):
+        start = time.perf_counter()
+        try:
+            return super().render(context)
+        finally:
+            request = context.get('request')
+            if request is not None:
+                add_timing(request, 'result_list_ms', start)
+
+
 @register.tag(name="result_list")
 def result_list_tag(parser, token):
-    return InclusionSiteNode(
+    return ResultListNode(
         parser,
         token,
         func=result_list,
@@ -103,54 +115,14 @@ def result_list_tag(parser, token):
 
 
 def items_for_result(cl, result, form=None):
-
-    def link_in_col(is_first, field_name, cl):
-        if cl.fields_link is None:
-            return False
-        if is_first and not cl.fields_link:
-            return True
-        return field_name in cl.fields_link
-
-    first = True
-    empty_value_display = cl.model_view.get_empty_value_display()
-    for field_index, field_name in enumerate(cl.fields_display):
-        row_classes = ["field-%s" % field_name]
+    pk_name = cl.opts.pk.name
+    for column in cl.list_columns:
         try:
-            f, attr, value = lookup_field(field_name, result, cl.model_view)
-            # f = result._meta.get_field(field_name)
-            # value = getattr(result, field_name)
+            result_repr, row_class = column.display(result)
         except ObjectDoesNotExist:
-            result_repr = empty_value_display
-        else:
-            if f is None:
-                boolean = getattr(attr, "boolean", False)
-                result_repr = display_for_value(
-                    value, empty_value_display, boolean
-                )
-                if isinstance(value, (datetime.date, datetime.time)):
-                    row_classes.append("nowrap")
-            else:
-                if isinstance(f.remote_field, models.ManyToOneRel):
-                    field_val = getattr(result, f.name)
-                    if field_val is None:
-                        result_repr = empty_value_display
-                    else:
-                        result_repr = field_val
-                else:
-                    result_repr = display_for_field(
-                        value, f, empty_value_display
-                    )
-                if isinstance(
-                        f,
-                        (models.DateField, models.TimeField, models.ForeignKey)
-                ):
-                    row_classes.append("nowrap")
-        row_class = mark_safe(' class="%s"' % " ".join(row_classes))
-        # If list_display_links not defined, add the link tag to the first field
-        if link_in_col(first, field_name, cl):
-            table_tag = "th" if first else "td"
-            first = False
-
+            result_repr = column.empty_value_display
+            row_class = column.row_class
+        if column.link:
             # Display link to the result's change_view if the url exists, else
             # display just the result's representation.
             try:
@@ -158,42 +130,36 @@ def items_for_result(cl, result, form=None):
             except NoReverseMatch:
                 link_or_text = result_repr
             else:
-                link_class = ''
-                if not result_repr:
-                    link_class = mark_safe("empty")
-                    label = label_for_field(field_name, cl.model, form=cl.form)
-                    result_repr = f'{label} отсутствует'
-
-                link_or_text = format_html(
-                    '<a href="{}"{}>{}</a>',
-                    url,
-                    format_html(' class="{}"', link_class)
-                    if link_class
-                    else '',
-                    result_repr,
-                )
+                if result_repr:
+                    link_or_text = format_html(
+                        '<a href="{}">{}</a>', url, result_repr
+                    )
+                else:
+                    link_or_text = format_html(
+                        '<a href="{}" class="empty">{} отсутствует</a>',
+                        url,
+                        column.label,
+                    )
 
             yield format_html(
-                "<{}{}>{}</{}>", table_tag, row_class, link_or_text, table_tag
+                "<{}{}>{}</{}>",
+                column.table_tag,
+                row_class,
+                link_or_text,
+                column.table_tag,
             )
         else:
-            # By default the fields come from ModelAdmin.list_editable, but if we pull
-            # the fields out of the form instead of list_editable custom admins
-            # can provide fields on a per request basis
             if (
                 form
-                and field_name in form.fields
-                and not (
-                    field_name == cl.opts.pk.name
-                    and form[cl.opts.pk.name].is_hidden
-                )
+                and column.editable
+                and not (column.name == pk_name and form[pk_name].is_hidden)
             ):
-                bf = form[field_name]
+                bf = form[column.name]
                 result_repr = mark_safe(str(bf.errors) + str(bf))
 
-            yield format_html(f'<td{row_class}>{result_repr}</td>')
-    if form and not form[cl.opts.pk.name].is_hidden:
-        yield format_html("<td>{}</td>", form[cl.opts.pk.name])
+            yield format_html('<td{}>{}</td>', row_class, result_repr)
+    if form and not form[pk_name].is_hidden:
+        yield format_html("<td>{}</td>", form[pk_name])
 
 
 def items_for_extra(cl, result, form):
@@ -286,6 +252,7 @@ def columns_list_result(cl, result):
     action = cl.model_view.action
     urlargs = {'action': action, 'current_app': app_label}
     empty_value_display = cl.model_view.get_empty_value_display()
+    permission_matrix = get_permission_matrix(cl.request)
     number = str(result)
 
     parent_model_name = cl.opts.verbose_name
@@ -315,7 +282,8 @@ def columns_list_result(cl, result):
 
         elif field.is_relation and (field.one_to_many or field.one_to_one):
             model = field.related_model
-            if not has_permission_view(cl.request, model):
+            model_perms = permission_matrix.get_model_perms(model)
+            if not model_perms['view']:
                 continue
             opts = model._meta
 
@@ -353,10 +321,7 @@ def columns_list_result(cl, result):
                                         title_list,
                                         verbose_name,
                                         mark_safe('&emsp;'))
-                if (
-                        has_permission_add(cl.request, model)
-                        and action != 'view'
-                ):
+                if model_perms['add'] and action != 'view':
                     url_obj = try_get_url(f'{app_label}_add', **urlargs)
                     title_add = format_html('добавить {} к {}у {}',
                                             opts.verbose_name.lower(),
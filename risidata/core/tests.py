@@ -1,3 +1,806 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import zipfile
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.utils import display_for_field
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.http import Http404, HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, reverse
+
+from contract import views as contract_views
+from contract.forms import ContractForm, LetterForm
+from contract.models import WITH_PRICING, Contract, Letter, Member
+from core import export, mixins, utils
+from core.audit import add_log_entries, audit_atomic, get_audit_log
+from core.choices import CachedModelChoiceField, choices_cache
+from core.middleware import (
+    PerformanceHistory, PerformanceMiddleware, percentile,
+    performance_history,
+)
+from core.mixins import MultipleListMixin, clear_main_menu, get_site_menu
+from core.paginator import KeysetPaginator
+from core.registry import get_changelist_fields, site_registry
+from core.templatetags.base_list_tags import items_for_result
+from core.utils import (
+    ListColumn, get_column_field, get_permission_matrix, try_get_url,
+)
+from core.views import AutocompleteView, performance_stats
+from core.signals import post_bulk_save
+from database.models import Client, Employee, StatusContract
+from risi.models import ADDITION, LogEntrySite
+from users.models import UserProfile
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+def get_request(user):
+    request = RequestFactory().get('/')
+    request.user = user
+    return request
+
+
+class KeysetPaginatorTest(TestCase):
+    """Страницы списка по значениям первичного ключа"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pks = [
+            Client.objects.create(name=f'Заказчик {number}', city='Город').pk
+            for number in range(7)
+        ]
+
+    def get_page(self, **kwargs):
+        paginator = KeysetPaginator(Client.objects.all(), 3)
+        page = paginator.get_page(**kwargs)
+        return [obj.pk for obj in page.object_list], page
+
+    def test_first_page(self):
+        pks, page = self.get_page()
+        self.assertEqual(pks, self.pks[:3])
+        self.assertEqual((page.has_previous, page.has_next), (False, True))
+        self.assertEqual(page.paginator.count, 7)
+
+    def test_after(self):
+        pks, page = self.get_page(after=self.pks[2])
+        self.assertEqual(pks, self.pks[3:6])
+        self.assertEqual((page.has_previous, page.has_next), (True, True))
+        pks, page = self.get_page(after=self.pks[5])
+        self.assertEqual(pks, self.pks[6:])
+        self.assertEqual((page.has_previous, page.has_next), (True, False))
+
+    def test_before(self):
+        pks, page = self.get_page(before=self.pks[6])
+        self.assertEqual(pks, self.pks[3:6])
+        self.assertEqual((page.has_previous, page.has_next), (True, True))
+        pks, page = self.get_page(before=self.pks[3])
+        self.assertEqual(pks, self.pks[:3])
+        self.assertEqual((page.has_previous, page.has_next), (False, True))
+
+    def test_invalid_key(self):
+        """Некорректный или вышедший за список ключ - первая страница"""
+        self.assertEqual(self.get_page(after='x')[0], self.pks[:3])
+        self.assertEqual(self.get_page(after=self.pks[6])[0], self.pks[:3])
+
+    def test_empty(self):
+        Client.objects.all().delete()
+        pks, page = self.get_page(after=self.pks[2])
+        self.assertEqual(pks, [])
+        self.assertFalse(page.has_other_pages())
+
+
+class MultipleListPaginationTest(TestCase):
+    """Параметры GET запроса страниц нескольких списков одной страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pks = [
+            Client.objects.create(name=f'Заказчик {number}', city='Город').pk
+            for number in range(5)
+        ]
+
+    def get_view(self, **params):
+        view = MultipleListMixin()
+        view.paginate_by = 2
+        view.request = RequestFactory().get('/', params)
+        return view
+
+    def test_page_kwargs(self):
+        view = self.get_view()
+        self.assertEqual(view.get_page_kwargs(), ('page_after', 'page_before'))
+        self.assertEqual(
+            view.get_page_kwargs(1), ('page1_after', 'page1_before')
+        )
+
+    def test_page_per_list(self):
+        view = self.get_view(page_after=self.pks[1], page1_before=self.pks[3])
+        queryset = Client.objects.all()
+        _, page = view.paginate_queryset(queryset)
+        self.assertEqual(
+            [obj.pk for obj in page.object_list], self.pks[2:4]
+        )
+        _, page = view.paginate_queryset(queryset, 1)
+        self.assertEqual(
+            [obj.pk for obj in page.object_list], self.pks[1:3]
+        )
+        _, page = view.paginate_queryset(queryset, 2)
+        self.assertEqual(
+            [obj.pk for obj in page.object_list], self.pks[:2]
+        )
+
+    def test_no_pagination(self):
+        view = self.get_view()
+        view.paginate_by = None
+        self.assertEqual(
+            view.paginate_queryset(Client.objects.all()), (None, None)
+        )
+
+
+class PermissionMatrixTest(TestCase):
+    """Права пользователя на модели, вычисленные один раз за запрос"""
+
+    def get_matrix(self, user):
+        request = get_request(user)
+        matrix = get_permission_matrix(request)
+        self.assertIs(get_permission_matrix(request), matrix)
+        return matrix
+
+    def add_perms(self, user, *codenames):
+        user.user_permissions.add(
+            *Permission.objects.filter(codename__in=codenames)
+        )
+        return UserProfile.objects.get(pk=user.pk)
+
+    def test_user(self):
+        user = self.add_perms(
+            UserProfile.objects.create(username='user'),
+            'change_contract', 'close_contract', 'view_client',
+        )
+        matrix = self.get_matrix(user)
+        self.assertEqual(
+            matrix.get_model_perms(Contract),
+            {
+                'add': False, 'change': True, 'delete': False,
+                'view': True, 'close': True,
+            },
+        )
+        self.assertTrue(matrix.has_perm(Client, 'view'))
+        self.assertFalse(matrix.has_perm(Client, 'change'))
+        self.assertFalse(matrix.has_perm(Client, 'close'))
+        self.assertTrue(matrix.has_module_perms('contract'))
+        self.assertFalse(matrix.has_module_perms('users'))
+
+    def test_close_requires_change(self):
+        user = self.add_perms(
+            UserProfile.objects.create(username='user'), 'close_contract'
+        )
+        self.assertFalse(self.get_matrix(user).has_perm(Contract, 'close'))
+
+    def test_superuser(self):
+        matrix = self.get_matrix(UserProfile.objects.create(
+            username='admin', is_superuser=True
+        ))
+        self.assertTrue(matrix.has_perm(Contract, 'delete'))
+        self.assertTrue(matrix.has_module_perms('users'))
+
+    def test_inactive(self):
+        user = self.add_perms(
+            UserProfile.objects.create(
+                username='user', is_superuser=True, is_active=False
+            ),
+            'view_contract',
+        )
+        matrix = self.get_matrix(user)
+        self.assertFalse(matrix.has_perm(Contract, 'view'))
+        self.assertFalse(matrix.has_module_perms('contract'))
+
+
+class UrlTemplateTest(SimpleTestCase):
+    """Адреса по шаблонам, полученным одним вызовом reverse()"""
+
+    def setUp(self):
+        utils.clear_url_templates()
+        self.addCleanup(utils.clear_url_templates)
+
+    def test_slug(self):
+        slug = 'contract-5-0'
+        self.assertEqual(
+            try_get_url('contract_change', slug),
+            reverse('contract_change', kwargs={'slug': slug}),
+        )
+        self.assertEqual(
+            try_get_url('contract_close', slug, action='change'),
+            reverse('contract_close', kwargs={'slug': slug}),
+        )
+        self.assertEqual(try_get_url('home'), reverse('home'))
+
+    def test_archive_prefix(self):
+        slug = 'contract-5-0'
+        self.assertEqual(
+            try_get_url('contract_change', slug, action='view'),
+            reverse('archive_contract_change', kwargs={'slug': slug}),
+        )
+
+    def test_cache(self):
+        with mock.patch.object(
+            utils, 'reverse', wraps=utils.reverse
+        ) as reverse_mock:
+            urls = [
+                try_get_url('contract_change', f'contract-{pk}-0')
+                for pk in range(3)
+            ]
+            self.assertEqual(reverse_mock.call_count, 1)
+            self.assertEqual(try_get_url('no_such_url', 'contract-1-0'), '')
+            self.assertEqual(try_get_url('no_such_url', 'contract-2-0'), '')
+            self.assertEqual(reverse_mock.call_count, 2)
+            utils.clear_url_templates(setting='ROOT_URLCONF')
+            try_get_url('contract_change', 'contract-1-0')
+            self.assertEqual(reverse_mock.call_count, 3)
+        self.assertEqual(
+            urls[2],
+            reverse('contract_change', kwargs={'slug': 'contract-2-0'}),
+        )
+
+    def test_invalid_slug(self):
+        self.assertEqual(try_get_url('contract_change', 'договор 1'), '')
+
+
+class ListColumnTest(SimpleTestCase):
+    """Вывод значений столбцов списка по параметрам, общим для строк"""
+
+    def get_column(self, name):
+        return ListColumn(
+            name, None, get_column_field(Contract._meta, name),
+            empty_value_display='-',
+        )
+
+    def test_column_field(self):
+        opts = Contract._meta
+        self.assertEqual(get_column_field(opts, 'client').name, 'client')
+        self.assertIsNone(get_column_field(opts, 'client_id'))
+        self.assertIsNone(get_column_field(opts, 'letter'))
+        self.assertIsNone(get_column_field(opts, 'no_such_field'))
+
+    def test_display(self):
+        contract = Contract(
+            number='1', date_begin=datetime.date(2025, 3, 3),
+            control_price=WITH_PRICING, client=Client(name='Альфа'),
+        )
+        for name in ('number', 'date_begin', 'control_price', 'title'):
+            field = Contract._meta.get_field(name)
+            self.assertEqual(
+                self.get_column(name).display(contract)[0],
+                display_for_field(getattr(contract, name), field, '-'),
+            )
+        self.assertEqual(
+            self.get_column('client').display(contract)[0], contract.client
+        )
+        self.assertEqual(
+            self.get_column('great_client').display(contract)[0], '-'
+        )
+
+    def test_row_class(self):
+        contract = Contract(date_begin=datetime.date(2025, 3, 3))
+        self.assertEqual(
+            self.get_column('date_begin').display(contract)[1],
+            ' class="field-date_begin nowrap"',
+        )
+        self.assertEqual(
+            self.get_column('number').display(contract)[1],
+            ' class="field-number"',
+        )
+
+    def test_escape(self):
+        cl = SimpleNamespace(
+            opts=Contract._meta, list_columns=[self.get_column('title')]
+        )
+        cells = list(
+            items_for_result(cl, Contract(title='<b>{title}</b>'))
+        )
+        self.assertEqual(
+            cells,
+            ['<td class="field-title">&lt;b&gt;{title}&lt;/b&gt;</td>'],
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SiteMenuTest(TestCase):
+    """Главное меню в кэше по отпечатку набора прав пользователя"""
+
+    def setUp(self):
+        cache.clear()
+
+    def create_user(self, username, *codenames):
+        user = UserProfile.objects.create(username=username)
+        user.user_permissions.add(
+            *Permission.objects.filter(codename__in=codenames)
+        )
+        return UserProfile.objects.get(pk=user.pk)
+
+    def get_menu(self, user):
+        return get_site_menu(get_request(user))
+
+    def get_titles(self, user):
+        return [item['title'] for item in self.get_menu(user)['main_menu']]
+
+    def test_fingerprint(self):
+        first = self.create_user('first', 'view_client', 'view_contract')
+        second = self.create_user('second', 'view_contract', 'view_client')
+        third = self.create_user('third', 'view_contract')
+        admin = UserProfile.objects.create(username='admin', is_superuser=True)
+
+        def get_fingerprint(user):
+            return get_permission_matrix(get_request(user)).fingerprint
+
+        self.assertEqual(get_fingerprint(first), get_fingerprint(second))
+        self.assertNotEqual(get_fingerprint(first), get_fingerprint(third))
+        self.assertEqual(get_fingerprint(admin), 'superuser')
+
+    def test_menu_per_fingerprint(self):
+        first = self.create_user('first', 'view_client')
+        second = self.create_user('second', 'view_client')
+        user = self.create_user('user')
+        with mock.patch.object(
+            mixins, 'get_main_menu', wraps=mixins.get_main_menu
+        ) as get_main_menu:
+            self.assertIn('Настройки', self.get_titles(first))
+            self.assertIn('Настройки', self.get_titles(second))
+            self.assertEqual(get_main_menu.call_count, 1)
+            self.assertNotIn('Настройки', self.get_titles(user))
+            self.assertEqual(get_main_menu.call_count, 2)
+            # Изменение прав меняет отпечаток в ключе кэша
+            user.user_permissions.add(
+                Permission.objects.get(codename='view_client')
+            )
+            user = UserProfile.objects.get(pk=user.pk)
+            self.assertIn('Настройки', self.get_titles(user))
+            self.assertEqual(get_main_menu.call_count, 2)
+
+    def test_clear(self):
+        user = self.create_user('user')
+        with mock.patch.object(
+            mixins, 'get_main_menu', wraps=mixins.get_main_menu
+        ) as get_main_menu:
+            self.get_menu(user)
+            clear_main_menu(setting='LANGUAGE_CODE')
+            self.get_menu(user)
+            self.assertEqual(get_main_menu.call_count, 1)
+            clear_main_menu(setting='ROOT_URLCONF')
+            self.get_menu(user)
+            self.assertEqual(get_main_menu.call_count, 2)
+
+
+class ExportTest(SimpleTestCase):
+    """Потоковая выгрузка строк в CSV и XLSX"""
+
+    def read_csv(self, chunks):
+        text = ''.join(chunks)
+        self.assertTrue(text.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(text[1:]), delimiter=';'))
+
+    def test_csv(self):
+        rows = self.read_csv(export.stream_csv(
+            ['Номер', 'Цена'], [['1', Decimal('10.50')], ['2', None]]
+        ))
+        self.assertEqual(rows, [['Номер', 'Цена'], ['1', '10.50'], ['2', '']])
+
+    def test_csv_formula(self):
+        """Текст, начинающийся как формула, выводится с апострофом"""
+        rows = self.read_csv(export.stream_csv(
+            ['=Заголовок'],
+            [['=HYPERLINK("x")'], ['+7'], ['-1'], ['@SUM(A1)'], [-1], ['1']],
+        ))
+        self.assertEqual(
+            [row[0] for row in rows],
+            ["'=Заголовок", '\'=HYPERLINK("x")', "'+7", "'-1", "'@SUM(A1)",
+             '-1', '1'],
+        )
+
+    def test_xlsx(self):
+        rows = [
+            ['<Договор & 1>', Decimal('5.00'), datetime.date(2025, 3, 3)],
+            ['без\x01символа', None, True],
+        ]
+        content = b''.join(export.stream_xlsx(['Номер', 'Цена', 'Дата'], rows))
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('&lt;Договор &amp; 1&gt;', sheet)
+        self.assertIn('<v>5.00</v>', sheet)
+        self.assertIn('03.03.2025', sheet)
+        self.assertIn('>безсимвола<', sheet)
+        self.assertIn('>да<', sheet)
+        self.assertEqual(sheet.count('<row>'), 3)
+
+    def test_xlsx_streaming(self):
+        """Содержимое выдается частями по мере записи строк"""
+        rows_read = []
+
+        def get_rows():
+            for number in range(export.XLSX_FLUSH_ROWS * 2 + 1):
+                rows_read.append(number)
+                yield [number, f'Договор {number}']
+
+        chunks = export.stream_xlsx(['Номер', 'Наименование'], get_rows())
+        content = next(chunks)
+        self.assertEqual(len(rows_read), export.XLSX_FLUSH_ROWS)
+        content += b''.join(chunks)
+        self.assertEqual(len(rows_read), export.XLSX_FLUSH_ROWS * 2 + 1)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(
+            sheet.count('<row>'), export.XLSX_FLUSH_ROWS * 2 + 2
+        )
+
+
+class PerformanceTest(TestCase):
+    """Замеры представлений по именам адресов"""
+
+    def setUp(self):
+        performance_history.clear()
+        self.addCleanup(performance_history.clear)
+
+    def get_response(self, request):
+        request.resolver_match = ResolverMatch(
+            self.get_response, (), {}, url_name='test'
+        )
+        list(Client.objects.all())
+        list(Client.objects.all())
+        return HttpResponse()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_history_size(self):
+        history = PerformanceHistory(3)
+        for number in range(5):
+            history.add('test', {
+                'view_ms': number, 'sql_count': 1, 'sql_ms': 0,
+                'result_list_ms': 0,
+            })
+        stats = history.get_stats()['test']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['view_ms'], {'p50': 3, 'p95': 4, 'max': 4})
+
+    def test_middleware(self):
+        middleware = PerformanceMiddleware(self.get_response)
+        middleware(RequestFactory().get('/'))
+        middleware(RequestFactory().get('/'))
+        stats = performance_history.get_stats()
+        self.assertEqual(list(stats), ['test'])
+        self.assertEqual(stats['test']['count'], 2)
+        self.assertEqual(stats['test']['sql_count']['max'], 2)
+
+    def test_unresolved(self):
+        middleware = PerformanceMiddleware(lambda request: HttpResponse())
+        middleware(RequestFactory().get('/'))
+        self.assertEqual(performance_history.get_stats(), {})
+
+    def test_stats_staff_only(self):
+        request = get_request(UserProfile(username='user'))
+        with self.assertRaises(Http404):
+            performance_stats(request)
+        request = get_request(UserProfile(username='staff', is_staff=True))
+        self.assertEqual(performance_stats(request).status_code, 200)
+
+
+class SiteRegistryTest(SimpleTestCase):
+    """Параметры разделов сайта, собранные при запуске"""
+
+    def test_opts_and_forms(self):
+        self.assertIs(
+            site_registry.get_opts('contract'), contract_views.settings_dict
+        )
+        self.assertEqual(site_registry.get_opts('no_such_app'), {})
+        self.assertIs(site_registry.get_form_class(Contract), ContractForm)
+        self.assertIs(site_registry.get_form_class(Letter), LetterForm)
+
+    def test_changelist_fields(self):
+        opts_dict = contract_views.settings_dict
+        self.assertEqual(
+            site_registry.get_changelist_fields(opts_dict, 'contract'),
+            get_changelist_fields(opts_dict, 'contract'),
+        )
+        opts_dict = {'letter': {'fields_display': ('number', 'date')}}
+        self.assertEqual(
+            site_registry.get_changelist_fields(opts_dict, 'letter'),
+            (('number', 'date'), ['number'], ''),
+        )
+
+    def test_changelist_fields_check(self):
+        self.assertEqual(get_changelist_fields({}, 'letter'), (
+            ('id',), ['id'], ''
+        ))
+        opts_dict = {
+            'letter': {'fields_display': ('number',), 'fields_link': None}
+        }
+        self.assertEqual(
+            get_changelist_fields(opts_dict, 'letter'),
+            (('number',), None, ''),
+        )
+        with self.assertRaises(ImproperlyConfigured):
+            get_changelist_fields(
+                {'letter': {'fields_display': '__all__'}}, 'letter'
+            )
+        with self.assertRaises(ImproperlyConfigured):
+            get_changelist_fields({'letter': {
+                'fields_display': ('number',), 'fields_editable': ('date',),
+            }}, 'letter')
+
+
+class ModelIndexTest(SimpleTestCase):
+    """Указатель моделей по model_name"""
+
+    def test_get_model(self):
+        self.assertIs(site_registry.get_model('contract', 'Letter'), Letter)
+        self.assertIs(
+            site_registry.get_model('contract', 'employee'), Employee
+        )
+        self.assertIs(site_registry.get_model('users', 'letter'), Letter)
+        self.assertIsNone(site_registry.get_model('contract', None))
+        self.assertIsNone(site_registry.get_model('contract', 'no_such'))
+
+    def test_get_model_by_name(self):
+        self.assertEqual(
+            site_registry.get_model_by_name('Contract'),
+            ('contract', Contract),
+        )
+        self.assertEqual(
+            site_registry.get_model_by_name('userprofile'),
+            ('users', UserProfile),
+        )
+        # Промежуточные модели связей только по разделу
+        through = UserProfile.groups.through
+        self.assertEqual(
+            site_registry.get_model_by_name(through._meta.model_name),
+            (None, None),
+        )
+        self.assertIs(
+            site_registry.get_model('users', through._meta.model_name),
+            through,
+        )
+
+
+class AuditAtomicTest(TestCase):
+    """Записи журнала изменений одной вставкой в конце audit_atomic()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(username='user')
+
+    def get_entry(self, object_id):
+        return LogEntrySite(
+            user=self.user, object_id=str(object_id), object_id_int=object_id,
+            object_repr=str(object_id), action_flag=ADDITION,
+        )
+
+    def get_logged(self):
+        return sorted(
+            LogEntrySite.objects.values_list('object_id_int', flat=True)
+        )
+
+    def test_without_block(self):
+        self.assertIsNone(get_audit_log())
+        add_log_entries(self.get_entry(1))
+        self.assertEqual(self.get_logged(), [1])
+
+    def test_nested(self):
+        with CaptureQueriesContext(connection) as queries:
+            with audit_atomic() as audit_log:
+                add_log_entries(self.get_entry(1))
+                with audit_atomic() as nested_log:
+                    self.assertIs(get_audit_log(), nested_log)
+                    add_log_entries(self.get_entry(2), self.get_entry(3))
+                self.assertEqual(len(audit_log.entries), 3)
+                self.assertEqual(self.get_logged(), [])
+        self.assertEqual(self.get_logged(), [1, 2, 3])
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "risi_log"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertIsNone(get_audit_log())
+
+    def test_nested_rollback(self):
+        with audit_atomic():
+            add_log_entries(self.get_entry(1))
+            with self.assertRaises(ValueError):
+                with audit_atomic():
+                    add_log_entries(self.get_entry(2))
+                    raise ValueError
+            add_log_entries(self.get_entry(3))
+        self.assertEqual(self.get_logged(), [1, 3])
+
+    def test_rollback(self):
+        with self.assertRaises(ValueError):
+            with audit_atomic():
+                Client.objects.create(name='Альфа', city='Город')
+                add_log_entries(self.get_entry(1))
+                raise ValueError
+        self.assertEqual(self.get_logged(), [])
+        self.assertFalse(Client.objects.exists())
+        self.assertIsNone(get_audit_log())
+
+
+class AutocompleteViewTest(TestCase):
+    """Значения поля-связи виджета AutocompleteSelect в JSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(username='user')
+        cls.user.user_permissions.add(*Permission.objects.filter(
+            codename__in=(
+                'view_contract', 'view_client', 'view_member', 'view_employee',
+            )
+        ))
+        for name in ('Альфа', 'Альтаир', 'Бета'):
+            Client.objects.create(name=name, city='Город')
+        Client.objects.create(name='Альфа скрытый', city='Город', view=False)
+        cls.employee = Employee.objects.create(
+            first_name='Иван', last_name='Петров', middle_name='Иванович',
+            tabel=1,
+        )
+
+    def get_json(self, user=None, **params):
+        params = {
+            'app_label': 'contract', 'model_name': 'contract',
+            'field_name': 'client', **params,
+        }
+        request = RequestFactory().get('/autocomplete/', params)
+        request.user = user or UserProfile.objects.get(pk=self.user.pk)
+        response = AutocompleteView.as_view()(request)
+        return json.loads(response.content)
+
+    def get_texts(self, **params):
+        return [item['text'] for item in self.get_json(**params)['results']]
+
+    def test_search(self):
+        self.assertEqual(
+            self.get_texts(term='аль'), ['Альтаир', 'Альфа']
+        )
+        self.assertEqual(self.get_texts(), ['Альтаир', 'Альфа', 'Бета'])
+
+    def test_search_fields(self):
+        """Поля поиска модели - по settings_dict раздела"""
+        self.assertEqual(
+            self.get_json(
+                model_name='member', field_name='employee', term='пет'
+            )['results'],
+            [{'id': str(self.employee.pk), 'text': str(self.employee)}],
+        )
+
+    def test_pages(self):
+        with mock.patch.object(AutocompleteView, 'page_size', 2):
+            data = self.get_json()
+            self.assertEqual(len(data['results']), 2)
+            self.assertTrue(data['pagination']['more'])
+            data = self.get_json(page='2')
+            self.assertEqual(len(data['results']), 1)
+            self.assertFalse(data['pagination']['more'])
+            with mock.patch.object(AutocompleteView, 'max_page', 1):
+                self.assertFalse(self.get_json()['pagination']['more'])
+                self.assertEqual(self.get_json(page='2')['results'], [])
+
+    def test_unregistered_field(self):
+        """Доступны только поля виджетов AutocompleteSelect"""
+        for params in (
+                {'field_name': 'status'},
+                {'model_name': 'userprofile', 'field_name': 'groups'},
+                {'app_label': 'no_such_app'},
+        ):
+            with self.assertRaises(Http404):
+                self.get_json(**params)
+
+    def test_permission(self):
+        for codename in ('view_contract', 'view_client'):
+            user = UserProfile.objects.create(username=codename)
+            user.user_permissions.add(
+                Permission.objects.get(codename=codename)
+            )
+            with self.assertRaises(Http404):
+                self.get_json(UserProfile.objects.get(pk=user.pk))
+
+    def test_invalid_search_fields(self):
+        with mock.patch.object(
+            AutocompleteView, 'default_search_fields', ('client__name', 'x')
+        ):
+            with self.assertRaises(Http404):
+                self.get_json()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChoicesCacheTest(TransactionTestCase):
+    """Варианты выбора справочников из кэша процесса"""
+
+    def setUp(self):
+        cache.clear()
+        choices_cache.entries.clear()
+        self.addCleanup(choices_cache.entries.clear)
+        self.status = StatusContract.objects.create(name='Статус 1')
+
+    def get_choices(self):
+        return [label for pk, label in choices_cache.get_choices(
+            StatusContract
+        )]
+
+    def test_cached(self):
+        self.assertEqual(self.get_choices(), ['Статус 1'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_choices(), ['Статус 1'])
+            self.assertEqual(
+                choices_cache.get_labels(StatusContract),
+                {str(self.status.pk): 'Статус 1'},
+            )
+
+    def test_invalidate(self):
+        self.get_choices()
+        StatusContract.objects.create(name='Статус 2')
+        self.assertEqual(self.get_choices(), ['Статус 1', 'Статус 2'])
+        self.status.name = 'Статус 0'
+        self.status.save()
+        self.assertEqual(self.get_choices(), ['Статус 0', 'Статус 2'])
+        self.status.delete()
+        self.assertEqual(self.get_choices(), ['Статус 2'])
+
+    def test_invalidate_bulk_save(self):
+        self.get_choices()
+        StatusContract.objects.filter(pk=self.status.pk).update(name='Новый')
+        self.assertEqual(self.get_choices(), ['Статус 1'])
+        post_bulk_save.send(
+            sender=StatusContract, instances=[self.status], using='default'
+        )
+        self.assertEqual(self.get_choices(), ['Новый'])
+
+    def test_version(self):
+        """Изменение версии другим процессом - варианты перечитываются"""
+        self.get_choices()
+        StatusContract.objects.filter(pk=self.status.pk).update(name='Новый')
+        utils.bump_cache_version(choices_cache.get_version_key(StatusContract))
+        self.assertEqual(self.get_choices(), ['Новый'])
+
+    def test_rollback(self):
+        """Незафиксированные записи не попадают в кэш"""
+        self.get_choices()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                StatusContract.objects.create(name='Статус 2')
+                self.assertEqual(self.get_choices(), ['Статус 1', 'Статус 2'])
+                raise ValueError
+        self.assertEqual(self.get_choices(), ['Статус 1'])
+
+    def test_field(self):
+        field = CachedModelChoiceField(queryset=StatusContract.objects.all())
+        self.assertTrue(field.uses_cache())
+        self.get_choices()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [label for value, label in field.choices],
+                ['---------', 'Статус 1'],
+            )
+        field = CachedModelChoiceField(
+            queryset=StatusContract.objects.filter(name='Статус 1')
+        )
+        self.assertFalse(field.uses_cache())
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [label for value, label in field.choices],
+                ['---------', 'Статус 1'],
+            )
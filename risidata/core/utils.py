@@ -1,14 +1,29 @@
+import datetime
+import hashlib
+import re
+import time
 from copy import copy
 
 from django.apps import apps
 from django.contrib.admin.utils import (
     NestedObjects,
+    display_for_field,
+    display_for_value,
+    lookup_field,
     label_for_field as label_for_field_admin
 )
 from django.contrib.auth import get_permission_codename
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
 from django.db import models
-from django.urls import reverse, NoReverseMatch
+from django.urls import (
+    reverse, NoReverseMatch, get_script_prefix, get_urlconf
+)
+from django.utils.functional import cached_property
+from django.utils.hashable import make_hashable
+from django.utils.safestring import mark_safe
 
 BLANK_CHOICE = [('', '---------')]
 DEFAULT_MESSAGE_WARNING = 'Изменения отсутствуют. Сохранение отменено.'
@@ -19,6 +34,8 @@ DELETE_MODEL_OBJECT = [
     'AddAgreement',
     'Member',
 ]
+SLUG_RE = re.compile(r'[-a-zA-Z0-9_]+')
+URL_SLUG_PLACEHOLDER = 'slug_placeholder'
 SETTINGS_APP_LIST = [
     'users',
     'database',
@@ -109,6 +126,101 @@ TRANSTABLE = (
 )  # https://github.com/last-partizan/pytils/blob/master/pytils/translit.py
 
 
+def get_column_field(opts, name):
+    """
+    Поле модели для столбца списка или None, если значение столбца
+    вычисляется атрибутом модели или представления (как в lookup_field)
+    """
+    try:
+        field = opts.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.is_relation and (
+            (field.many_to_one and not field.related_model)
+            or field.one_to_many
+    ):
+        return None
+    if (
+            field.is_relation
+            and not field.many_to_many
+            and getattr(field, 'attname', None) == name
+    ):
+        return None
+    return field
+
+
+class ListColumn:
+    """
+    Параметры столбца списка, общие для всех строк: поле модели, функция
+    вывода значения, классы ячейки, вывод ссылки и редактирование в форме
+    """
+
+    def __init__(
+            self,
+            name,
+            model_view,
+            field=None,
+            empty_value_display='',
+            link=False,
+            table_tag='td',
+            label='',
+            editable=False,
+    ):
+        self.name = name
+        self.model_view = model_view
+        self.field = field
+        self.empty_value_display = empty_value_display
+        self.link = link
+        self.table_tag = table_tag
+        self.label = label
+        self.editable = editable
+
+        row_class = 'field-%s' % name
+        self.row_class = mark_safe(' class="%s"' % row_class)
+        self.row_class_nowrap = mark_safe(' class="%s nowrap"' % row_class)
+        if field is None:
+            self.display = self.display_attr
+        elif isinstance(field.remote_field, models.ManyToOneRel):
+            self.display = self.display_related
+        elif getattr(field, 'flatchoices', None):
+            self.choices = dict(make_hashable(field.flatchoices))
+            self.display = self.display_choice
+        else:
+            self.display = self.display_field
+        if isinstance(
+                field, (models.DateField, models.TimeField, models.ForeignKey)
+        ):
+            self.row_class = self.row_class_nowrap
+
+    def display_attr(self, result):
+        f, attr, value = lookup_field(self.name, result, self.model_view)
+        result_repr = display_for_value(
+            value, self.empty_value_display, getattr(attr, 'boolean', False)
+        )
+        if isinstance(value, (datetime.date, datetime.time)):
+            return result_repr, self.row_class_nowrap
+        return result_repr, self.row_class
+
+    def display_related(self, result):
+        value = getattr(result, self.field.name)
+        if value is None:
+            return self.empty_value_display, self.row_class
+        return value, self.row_class
+
+    def display_choice(self, result):
+        value = make_hashable(getattr(result, self.name))
+        return (
+            self.choices.get(value, self.empty_value_display), self.row_class
+        )
+
+    def display_field(self, result):
+        value = getattr(result, self.name)
+        return (
+            display_for_field(value, self.field, self.empty_value_display),
+            self.row_class
+        )
+
+
 class ChangeList:
     def __init__(
             self,
@@ -120,7 +232,7 @@ class ChangeList:
             fields_display=None,
             fields_link=None,
             fields_editable=None,
-
+            list_index=0,
     ):
         self.formset = None
         self.model_view = copy(model_view)
@@ -132,16 +244,104 @@ class ChangeList:
         self.fields_link = fields_link
         self.fields_editable = fields_editable
         self.pk_attname = self.opts.pk.attname
+        self.list_index = list_index
 
         self.queryset = self.get_queryset(request)
-        result_list = self.queryset._clone()
-        self.result_list = result_list
-        self.result_count = len(result_list)
+        self.get_results(request)
 
     def get_queryset(self, request):
         qs = self.root_queryset
         return qs
 
+    def get_results(self, request):
+        """Формирование записей текущей страницы списка"""
+        self.paginator, self.page = self.model_view.paginate_queryset(
+            self.queryset, self.list_index
+        )
+        if self.page is None:
+            result_list = self.queryset._clone()
+        else:
+            result_list = self.page.object_list
+        self.result_list = result_list
+        self.result_count = len(result_list)
+        self.multi_page = bool(self.page and self.page.has_other_pages())
+        if self.multi_page:
+            self.full_result_count = self.paginator.count
+        else:
+            self.full_result_count = self.result_count
+
+    def get_query_string(self, new_params=None, remove=None):
+        params = self.request.GET.copy()
+        for name in remove or ():
+            params.pop(name, None)
+        for name, value in (new_params or {}).items():
+            params[name] = value
+        return '?%s' % params.urlencode()
+
+    def get_page_url(self, page_kwarg=None, obj=None):
+        page_kwargs = self.model_view.get_page_kwargs(self.list_index)
+        if page_kwarg is None:
+            return self.get_query_string(remove=page_kwargs)
+        return self.get_query_string(
+            {page_kwarg: getattr(obj, self.pk_attname)}, remove=page_kwargs
+        )
+
+    @property
+    def first_page_url(self):
+        return self.get_page_url()
+
+    @property
+    def previous_page_url(self):
+        before_kwarg = self.model_view.get_page_kwargs(self.list_index)[1]
+        return self.get_page_url(before_kwarg, self.result_list[0])
+
+    @property
+    def next_page_url(self):
+        after_kwarg = self.model_view.get_page_kwargs(self.list_index)[0]
+        return self.get_page_url(
+            after_kwarg, self.result_list[self.result_count - 1]
+        )
+
+    @cached_property
+    def list_columns(self):
+        return self.get_list_columns()
+
+    def get_list_columns(self):
+        """
+        Параметры столбцов списка. Вычисляются один раз при выводе первой
+        строки, после подключения формсета
+        """
+        empty_value_display = self.model_view.get_empty_value_display()
+        if self.formset is None:
+            form_fields = ()
+        else:
+            form_fields = {*self.formset.form.base_fields, self.opts.pk.name}
+        columns = []
+        first = True
+        for field_name in self.fields_display:
+            if self.fields_link is None:
+                link = False
+            elif first and not self.fields_link:
+                link = True
+            else:
+                link = field_name in self.fields_link
+            table_tag, label = 'td', ''
+            if link:
+                table_tag = 'th' if first else 'td'
+                first = False
+                label = label_for_field(field_name, self.model, form=self.form)
+            columns.append(ListColumn(
+                field_name,
+                self.model_view,
+                field=get_column_field(self.opts, field_name),
+                empty_value_display=empty_value_display,
+                link=link,
+                table_tag=table_tag,
+                label=label,
+                editable=field_name in form_fields,
+            ))
+        return columns
+
     def url_for_result(self, result):
         pk = getattr(result, self.pk_attname)
         app_label = self.model_view.app_label
@@ -154,14 +354,97 @@ class ChangeList:
         return try_get_url(f'{app_label}_change', **urlargs)
 
 
+_url_templates = {}
+
+
+def get_cache_version(key):
+    """
+    Версия кэшированных данных в кэше Django (settings.CACHES - общий
+    для процессов). Начальное значение - время, чтобы после вытеснения
+    ключа версии из кэша не использовались прежние записи
+    """
+    return cache.get_or_set(key, time.time_ns(), timeout=None)
+
+
+def is_cache_shared():
+    """
+    Версии кэша общие для процессов сервера: при кэше в памяти процесса
+    изменение версии видно только сохранившему запись процессу
+    """
+    return not isinstance(
+        caches[DEFAULT_CACHE_ALIAS], (DummyCache, LocMemCache)
+    )
+
+
+def bump_cache_version(key):
+    """Изменение версии - ранее кэшированные данные не используются"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def clear_url_templates(setting=None, **kwargs):
+    """Сброс шаблонов адресов при изменении ROOT_URLCONF"""
+    if setting in (None, 'ROOT_URLCONF'):
+        _url_templates.clear()
+
+
+def get_url_template(name, current_app=None, with_slug=True):
+    """
+    Возвращает шаблон адреса (начало, окончание) для подстановки slug.
+
+    reverse() выполняется один раз для пары (name, current_app), далее
+    адрес формируется подстановкой slug в шаблон. Если адрес не найден,
+    возвращается None.
+    """
+    key = (name, current_app, with_slug, get_script_prefix(), get_urlconf())
+    try:
+        return _url_templates[key]
+    except KeyError:
+        pass
+    urlargs = {'slug': URL_SLUG_PLACEHOLDER} if with_slug else None
+    try:
+        url = reverse(name, kwargs=urlargs, current_app=current_app)
+    except NoReverseMatch:
+        template = None
+    else:
+        prefix, _, suffix = url.partition(URL_SLUG_PLACEHOLDER)
+        template = (prefix, suffix)
+    _url_templates[key] = template
+    return template
+
+
 def try_get_url(name, slug=None, current_app=None, **kwargs):
     if kwargs.get('action') == 'view':
         name = 'archive_' + name
-    urlargs = {'slug': slug} if slug else None
-    try:
-        return reverse(name, kwargs=urlargs, current_app=current_app)
-    except NoReverseMatch:
+    if slug and not SLUG_RE.fullmatch(slug):
         return ''
+    template = get_url_template(name, current_app, bool(slug))
+    if template is None:
+        return ''
+    prefix, suffix = template
+    return prefix + slug + suffix if slug else prefix
+
+
+def prefix_search_query(search_fields, term):
+    """
+    Условие поиска по началу значений search_fields: каждое слово term
+    должно быть началом значения одного из полей. SQLite сравнивает без
+    учета регистра только латиницу, поэтому слово проверяется также
+    с заглавной буквы и заглавными буквами
+    """
+    query = models.Q()
+    for word in term.split():
+        variants = {word, word.capitalize(), word.upper()}
+        word_query = models.Q()
+        for field_name in search_fields:
+            for variant in variants:
+                word_query |= models.Q(
+                    (f'{field_name}__istartswith', variant)
+                )
+        query &= word_query
+    return query
 
 
 def get_slug_kwarg(kwargs):
@@ -191,18 +474,40 @@ def get_slug_url(kwargs, model=None, obj_id=None, related_id=None):
     return slug
 
 
-def id_list(related_model, *model_list, **kwargs):
-    """Возвращает список id связанной модели"""
-    s = set()
-    for model in model_list:
-        query = models.Q((model._meta.model_name + '__isnull', False),)
-        if kwargs:
-            query &= models.Q(*kwargs.items())
-        related_ids = related_model.objects.filter(query).values_list(
-            'id', flat=True
-        ).distinct()
-        s.update(s, related_ids)
-    return s
+def related_exists_name(related_object):
+    """Возвращает имя аннотации наличия связанных объектов"""
+    return 'has_%s' % related_object.name
+
+
+def annotate_related_exists(queryset, related_objects):
+    """
+    Добавляет в queryset признаки наличия связанных объектов (Exists),
+    вычисляемые в том же запросе, что и сам список
+    """
+    annotations = {
+        related_exists_name(rel): models.Exists(
+            rel.related_model._default_manager.filter(
+                **{rel.field.name: models.OuterRef('pk')}
+            )
+        )
+        for rel in related_objects
+    }
+    return queryset.annotate(**annotations)
+
+
+def related_exists_map(result_list, related_objects):
+    """
+    Возвращает словарь {model_name: id записей, имеющих связанные объекты}
+    только для выведенных записей списка
+    """
+    return {
+        rel.related_model._meta.model_name: {
+            result.pk
+            for result in result_list
+            if getattr(result, related_exists_name(rel), False)
+        }
+        for rel in related_objects
+    }
 
 
 def label_for_column(name, model, form=None):
@@ -252,48 +557,100 @@ def help_text_for_field(name, model, form):
     return help_text
 
 
+class PermissionMatrix:
+    """
+    Права пользователя на все модели сайта.
+
+    Вычисляется один раз за запрос по набору прав пользователя, далее
+    меню, боковые панели и ячейки списков получают права из словаря.
+    """
+
+    actions = ('add', 'change', 'delete', 'view', 'close')
+
+    def __init__(self, user):
+        self.is_superuser = user.is_active and user.is_superuser
+        if user.is_active and not self.is_superuser:
+            self.perms = user.get_all_permissions()
+        else:
+            self.perms = set()
+        self.app_labels = {perm.split('.', 1)[0] for perm in self.perms}
+        self.models = {
+            model: self.build_model_perms(model) for model in apps.get_models()
+        }
+
+    def check_perm(self, opts, action):
+        if self.is_superuser:
+            return True
+        codename = get_permission_codename(action, opts)
+        return "%s.%s" % (opts.app_label, codename) in self.perms
+
+    def build_model_perms(self, model):
+        opts = model._meta
+        perms = {
+            action: self.check_perm(opts, action) for action in self.actions
+        }
+        perms['view'] = perms['view'] or perms['change']
+        perms['close'] = perms['close'] and perms['change']
+        return perms
+
+    def get_model_perms(self, model):
+        try:
+            return self.models[model]
+        except KeyError:
+            self.models[model] = perms = self.build_model_perms(model)
+            return perms
+
+    def has_perm(self, model, action):
+        return self.get_model_perms(model)[action]
+
+    def has_module_perms(self, app_label):
+        return self.is_superuser or app_label in self.app_labels
+
+    @cached_property
+    def fingerprint(self):
+        """Отпечаток набора прав для ключей кэша"""
+        if self.is_superuser:
+            return 'superuser'
+        return hashlib.md5(
+            '\n'.join(sorted(self.perms)).encode()
+        ).hexdigest()
+
+
+def get_permission_matrix(request):
+    """Возвращает права пользователя, вычисленные для текущего запроса"""
+    try:
+        return request.permission_matrix
+    except AttributeError:
+        request.permission_matrix = PermissionMatrix(request.user)
+        return request.permission_matrix
+
+
 def has_permission_change(request, model):
-    opts = model._meta
-    codename = get_permission_codename('change', opts)
-    return request.user.has_perm("%s.%s" % (opts.app_label, codename))
+    return get_permission_matrix(request).has_perm(model, 'change')
 
 
 def has_permission_add(request, model):
-    opts = model._meta
-    codename = get_permission_codename('add', opts)
-    return request.user.has_perm("%s.%s" % (opts.app_label, codename))
+    return get_permission_matrix(request).has_perm(model, 'add')
 
 
 def has_permission_delete(request, model):
-    opts = model._meta
-    codename = get_permission_codename('delete', opts)
-    return request.user.has_perm("%s.%s" % (opts.app_label, codename))
+    return get_permission_matrix(request).has_perm(model, 'delete')
 
 
 def has_permission_close(request, model):
-    opts = model._meta
-    codename = get_permission_codename('close', opts)
-    return request.user.has_perm(
-        "%s.%s" % (opts.app_label, codename)
-    ) and has_permission_change(request, model)
+    return get_permission_matrix(request).has_perm(model, 'close')
 
 
 def has_permission_view(request, model):
-    opts = model._meta
-    codename = get_permission_codename('view', opts)
-    return request.user.has_perm(
-        "%s.%s" % (opts.app_label, codename)
-    ) or has_permission_change(request, model)
+    return get_permission_matrix(request).has_perm(model, 'view')
+
+
+def has_module_permission(request, app_label):
+    return get_permission_matrix(request).has_module_perms(app_label)
 
 
 def get_model_perms(request, model):
-    return {
-        "add": has_permission_add(request, model),
-        "change": has_permission_change(request, model),
-        "delete": has_permission_delete(request, model),
-        "view": has_permission_view(request, model),
-        "close": has_permission_close(request, model),
-    }
+    return dict(get_permission_matrix(request).get_model_perms(model))
 
 
 def translit(text):
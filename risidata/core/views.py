@@ -0,0 +1,112 @@
+from django.contrib.admin.utils import NotRelationField, get_fields_from_path
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import FieldDoesNotExist
+from django.http import Http404, JsonResponse
+from django.views.generic.base import View
+
+from core.middleware import performance_history
+from core.models import ViewGeneralModel
+from core.registry import site_registry
+from core.utils import has_permission_view, prefix_search_query
+from core.widgets import autocomplete_fields
+
+
+def performance_stats(request):
+    """Замеры представлений по именам адресов: p50/p95, только персонал"""
+    if not request.user.is_staff:
+        raise Http404
+    return JsonResponse(
+        performance_history.get_stats(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    Значения поля-связи для AutocompleteSelect в JSON: поиск по началу
+    значений полей search_fields модели (settings_dict раздела, иначе
+    name), частями по page_size записей, не более max_page частей.
+    Учитываются limit_choices_to поля и отметка отображения
+    (ViewGeneralModel.view). Доступны только поля виджетов
+    AutocompleteSelect при праве просмотра модели поля и связанной модели
+
+    GET параметры: app_label, model_name, field_name - поле-связь модели,
+    term - строка поиска, page - номер части
+    """
+
+    page_size = 20
+    max_page = 500
+    default_search_fields = ('name',)
+
+    def get_source_field(self, request):
+        field = autocomplete_fields.get((
+            request.GET.get('app_label'),
+            request.GET.get('model_name'),
+            request.GET.get('field_name'),
+        ))
+        if field is None:
+            raise Http404
+        return field
+
+    def get_search_fields(self, model):
+        """
+        Поля поиска модели, которые являются полями значений (не связями);
+        без таких полей значения не выдаются
+        """
+        opts = model._meta
+        search_fields = site_registry.get_opts(opts.app_label).get(
+            opts.model_name, {}
+        ).get('search_fields') or self.default_search_fields
+        valid_fields = []
+        for name in search_fields:
+            try:
+                path = get_fields_from_path(model, name)
+            except (FieldDoesNotExist, NotRelationField):
+                continue
+            if not path[-1].is_relation:
+                valid_fields.append(name)
+        if not valid_fields:
+            raise Http404
+        return valid_fields
+
+    def get_queryset(self, field, term):
+        model = field.related_model
+        queryset = model._default_manager.complex_filter(
+            field.get_limit_choices_to()
+        )
+        if issubclass(model, ViewGeneralModel):
+            queryset = queryset.filter(view=True)
+        search_fields = self.get_search_fields(model)
+        if term:
+            queryset = queryset.filter(
+                prefix_search_query(search_fields, term)
+            )
+        if not queryset.ordered:
+            queryset = queryset.order_by(*search_fields, 'pk')
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        field = self.get_source_field(request)
+        if not (
+                has_permission_view(request, field.model)
+                and has_permission_view(request, field.related_model)
+        ):
+            raise Http404
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        queryset = self.get_queryset(field, request.GET.get('term', ''))
+        object_list = []
+        if page <= self.max_page:
+            start = (page - 1) * self.page_size
+            # Лишняя запись показывает, что есть следующая часть (без COUNT)
+            object_list = list(queryset[start:start + self.page_size + 1])
+        more = len(object_list) > self.page_size and page < self.max_page
+        return JsonResponse({
+            'results': [
+                {'id': str(obj.pk), 'text': str(obj)}
+                for obj in object_list[:self.page_size]
+            ],
+            'pagination': {'more': more},
+        })
@@ -1,4 +1,10 @@
 from django import forms
+from django.urls import reverse
+
+# Поля-связи, значения которых выдает core.views.AutocompleteView:
+# {(app_label, model_name, field_name): поле}. Заполняется при создании
+# виджетов AutocompleteSelect
+autocomplete_fields = {}
 
 
 class FilteredSelectMultiple(forms.SelectMultiple):
@@ -42,3 +48,86 @@ class DateWidget(forms.DateInput):
     def __init__(self, attrs=None, format=None):
         attrs = {"class": "vDateField", "size": "10", **(attrs or {})}
         super().__init__(attrs=attrs, format=format)
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Выбор связанного объекта с поиском по началу значений
+    (core.views.AutocompleteView). На странице выводится только выбранное
+    значение, остальные загружаются частями по мере ввода.
+
+    field - поле модели (ForeignKey), по которому определяются модель
+    значений и limit_choices_to; поле добавляется в autocomplete_fields
+    """
+
+    url_name = 'autocomplete'
+
+    class Media:
+        css = {
+            'screen': [
+                'admin/css/vendor/select2/select2.css',
+                'admin/css/autocomplete.css',
+            ],
+        }
+        js = [
+            'admin/js/vendor/jquery/jquery.js',
+            'admin/js/vendor/select2/select2.full.js',
+            'contract/js/autocomplete.js',
+        ]
+
+    def __init__(self, field, attrs=None, choices=()):
+        self.field = field
+        opts = field.model._meta
+        autocomplete_fields[opts.app_label, opts.model_name, field.name] = (
+            field
+        )
+        super().__init__(attrs, choices)
+
+    def get_url(self):
+        return reverse(self.url_name)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+        opts = self.field.model._meta
+        attrs.setdefault('class', '')
+        attrs.update({
+            'class': (attrs['class'] + ' autocomplete').strip(),
+            'data-ajax--url': self.get_url(),
+            'data-app-label': opts.app_label,
+            'data-model-name': opts.model_name,
+            'data-field-name': self.field.name,
+            'data-allow-clear': str(not self.is_required).lower(),
+            'data-placeholder': '',
+        })
+        return attrs
+
+    def optgroups(self, name, value, attr=None):
+        """Только выбранное значение, без выборки всех объектов"""
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '', False, 0))
+        selected = {str(v) for v in value if str(v) not in ('', 'None')}
+        labels = None
+        if selected and hasattr(self.choices, 'get_labels'):
+            # Наименования из кэша справочника (core.choices)
+            labels = self.choices.get_labels()
+        if labels is not None:
+            for index, key in enumerate(
+                    [key for key in selected if key in labels],
+                    start=len(options),
+            ):
+                options.append(
+                    self.create_option(name, key, labels[key], True, index)
+                )
+        elif selected:
+            field = self.choices.field
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            for index, obj in enumerate(queryset, start=len(options)):
+                options.append(self.create_option(
+                    name,
+                    field.prepare_value(obj),
+                    field.label_from_instance(obj),
+                    True,
+                    index,
+                ))
+        return [(None, options, 0)]
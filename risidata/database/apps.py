@@ -5,3 +5,17 @@ class DatabaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'database'
     verbose_name = 'База данных'
+
+    def ready(self):
+        super().ready()
+        from core.choices import choices_cache
+        from database.models import (
+            Post, Division, SubDivision, ConditionContract, StatusContract,
+            Department, Client, StageBeginName, StageMiddleName, StageEndName,
+        )
+
+        # Варианты выбора справочников в формах кэшируются
+        choices_cache.register(
+            Post, Division, SubDivision, ConditionContract, StatusContract,
+            Department, Client, StageBeginName, StageMiddleName, StageEndName,
+        )
@@ -1,4 +1,5 @@
 from django import forms
+from core.choices import CachedModelChoiceField
 from core.forms import ViewField, HELP_MAX_SYMBOL, MAX_LENGTH
 from core.validators import cyrillic_validator
 
@@ -32,7 +33,7 @@ class SubDivisionForm(ViewField):
     name = forms.CharField(max_length=MAX_LENGTH,
                            help_text=HELP_MAX_SYMBOL % MAX_LENGTH,
                            label='Субподразделение')
-    division = forms.ModelChoiceField(
+    division = CachedModelChoiceField(
         queryset=Division.objects.all(), label='Подразделение'
     )
 
@@ -92,7 +93,7 @@ class ClientForm(ViewField):
         label='Город'
     )
     inn = forms.IntegerField(required=False, label='ИНН')
-    department = forms.ModelChoiceField(
+    department = CachedModelChoiceField(
         queryset=Department.objects.all(), required=False, label='Ведомство'
     )
 
@@ -157,13 +158,13 @@ class EmployeeForm(ViewField):
     norma = forms.CharField(max_length=MAX_LENGTH,
                             help_text=HELP_MAX_SYMBOL % MAX_LENGTH,
                             label='норма часов')
-    division = forms.ModelChoiceField(
+    division = CachedModelChoiceField(
         queryset=Division.objects.all(), required=False, label='Подразделение'
     )
     # sub_division = forms.ModelChoiceField(
     #     queryset=SubDivision.objects.all(), required=False, label='Субподразделение'
     # )
-    post = forms.ModelChoiceField(
+    post = CachedModelChoiceField(
         queryset=Post.objects.all(), required=False, label='Должность'
     )
     getdoc = forms.BooleanField(
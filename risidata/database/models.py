@@ -3,6 +3,19 @@ from django.db import models
 from core.models import ViewGeneralModel
 
 
+def get_short_name(last_name, first_name, middle_name):
+    """Формирование имени "Фамилия И.О." """
+    try:
+        short_name = '%s %s.%s.' % (str(last_name).capitalize(),
+                                    str(first_name)[0].upper(),
+                                    str(middle_name)[0].upper(),
+                                    )
+    except IndexError:
+        return str(last_name).capitalize()
+
+    return short_name
+
+
 class Post(ViewGeneralModel):
     name = models.CharField('Должность', max_length=200, unique=True)
     abbr = models.CharField('Должность сокращенно', max_length=200)
@@ -177,12 +190,5 @@ class Employee(ViewGeneralModel):
         return full_name.strip()
 
     def get_short_name(self):
-        try:
-            short_name = '%s %s.%s.' % (str(self.last_name).capitalize(),
-                                        str(self.first_name)[0].upper(),
-                                        str(self.middle_name)[0].upper(),
-                                        )
-        except IndexError:
-            return str(self.last_name).capitalize()
-
-        return short_name
+        return get_short_name(self.last_name, self.first_name,
+                              self.middle_name)
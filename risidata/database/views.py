@@ -7,9 +7,8 @@ from core.mixins import (
     ChangeFormView, AddFormView, DeleteFormView, HistoryListView,
 )
 from core.utils import (
-    has_permission_add,
     get_slug_url,
-    get_model_perms,
+    get_permission_matrix, has_module_permission,
     SETTINGS_APP_LIST, try_get_url,
 )
 from database.forms import (
@@ -106,6 +105,7 @@ settings_dict = {
         'fields_link': ('__str__',),
         'fields_editable': (),
         'readonly_fields': (),
+        'search_fields': ('last_name', 'first_name', 'middle_name'),
     },
 }
 
@@ -122,15 +122,14 @@ class SettingsMixin:
     def construct_index_list(self, label=None):
         """Список моделей для заглавной страницы БД и боковой панели БД"""
 
-        request = self.request
+        permission_matrix = get_permission_matrix(self.request)
         app_list = []
         settings_app_list = self.get_sidebar_list()
         if label:
             settings_app_list = [label]
 
         for app_label in settings_app_list:
-            has_module_perms = request.user.has_module_perms(app_label)
-            if not has_module_perms:
+            if not permission_matrix.has_module_perms(app_label):
                 continue
 
             urlargs = {'current_app': app_label}
@@ -138,7 +137,7 @@ class SettingsMixin:
             model_list = []
             for model in models_app:
                 opts = model._meta
-                perms = get_model_perms(request, model)
+                perms = dict(permission_matrix.get_model_perms(model))
                 if True not in perms.values():
                     continue
 
@@ -153,7 +152,7 @@ class SettingsMixin:
                 model_dict["list_url"] = try_get_url(
                     f'{app_label}_list', **urlargs
                 )
-                if has_permission_add(request, model):
+                if perms['add']:
                     model_dict["add_url"] = try_get_url(
                         f'{app_label}_add', **urlargs
                     )
@@ -186,7 +185,7 @@ class ModelsView(SettingsMixin, BaseSiteMixin, TemplateView):
 
     def get(self, request, *args, **kwargs):
         if not any(
-                request.user.has_module_perms(app_label)
+                has_module_permission(request, app_label)
                 for app_label in SETTINGS_APP_LIST
         ):
             raise Http404
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import translation
+
+from risi.models import LogEntrySite
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнение подготовленных для вывода сообщений журнала изменений '
+        '(change_message_text) для записей, сохраненных без них или на '
+        'другом языке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language', default=settings.LANGUAGE_CODE,
+            help='Язык сообщений (по умолчанию LANGUAGE_CODE)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Количество записей в одной транзакции',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Подготовить сообщения всех записей заново',
+        )
+
+    def handle(self, *args, language, batch_size, **options):
+        queryset = LogEntrySite.objects.only(
+            'action_flag', 'change_message',
+        ).order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(~Q(change_message_language=language))
+
+        updated = 0
+        last_pk = 0
+        with translation.override(language):
+            while True:
+                entries = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+                if not entries:
+                    break
+                for entry in entries:
+                    entry.set_change_message_text()
+                with transaction.atomic():
+                    LogEntrySite.objects.bulk_update(
+                        entries,
+                        ['change_message_text', 'change_message_language'],
+                    )
+                last_pk = entries[-1].pk
+                updated += len(entries)
+                self.stdout.write(f'записей: {updated}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сообщения подготовлены, записей: {updated}'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def fill_object_id_int(apps, schema_editor):
+    """Заполнение object_id_int по числовым значениям object_id"""
+    LogEntrySite = apps.get_model('risi', 'LogEntrySite')
+    LogEntrySite.objects.using(schema_editor.connection.alias).filter(
+        object_id__regex=r'^[0-9]+$'
+    ).update(object_id_int=Cast('object_id', models.BigIntegerField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('risi', '0002_logentrysite_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logentrysite',
+            name='object_id_int',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_object_id_int, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='logentrysite',
+            index=models.Index(fields=['content_type', 'object_id_int', 'action_time'], name='risi_log_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentrysite',
+            index=models.Index(fields=['user', 'action_time'], name='risi_log_user_idx'),
+        ),
+    ]
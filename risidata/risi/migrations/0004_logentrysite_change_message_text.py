@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('risi', '0003_logentrysite_object_id_int'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logentrysite',
+            name='change_message_language',
+            field=models.CharField(blank=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='logentrysite',
+            name='change_message_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -8,7 +8,7 @@ from django.db import models
 from django.urls import reverse, NoReverseMatch
 from django.utils import timezone
 from django.utils.text import get_text_list
-from django.utils.translation import gettext
+from django.utils.translation import get_language, gettext
 from django.utils.translation import gettext_lazy as _
 
 ADDITION = 1
@@ -24,6 +24,14 @@ ACTION_FLAG_CHOICES = [
 ]
 
 
+def object_id_to_int(object_id):
+    """Числовое значение object_id или None"""
+    try:
+        return int(object_id)
+    except (TypeError, ValueError):
+        return None
+
+
 class LogEntrySite(models.Model):
     action_time = models.DateTimeField(
         _("action time"),
@@ -43,6 +51,8 @@ class LogEntrySite(models.Model):
         null=True,
     )
     object_id = models.TextField(_("object id"), blank=True, null=True)
+    # Числовой object_id для выборки истории объекта по индексу
+    object_id_int = models.BigIntegerField(blank=True, null=True)
     # Translators: 'repr' means representation
     # (https://docs.python.org/library/functions.html#repr)
     object_repr = models.CharField(_("object repr"), max_length=200)
@@ -51,6 +61,11 @@ class LogEntrySite(models.Model):
     )
     # change_message is either a string or a JSON structure
     change_message = models.TextField(_("change message"), blank=True)
+    # Сообщение об изменениях, подготовленное для вывода, и его язык
+    change_message_text = models.TextField(blank=True, editable=False)
+    change_message_language = models.CharField(
+        max_length=15, blank=True, editable=False
+    )
 
     objects = LogEntryManager()
 
@@ -59,6 +74,16 @@ class LogEntrySite(models.Model):
         verbose_name_plural = 'Записи журнала'
         db_table = "risi_log"
         ordering = ["-action_time"]
+        indexes = [
+            models.Index(
+                fields=['content_type', 'object_id_int', 'action_time'],
+                name='risi_log_object_idx',
+            ),
+            models.Index(
+                fields=['user', 'action_time'],
+                name='risi_log_user_idx',
+            ),
+        ]
 
     def __repr__(self):
         return str(self.action_time)
@@ -97,6 +122,24 @@ class LogEntrySite(models.Model):
         return self.action_flag == CLOSING
 
     def get_change_message(self):
+        """
+        Сообщение об изменениях на текущем языке: сохраненное при записи
+        (change_message_text) или подготовленное один раз для записи
+        """
+        language = get_language()
+        if self.change_message_language == language:
+            return self.change_message_text
+        rendered = self.__dict__.setdefault('_change_messages', {})
+        if language not in rendered:
+            rendered[language] = self.render_change_message()
+        return rendered[language]
+
+    def set_change_message_text(self):
+        """Сохранение сообщения об изменениях на текущем языке"""
+        self.change_message_text = self.render_change_message()
+        self.change_message_language = get_language() or ''
+
+    def render_change_message(self):
         """
         If self.change_message is a JSON structure, interpret it as a change
         string, properly translated.
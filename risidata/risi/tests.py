@@ -0,0 +1,131 @@
+import json
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import translation
+
+from core.audit import add_log_entries
+
+from risi.models import CHANGE, LogEntrySite, object_id_to_int
+from users.models import UserProfile
+
+object_id_int_migration = import_module(
+    'risi.migrations.0003_logentrysite_object_id_int'
+)
+
+
+class ObjectIdIntTest(TestCase):
+    """Числовой object_id записей журнала изменений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(username='user')
+        cls.content_type = ContentType.objects.get_for_model(UserProfile)
+
+    def create_entry(self, object_id):
+        return LogEntrySite.objects.create(
+            user=self.user, content_type=self.content_type,
+            object_id=object_id, object_repr=str(object_id),
+            action_flag=CHANGE,
+        )
+
+    def test_object_id_to_int(self):
+        self.assertEqual(object_id_to_int('15'), 15)
+        self.assertEqual(object_id_to_int(15), 15)
+        self.assertIsNone(object_id_to_int('contract-1'))
+        self.assertIsNone(object_id_to_int(None))
+
+    def test_fill(self):
+        """Заполнение в миграции только для числовых значений object_id"""
+        for object_id in ('15', '007', 'contract-1', '1.5', '', None):
+            self.create_entry(object_id)
+        schema_editor = SimpleNamespace(connection=connection)
+        object_id_int_migration.fill_object_id_int(apps, schema_editor)
+        self.assertEqual(
+            dict(
+                LogEntrySite.objects.filter(object_id__isnull=False)
+                .values_list('object_id', 'object_id_int')
+            ),
+            {
+                '15': 15, '007': 7, 'contract-1': None, '1.5': None,
+                '': None,
+            },
+        )
+
+    def test_history_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('план запроса проверяется для SQLite')
+        queryset = LogEntrySite.objects.filter(
+            content_type=self.content_type, object_id_int=15
+        ).order_by('-action_time')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('risi_log_object_idx', plan)
+
+
+class ChangeMessageTextTest(TestCase):
+    """Сообщения об изменениях, подготовленные для вывода при записи"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create(username='user')
+        cls.message = json.dumps([{'changed': {'fields': ['Номер']}}])
+
+    def get_entry(self):
+        return LogEntrySite(
+            user=self.user, object_id='1', object_repr='1',
+            action_flag=CHANGE, change_message=self.message,
+        )
+
+    def test_stored(self):
+        with translation.override('ru'):
+            add_log_entries(self.get_entry())
+            entry = LogEntrySite.objects.get()
+            self.assertEqual(entry.change_message_language, 'ru')
+            self.assertEqual(
+                entry.change_message_text, entry.render_change_message()
+            )
+            with mock.patch.object(
+                LogEntrySite, 'render_change_message'
+            ) as render:
+                self.assertEqual(
+                    entry.get_change_message(), entry.change_message_text
+                )
+            render.assert_not_called()
+
+    def test_other_language(self):
+        """На другом языке сообщение готовится один раз для записи"""
+        with translation.override('ru'):
+            add_log_entries(self.get_entry())
+        entry = LogEntrySite.objects.get()
+        with translation.override('en'):
+            with mock.patch.object(
+                LogEntrySite, 'render_change_message',
+                autospec=True, side_effect=LogEntrySite.render_change_message,
+            ) as render:
+                message = entry.get_change_message()
+                self.assertEqual(entry.get_change_message(), message)
+            self.assertEqual(render.call_count, 1)
+            self.assertIn('Номер', message)
+
+    def test_command(self):
+        self.get_entry().save()
+        self.get_entry().save()
+        call_command(
+            'render_change_messages', language='ru', stdout=StringIO()
+        )
+        with translation.override('ru'):
+            for entry in LogEntrySite.objects.all():
+                self.assertEqual(entry.change_message_language, 'ru')
+                self.assertEqual(
+                    entry.change_message_text, entry.render_change_message()
+                )